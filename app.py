@@ -1,53 +1,94 @@
 import os
-from google.cloud import speech
-from google.auth.exceptions import DefaultCredentialsError
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+from werkzeug.local import LocalProxy
 from werkzeug.utils import secure_filename
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
-from database import db, User, Task, get_user_by_username, create_task, get_all_tasks, update_task, delete_task
-from genai_parser import TaskParser
+from flask import (Flask, Blueprint, current_app, render_template, request,
+                   jsonify, session, redirect, url_for, flash, make_response)
+from database import (db, init_db, upgrade_schema, normalize_task_dates,
+                      bump_user_version, on_user_change, User, Task,
+                      get_user_by_username, create_task, create_tasks_bulk,
+                      list_tasks_page, get_all_tasks, update_task, delete_task)
+from database import (search, AudioFile, add_audio_file, audio_bytes_used,
+                      audio_in_use, get_audio_file, remove_audio_file,
+                      get_cached_transcript, cache_transcript)
+from storage import AudioStore, UploadTooLarge
+from user_cache import UserCache
+from passwords import PasswordHasher, PasswordsBusy, DEFAULT_METHOD
+from rate_limit import RateLimiter
+from metrics import Metrics
+from logconfig import configure_logging
+from genai_parser import TaskParser, make_gemini_model
+from clients import ClientRegistry
+from parse_cache import ParseCache
+from jobs import JobQueue, QueueFull
+from broker import Broker
+from google_sync import (GoogleSync, push_tasks, push_task_events,
+                         pull_tasks, pull_events)
+from transcription import (StreamingSessionManager, StreamingError,
+                           GoogleStreamingRecognizer, FakeStreamingRecognizer,
+                           GoogleRecognizer, FakeRecognizer,
+                           ChunkedTranscriber)
 import click
+import hashlib
 import json
-import google.oauth2.credentials
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import Flow
-from datetime import datetime
+import logging
+import math
+import signal
+from datetime import date, datetime, timezone
+from functools import partial, wraps
 from zoneinfo import ZoneInfo  # Python 3.9+
 
-#App & DB setup
-app = Flask(__name__)
-app.secret_key = os.environ.get("FLASK_SECRET", "change this")
+# Google SDKs (speech, generativeai, googleapiclient, oauthlib) are heavy to
+# import, so they are only imported where first used. Keep it that way:
+# tests/test_import_time.py fails if importing app pulls them in.
 
 base_dir = os.path.abspath(os.path.dirname(__file__))
 db_path  = os.path.join(base_dir, 'echo_note.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
-print(app.config['SQLALCHEMY_DATABASE_URI'])
 
 CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
-app.secret_key = os.getenv("FLASK_SECRET_KEY", "dev_secret_key")
 
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['UPLOAD_FOLDER'] = os.path.join(os.getcwd(), 'uploads')
-db.init_app(app)
+bp = Blueprint("main", __name__, cli_group=None)
+logger = logging.getLogger(__name__)
 
-@app.cli.command("init-db")
-def init_db_command():
-    uri = app.config['SQLALCHEMY_DATABASE_URI']
-    click.echo(f"Using database: {uri}")
-    with app.app_context():
-        db.create_all()
-    click.echo("Initialized the database")
 
-#set up login manager
+def _extension(name, *path):
+    """The current app's app.extensions[name] (then [path...]), looked up
+    on use.
+
+    Extensions are built per app in create_app(); views reach them through
+    these module-level names.
+    """
+    def lookup():
+        ext = current_app.extensions[name]
+        for key in path:
+            ext = ext[key]
+        return ext
+    return LocalProxy(lookup)
+
+
+# set up login manager; the logged-in user comes from the per-user cache
+user_cache = _extension("user_cache")
 login_manager = LoginManager()
-login_manager.login_view = "login"
-login_manager.init_app(app)
+login_manager.login_view = "main.login"
+
+# password hashing runs on a process pool; logins are rate limited per IP
+# (every attempt) and per username (failed attempts only)
+passwords = _extension("passwords")
+login_ip_limiter = _extension("rate_limiters", "LOGIN_IP")
+login_user_limiter = _extension("rate_limiters", "LOGIN_USER")
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return user_cache.load_user(int(user_id))
+
+
+@on_user_change
+def forget_cached_user(user_id):
+    # listeners are process-wide; drop the user from this app's cache
+    cache = current_app.extensions.get("user_cache")
+    if cache is not None:
+        cache.invalidate(user_id)
 
 
 # Dummy speech client class for testing
@@ -57,39 +98,268 @@ class DummySpeechClient:
         # stub - tests will override this
         raise NotImplementedError("This should be monkey patched in tests")
     
+
 #protect app from calling dummy stub when we aren't testing
-if os.getenv("FLASK_ENV") == "testing":
-    speech_client = DummySpeechClient()
-else:
+def make_speech_client():
+    if os.getenv("FLASK_ENV") == "testing":
+        return DummySpeechClient()
     # Initializing google speech client
-    speech_client = speech.SpeechClient()
-#verify which client 
-print("speech_client is", type(speech_client).__name__)
+    from google.cloud import speech
+    return speech.SpeechClient()
 
 
-# Define task parser & nav links to be used across routes
-task_parser = TaskParser()
+# Google clients are built on first use, once per app (Tasks/Calendar once
+# per credential)
+clients = _extension("clients")
 
-def get_nav_links():
+
+def get_speech_client():
+    # tests swap it with app.extensions["clients"].override("speech", ...)
+    return clients.get("speech")
+
+
+def make_streaming_recognizer():
+    if current_app.config['SPEECH_STREAMING_BACKEND'] == "fake":
+        return FakeStreamingRecognizer()
+    return GoogleStreamingRecognizer(get_speech_client())
+
+
+stream_sessions = _extension("stream_sessions")
+chunked_transcriber = _extension("chunked_transcriber")
+job_queue = _extension("job_queue")
+broker = _extension("broker")
+google_sync = _extension("google_sync")
+metrics = _extension("metrics")
+
+
+# task parser (with its parse cache) used across routes
+task_parser = _extension("task_parser")
+
+
+def reload_prompt_on_sighup(app):
+    """`kill -HUP <pid>` re-reads prompt_template.txt (on the next parse)
+    without a restart. Called once, for the app a process serves."""
+    if hasattr(signal, "SIGHUP"):
+        parser = app.extensions["task_parser"]
+        signal.signal(signal.SIGHUP,
+                      lambda signum, frame: parser.template.mark_stale())
+
+
+def create_app(config=None):
+    """Build the Flask app; `config` overrides the defaults below."""
+    # App & DB setup
+    app = Flask(__name__)
+    app.secret_key = os.getenv("FLASK_SECRET_KEY", "dev_secret_key")
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['UPLOAD_FOLDER'] = os.path.join(os.getcwd(), 'uploads')
+    app.config['MAX_CONTENT_LENGTH'] = int(os.getenv("MAX_CONTENT_LENGTH",
+                                                     32 * 1024 * 1024))
+    app.config['MAX_UPLOAD_BYTES'] = int(os.getenv("MAX_UPLOAD_BYTES",
+                                                   25 * 1024 * 1024))
+    # 0 = none
+    app.config['UPLOAD_QUOTA_BYTES'] = int(os.getenv("UPLOAD_QUOTA_BYTES",
+                                                     500 * 1024 * 1024))
+    app.config['TRANSCRIPT_CACHE'] = True
+    app.config['JOB_WORKERS'] = int(os.getenv("JOB_WORKERS", 4))
+    app.config['ADMIN_TOKEN'] = os.getenv("ADMIN_TOKEN")
+    app.config['MAX_BATCH_TRANSCRIPTS'] = 100
+    app.config['TASKS_PAGE_SIZE'] = 50
+    app.config['MAX_TASKS_PAGE_SIZE'] = 200
+    app.config['SSE_HEARTBEAT'] = 15
+    app.config['SSE_QUEUE_SIZE'] = 100
+    # 0 = off
+    app.config['USER_CACHE_SIZE'] = int(os.getenv("USER_CACHE_SIZE", 1024))
+    app.config['USER_CACHE_TTL'] = int(os.getenv("USER_CACHE_TTL", 60))
+    app.config['LOG_LEVEL'] = os.getenv("LOG_LEVEL", "INFO").upper()
+    app.config['LOG_FORMAT'] = os.getenv("LOG_FORMAT", "text")  # or "json"
+    # bearer token for /metrics; unset = localhost only
+    app.config['METRICS_TOKEN'] = os.getenv("METRICS_TOKEN")
+    app.config['PARSE_CACHE_SIZE'] = int(os.getenv("PARSE_CACHE_SIZE", 1024))
+    app.config['PARSE_CACHE_TTL'] = int(os.getenv("PARSE_CACHE_TTL",
+                                                  24 * 3600))
+    # sqlite file, to keep it across restarts
+    app.config['PARSE_CACHE_DB'] = os.getenv("PARSE_CACHE_DB")
+    # simple transcripts are parsed locally; FAST_PARSE_THRESHOLD=off (None)
+    # sends everything to Gemini
+    fast_threshold = os.getenv("FAST_PARSE_THRESHOLD", "0.8")
+    app.config['FAST_PARSE_THRESHOLD'] = \
+        None if fast_threshold == "off" else float(fast_threshold)
+    # cheap hashes, inline verification and no login limits under test
+    testing = os.getenv("FLASK_ENV") == "testing"
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv(
+        "PASSWORD_HASH_METHOD",
+        "pbkdf2:sha256:1000" if testing else DEFAULT_METHOD)
+    app.config['PASSWORD_WORKERS'] = int(os.getenv("PASSWORD_WORKERS",
+                                                   0 if testing else 2))
+    app.config['PASSWORD_MAX_PENDING'] = 64
+    app.config['LOGIN_IP_LIMIT'] = 0 if testing else 60  # attempts per window
+    app.config['LOGIN_IP_WINDOW'] = 60
+    app.config['LOGIN_USER_LIMIT'] = 0 if testing else 10  # failures
+    app.config['LOGIN_USER_WINDOW'] = 300
+    # recognizer input: downmix/resample/trim, then "flac" or "opus" (needs
+    # ffmpeg)
+    app.config['AUDIO_PREPROCESS'] = os.getenv("AUDIO_PREPROCESS", "1") != "0"
+    app.config['AUDIO_SAMPLE_RATE'] = 16000
+    app.config['AUDIO_CODEC'] = os.getenv("AUDIO_CODEC", "flac")
+    # one-shot recognizer ("google" or offline "fake"); long clips are chunked
+    app.config['SPEECH_BACKEND'] = os.getenv("SPEECH_BACKEND", "google")
+    # seconds per "fake" recognize call (benchmarks)
+    app.config['SPEECH_FAKE_LATENCY'] = 0.0
+    # "today" for relative dates when a request doesn't say its timezone
+    app.config['TIMEZONE'] = os.getenv("ECHONOTE_TIMEZONE", "UTC")
+    app.config['LONG_AUDIO_SECONDS'] = 55  # sync recognize() takes up to 60 s
+    app.config['LONG_AUDIO_CHUNK_SECONDS'] = 30
+    app.config['LONG_AUDIO_WORKERS'] = int(os.getenv("LONG_AUDIO_WORKERS", 4))
+    # Streaming recognizer: "google" in production, "fake" for offline
+    # use/tests
+    default_backend = "fake" if testing else "google"
+    app.config['SPEECH_STREAMING_BACKEND'] = os.getenv(
+        "SPEECH_STREAMING_BACKEND", default_backend)
+    app.config['DISCOVERY_CACHE_DIR'] = os.getenv(
+        "DISCOVERY_CACHE_DIR", os.path.join(app.instance_path, "discovery"))
+    # build SDK clients in the background after boot instead of on the first
+    # request
+    app.config['WARM_UP_CLIENTS'] = os.getenv("FLASK_ENV") != "testing"
+    # re-submit jobs a previous process left queued or retrying
+    app.config['JOB_RESUME'] = not testing
+    if config:
+        app.config.update(config)
+
+    configure_logging(app)
+    logger.info("Using database %s", app.config['SQLALCHEMY_DATABASE_URI'])
+
+    init_db(app)
+    # every extension instance belongs to this app (app.extensions), so a
+    # second create_app() - tests, benchmarks - starts from fresh state
+    app_metrics = Metrics(app=app)
+    login_manager.init_app(app)
+    app_user_cache = UserCache(app=app)
+    PasswordHasher(app=app)
+    RateLimiter(limit=60, window=60, name="LOGIN_IP", app=app)
+    RateLimiter(limit=10, window=300, name="LOGIN_USER", app=app)
+    app_broker = Broker(app=app)
+    app_job_queue = JobQueue()
+    app_job_queue.handler("transcribe")(run_transcribe_job)
+    app_job_queue.handler("parse")(run_parse_job)
+    app_job_queue.handler("pipeline")(run_pipeline_job)
+    app_job_queue.on_update(
+        lambda job: app_broker.publish(job.user_id, "job", job.to_dict()))
+    app_job_queue.init_app(app)  # may resume stored jobs, so handlers go first
+    GoogleSync(app=app)
+    ChunkedTranscriber(app=app)
+    StreamingSessionManager(make_streaming_recognizer, app=app)
+    app_clients = ClientRegistry()
+    app_clients.register("speech", make_speech_client)
+    app_clients.register("gemini", make_gemini_model)
+    app_clients.init_app(app)
+    parse_cache = ParseCache(max_entries=app.config['PARSE_CACHE_SIZE'],
+                             ttl=app.config['PARSE_CACHE_TTL'],
+                             persist_path=app.config['PARSE_CACHE_DB'])
+    app_task_parser = TaskParser(
+        cache=parse_cache, model_factory=partial(app_clients.get, "gemini"),
+        fast_threshold=app.config['FAST_PARSE_THRESHOLD'])
+    app.extensions["task_parser"] = app_task_parser
+    app.register_blueprint(bp)
+
+    # exported on /metrics next to the request/stage timings
+    app_metrics.add_cache("parse", parse_cache.stats)
+    app_metrics.add_cache("user", app_user_cache.stats)
+    app_metrics.lookup_counter("transcript")
+    app_metrics.registry.gauge(
+        "echonote_task_parser_calls",
+        "Transcripts parsed locally vs. model calls.", ("path",),
+        lambda: {(path,): n for path, n in app_task_parser.stats.items()})
+    return app
+
+
+@bp.cli.command("init-db")
+def init_db_command():
+    uri = current_app.config['SQLALCHEMY_DATABASE_URI']
+    click.echo(f"Using database: {uri}")
+    db.create_all()
+    click.echo("Initialized the database")
+
+
+@bp.cli.command("upgrade-db")
+def upgrade_db_command():
+    """Add tables and indexes that an older echo_note.db is missing."""
+    created = upgrade_schema()
+    click.echo(f"Created indexes: {', '.join(created) or 'none'}")
+    click.echo(f"Normalized dates of {normalize_task_dates()} tasks")
+
+
+def build_nav_links(connected):
     links = [
-        {'href': '/', 'text': 'Home', 'endpoint': 'index'},
-        {'href': '/draw', 'text': 'Draw', 'endpoint': 'draw'},
-        {'href': '/appearance', 'text': 'Appearance', 'endpoint': 'appearance'}
+        {'href': '/', 'text': 'Home', 'endpoint': 'main.index'},
+        {'href': '/draw', 'text': 'Draw', 'endpoint': 'main.draw'},
+        {'href': '/appearance', 'text': 'Appearance',
+         'endpoint': 'main.appearance'}
     ]
     
     # ✅ Only add if user hasn't connected Google yet
-    if "credentials" not in session:
-        links.append({'href': '/authorize', 'text': 'Connect Google Tasks', 'endpoint': 'authorize'})
+    if not connected:
+        links.append({'href': '/authorize', 'text': 'Connect Google Tasks',
+                      'endpoint': 'main.authorize'})
     else:
         links.append({'href': '#', 'text': 'Google Connected', 'endpoint': ''})
     
     return links
 
+def get_nav_links():
+    connected = "credentials" in session
+    if current_user.is_authenticated:
+        return user_cache.nav_links(current_user.id, connected,
+                                    build_nav_links)
+    return build_nav_links(connected)
+
+
+def user_version_etag(view):
+    """Conditional GET for per-user reads.
+
+    The ETag comes from the user's data_version (bumped by every task and
+    theme write) plus the route and query string. A matching If-None-Match
+    gets a 304 without running the view, so unchanged polls skip the query
+    and the JSON serialization entirely. If-Modified-Since is not honoured:
+    Last-Modified has one-second resolution, so two writes in the same
+    second would look unchanged.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # read fresh: current_user may come from user_cache, and another
+        # worker process may have bumped the version since
+        version, modified = db.session.query(
+            User.data_version, User.data_modified_at) \
+            .filter(User.id == current_user.id).one()
+        version = version or 0
+        query = request.query_string.decode()
+        raw = f"{request.endpoint}:{current_user.id}:{version}:{query}"
+        etag = hashlib.sha1(raw.encode()).hexdigest()
+        if modified is not None:
+            if modified.tzinfo is None:
+                modified = modified.replace(tzinfo=timezone.utc)
+            modified = modified.replace(microsecond=0)
+
+        if request.if_none_match and request.if_none_match.contains(etag):
+            resp = current_app.response_class(status=304)
+        else:
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code != 200:
+                return resp
+        resp.set_etag(etag)
+        if modified is not None:
+            resp.last_modified = modified
+        resp.cache_control.private = True
+        resp.cache_control.no_cache = True
+        return resp
+    return wrapper
+
+
 #Routes
 
 #User authentication routes
 #register route
-@app.route("/sign_up", methods=["GET", "POST"])
+@bp.route("/sign_up", methods=["GET", "POST"])
 def sign_up():
     if request.method == "POST":
         username = request.form["username"]
@@ -97,63 +367,112 @@ def sign_up():
         if User.query.filter_by(username=username).first():
             flash("Username already taken", "error")
         else:
-            new_user = User(username=username, pw_hash=generate_password_hash(password, method="pbkdf2:sha256"))
+            try:
+                pw_hash = passwords.hash(password)
+            except PasswordsBusy:
+                return too_busy("signup.html")
+            new_user = User(username=username, pw_hash=pw_hash)
             db.session.add(new_user)
             db.session.commit()
             flash("Account created - please log in", "success")
-            return redirect(url_for("login"))
+            return redirect(url_for("main.login"))
     return render_template("signup.html", nav_links=get_nav_links())
 
+
+def too_busy(template, retry_after=1, status=503,
+             message="Server busy - please try again"):
+    flash(message, "error")
+    resp = make_response(
+        render_template(template, nav_links=get_nav_links()), status)
+    resp.headers["Retry-After"] = str(math.ceil(retry_after))
+    return resp
+
+
 #login route
-@app.route("/login", methods=["GET", "POST"])
+@bp.route("/login", methods=["GET", "POST"])
 def login():
     if request.method=="POST":
         username = request.form["username"]
         password = request.form["password"]
+        ip_key = f"ip:{request.remote_addr}"
+        user_key = f"user:{username.lower()}"
+        wait = max(login_ip_limiter.retry_after(ip_key),
+                   login_user_limiter.retry_after(user_key))
+        if wait:
+            return too_busy("login.html", wait, 429,
+                            "Too many login attempts - please wait")
+        login_ip_limiter.hit(ip_key)
+
         user = get_user_by_username(username)
-        if user and check_password_hash(user.pw_hash, request.form["password"]):
+        try:
+            valid = passwords.verify(user.pw_hash if user else None, password)
+        except PasswordsBusy:
+            return too_busy("login.html")
+        if valid and passwords.needs_rehash(user.pw_hash):
+            # hashed with older parameters: upgrade while we have the password,
+            # or at a later login if the pool is busy right now
+            try:
+                user.pw_hash = passwords.hash(password)
+                db.session.commit()
+            except PasswordsBusy:
+                pass
+        if valid:
+            login_user_limiter.reset(user_key)
+            user_cache.invalidate(user.id)
             login_user(user)
-            return redirect(url_for("index"))
+            return redirect(url_for("main.index"))
+        login_user_limiter.hit(user_key)
         flash("Invalid credentials", "error")
     return render_template("login.html", nav_links=get_nav_links())
 
+
 #logout route
-@app.route("/logout")
+@bp.route("/logout")
 @login_required
 def logout():
+    user_cache.invalidate(current_user.id)
     logout_user()
-    return redirect(url_for("login"))
+    return redirect(url_for("main.login"))
 
 
 #Page routes
-@app.route('/', methods=['GET'])
+@bp.route('/', methods=['GET'])
 @login_required
 def index():
-    tasks = Task.query.filter_by(user_id=current_user.id).order_by(Task.created_at.desc()).all()
-    return render_template('index.html', tasks=tasks, nav_links=get_nav_links())
+    # first page only; static/script.js lazy-loads the rest from /api/tasks
+    tasks, next_cursor = list_tasks_page(
+        current_user.id, limit=current_app.config['TASKS_PAGE_SIZE'])
+    return render_template('index.html', tasks=tasks, next_cursor=next_cursor,
+                           nav_links=get_nav_links())
+
 
-@app.route('/draw', methods=['GET'])
+@bp.route('/draw', methods=['GET'])
 @login_required
 def draw():
     return render_template('draw.html', nav_links=get_nav_links())
 
-@app.route('/appearance', methods=['GET'])
+
+@bp.route('/appearance', methods=['GET'])
 @login_required
 def appearance():
     return render_template('appearance.html', nav_links=get_nav_links(), user_theme=current_user.theme or {})
 
-@app.route('/api/save_theme', methods=['POST'])
+
+@bp.route('/api/save_theme', methods=['POST'])
 @login_required
 def save_theme():
     data = request.get_json()
     if not isinstance(data, dict):
         return jsonify(error="Invalid theme data"), 400
     current_user.theme = json.dumps(data)
+    bump_user_version(current_user.id)
     db.session.commit()
     return jsonify(message="Theme saved"), 200
 
-@app.route('/api/get_theme', methods=['GET'])
+
+@bp.route('/api/get_theme', methods=['GET'])
 @login_required
+@user_version_etag
 def get_theme():
     user_theme = current_user.get_theme()
     if user_theme:
@@ -164,99 +483,453 @@ def get_theme():
     }
     return jsonify(default), 200
 
+
 #Audio upload & transcription routes
 # Audio upload route
-@app.route('/api/upload', methods=['POST'])
+def get_audio_store():
+    return AudioStore(current_app.config['UPLOAD_FOLDER'])
+
+
+@bp.route('/api/upload', methods=['POST'])
 @login_required
 def upload_audio():
+    """Store a recording (multipart `audio` field or a raw audio/* body).
+
+    The upload is streamed to disk and stored by content hash, so sending
+    the same audio twice keeps one copy. `filename` is relative to
+    UPLOAD_FOLDER.
+    """
     f = request.files.get('audio')
-    if not f:
+    if f:
+        stream, original_name = f.stream, secure_filename(f.filename)
+    elif request.mimetype.startswith('audio/'):
+        stream, original_name = request.stream, None
+    else:
         return {"error": "no file"}, 400
-    # sanitizing filename (used werkzeug helper)
-    filename = secure_filename(f.filename)
-    upload_folder = app.config['UPLOAD_FOLDER']
-    # make sure the folder exists
-    os.makedirs(upload_folder, exist_ok=True)
-    # do we want to save audio to disk? if not we dont need next two lines
-    save_path = os.path.join(upload_folder, filename)
-    f.save(save_path)
-    return jsonify(filename=filename), 200
+
+    store = get_audio_store()
+    try:
+        sha256, size, tmp_path = store.stage(
+            stream, max_bytes=current_app.config['MAX_UPLOAD_BYTES'])
+    except UploadTooLarge:
+        return jsonify(error="File too large"), 413
+    # the quota is checked as the row goes in, and the row goes in before the
+    # bytes: a concurrent delete of the same audio then sees it's still wanted
+    quota = current_app.config['UPLOAD_QUOTA_BYTES'] or None
+    row, owned_new = add_audio_file(current_user.id, sha256, size,
+                                    original_name, quota=quota)
+    if row is None:
+        store.discard(tmp_path)
+        return jsonify(error="Upload quota exceeded"), 413
+    stored = store.commit(sha256, tmp_path)
+    return jsonify(filename=store.relpath(sha256),
+                   duplicate=not (stored and owned_new),
+                   **row.to_dict()), 200
+
+
+@bp.route('/api/uploads', methods=['GET'])
+@login_required
+def list_uploads():
+    files = AudioFile.query.filter_by(user_id=current_user.id) \
+        .order_by(AudioFile.created_at.desc()).all()
+    return jsonify(files=[f.to_dict() for f in files],
+                   used=audio_bytes_used(current_user.id),
+                   quota=current_app.config['UPLOAD_QUOTA_BYTES'])
+
+
+@bp.route('/api/uploads/<sha256>', methods=['DELETE'])
+@login_required
+def delete_upload(sha256):
+    still_used = remove_audio_file(current_user.id, sha256)
+    if still_used is None:
+        return jsonify(error="Not found"), 404
+    if not still_used:
+        get_audio_store().delete(sha256, in_use=partial(audio_in_use, sha256))
+    return jsonify(message="Deleted"), 200
+
+
+@bp.app_errorhandler(413)
+def request_too_large(e):
+    return jsonify(error="Request too large"), 413
+
+
+def preprocess_audio(audio_bytes):
+    """Mono 16 kHz, silence-trimmed, compressed audio (see audio.py)."""
+    from audio import PreparedAudio, prepare_audio
+    if not current_app.config['AUDIO_PREPROCESS']:
+        return PreparedAudio(audio_bytes)
+    return prepare_audio(audio_bytes,
+                         target_rate=current_app.config['AUDIO_SAMPLE_RATE'],
+                         codec=current_app.config['AUDIO_CODEC'])
+
+
+def make_recognizer():
+    if current_app.config['SPEECH_BACKEND'] == "fake":
+        return FakeRecognizer(
+            latency=current_app.config['SPEECH_FAKE_LATENCY'])
+    return GoogleRecognizer(get_speech_client())
+
+
+def recognize_audio(audio_bytes):
+    """Run recognition and return one transcript.
+
+    Recordings longer than LONG_AUDIO_SECONDS are cut at pauses and the
+    pieces recognized in parallel, instead of one long serial call.
+    """
+    with metrics.timer("audio_preprocess"):
+        prepared = preprocess_audio(audio_bytes)
+    if prepared.is_silent:
+        return ""  # nothing but silence: don't pay for a recognize call
+    recognizer = make_recognizer()
+    config = current_app.config
+    if (prepared.samples is not None
+            and prepared.duration > config['LONG_AUDIO_SECONDS']):
+        from audio import chunk_audio
+        chunks = chunk_audio(prepared,
+                             max_chunk=config['LONG_AUDIO_CHUNK_SECONDS'],
+                             codec=config['AUDIO_CODEC'])
+        with metrics.timer("speech"):
+            return chunked_transcriber.transcribe(chunks, recognizer)
+    with metrics.timer("speech"):
+        return recognizer.recognize(prepared)
+
+
+def transcribe_cached(audio_bytes, sha256=None):
+    """recognize_audio, but each distinct audio is only ever sent once."""
+    if not current_app.config['TRANSCRIPT_CACHE']:
+        return recognize_audio(audio_bytes)
+    sha256 = sha256 or hashlib.sha256(audio_bytes).hexdigest()
+    config = current_app.config
+    codec = config['AUDIO_CODEC'] if config['AUDIO_PREPROCESS'] else 'raw'
+    settings = f"{config['SPEECH_BACKEND']}:en-US:{codec}"
+    transcript = get_cached_transcript(sha256, settings)
+    metrics.lookup_counter("transcript").inc(
+        result="miss" if transcript is None else "hit")
+    if transcript is None:
+        transcript = recognize_audio(audio_bytes)
+        cache_transcript(sha256, settings, transcript)
+    return transcript
+
 
 # Audio transcribe route
-@app.route('/api/transcribe', methods=['POST'])
+@bp.route('/api/transcribe', methods=['POST'])
 @login_required
 def transcribe_audio():
+    """Transcribe an `audio` upload, or {"sha256": ...} of a stored upload."""
     try:
-        if 'audio' not in request.files:
-            return jsonify(error='no file'), 400
-        audio_bytes = request.files['audio'].read()
-        audio = speech.RecognitionAudio(content=audio_bytes)
-        config = speech.RecognitionConfig(
-            language_code="en-US",
-        )
-        resp = speech_client.recognize(config=config, audio=audio)
-        transcript = " ".join(r.alternatives[0].transcript for r in resp.results)
+        if 'audio' in request.files:
+            audio_bytes, sha256 = request.files['audio'].read(), None
+        else:
+            sha256 = (request.get_json(silent=True) or {}).get('sha256')
+            if not sha256:
+                return jsonify(error='no file'), 400
+            if not get_audio_file(current_user.id, sha256):
+                return jsonify(error="Not found"), 404
+            audio_bytes = get_audio_store().read(sha256)
+        transcript = transcribe_cached(audio_bytes, sha256)
         return jsonify(transcript=transcript), 200
     except NotImplementedError as e:
         return jsonify(error=str(e)), 501
     except Exception as e:
+        logger.exception("Error transcribing audio",
+                         extra={"user_id": current_user.id})
+        metrics.errors.inc(endpoint=request.endpoint)
+        return jsonify(error="Transcription failed"), 500
+
+
+# Streaming transcription routes: start a session, push chunks, finish
+@bp.route('/api/transcribe/stream', methods=['POST'])
+@login_required
+def start_transcribe_stream():
+    try:
+        session_ = stream_sessions.start(current_user.id)
+    except StreamingError as e:
+        return jsonify(error=str(e)), 503
+    return jsonify(session_.snapshot()), 201
+
+
+@bp.route('/api/transcribe/stream/<session_id>', methods=['POST'])
+@login_required
+def push_transcribe_stream(session_id):
+    session_ = stream_sessions.get(session_id, current_user.id)
+    if not session_:
+        return jsonify(error="Not found"), 404
+    if 'audio' in request.files:
+        chunk = request.files['audio'].read()
+    else:
+        chunk = request.get_data()
+    seen = session_.snapshot()["version"]
+    try:
+        session_.push(chunk)
+    except StreamingError as e:
+        return jsonify(error=str(e)), 409
+    # give the recognizer a moment so the reply carries fresh interim text
+    wait_ms = min(request.args.get('wait_ms', 200, type=int), 2000)
+    session_.wait(seen, wait_ms / 1000)
+    return jsonify(session_.snapshot()), 200
+
+
+@bp.route('/api/transcribe/stream/<session_id>/finish', methods=['POST'])
+@login_required
+def finish_transcribe_stream(session_id):
+    if not stream_sessions.get(session_id, current_user.id):
+        return jsonify(error="Not found"), 404
+    result = stream_sessions.close(session_id)
+    if result is None:  # a concurrent finish got there first
+        return jsonify(error="Not found"), 404
+    if result["error"]:
         return jsonify(error="Transcription failed"), 500
+    return jsonify(transcript=result["transcript"]), 200
+
+
+def page_limit(args):
+    """?limit=, defaulting to TASKS_PAGE_SIZE and capped at
+    MAX_TASKS_PAGE_SIZE."""
+    config = current_app.config
+    limit = args.get('limit', config['TASKS_PAGE_SIZE'], type=int)
+    return min(max(limit, 1), config['MAX_TASKS_PAGE_SIZE'])
 
 
 #API task crud routes
 # List tasks route
-@app.route('/api/tasks', methods=['GET'])
+@bp.route('/api/tasks', methods=['GET'])
 @login_required
+@user_version_etag
 def list_tasks():
-    tasks = Task.query.filter_by(user_id=current_user.id).all()
-    return jsonify([{'id':t.id,'name':t.name,'completed':t.completed} for t in tasks])
+    """One page of the user's tasks, newest first.
+
+    Args: limit (TASKS_PAGE_SIZE by default, capped at MAX_TASKS_PAGE_SIZE),
+    cursor (next_cursor from the previous page), completed=true|false,
+    since/until (ISO dates on created_at) and due_from/due_to (ISO dates,
+    inclusive, on the resolved due date).
+    Responses look like {"tasks": [...], "next_cursor": "..."}.
+    """
+    args = request.args
+
+    def optional(name, parse):
+        return parse(args[name]) if args.get(name) else None
+
+    try:
+        completed = None
+        if 'completed' in args:
+            completed = args['completed'].lower() in ('1', 'true', 'yes')
+        tasks, next_cursor = list_tasks_page(
+            current_user.id, limit=page_limit(args), cursor=args.get('cursor'),
+            completed=completed,
+            created_from=optional('since', datetime.fromisoformat),
+            created_to=optional('until', datetime.fromisoformat),
+            due_from=optional('due_from', date.fromisoformat),
+            due_to=optional('due_to', date.fromisoformat))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(tasks=[t.to_dict() for t in tasks], next_cursor=next_cursor)
+
+
+@bp.route('/api/search', methods=['GET'])
+@login_required
+def search_route():
+    """Full-text search over the user's tasks and events.
+
+    Args: q (words, each matched as a prefix), kind=task|event, limit and
+    offset (next_offset from the previous page).
+    """
+    args = request.args
+    terms = (args.get('q') or '').strip()
+    if not terms:
+        return jsonify(error="q is required"), 400
+    kind = args.get('kind')
+    if kind not in (None, 'task', 'event'):
+        return jsonify(error="kind must be task or event"), 400
+    offset = max(args.get('offset', 0, type=int), 0)
+    results, next_offset = search(current_user.id, terms,
+                                  limit=page_limit(args), offset=offset,
+                                  kind=kind)
+    return jsonify(results=results, next_offset=next_offset)
+
+
+def save_parsed_tasks(user_id, parsed_tasks, tz_name=None):
+    """Store the tasks TaskParser extracted and return how many were saved.
+
+    Relative dates ("tomorrow") resolve against today in tz_name, by
+    default the TIMEZONE setting.
+    """
+    rows = []
+    for task_data in parsed_tasks:
+        task_text = task_data.get("text")
+        due_date = task_data.get("due")
+
+        if due_date and isinstance(due_date, str):
+            due_date = due_date.strip().capitalize()
+
+        if task_text:
+            rows.append({
+                "name": task_text, "due_date": due_date, "raw_text": task_text,
+                "start_date": task_data.get("start_date"),
+                "end_date": task_data.get("end_date"),
+                "start_time": task_data.get("start_time"),
+                "end_time": task_data.get("end_time"),
+                "recurrence": task_data.get("recurrence"),
+            })
+    # one INSERT and one commit for the whole dictation, not one per task
+    ids = create_tasks_bulk(user_id, rows,
+                            tz_name=tz_name or current_app.config['TIMEZONE'])
+    logger.info("Saved %d tasks", len(ids), extra={"user_id": user_id})
+    if ids:
+        created = [dict(row, id=task_id, completed=False)
+                   for row, task_id in zip(rows, ids)]
+        broker.publish(user_id, "task_created", {"tasks": created})
+    return len(ids)
+
 
 # process tasks route
-@app.route('/api/save_task', methods=['POST'])
+@bp.route('/api/save_task', methods=['POST'])
 @login_required
 def save_task():
     try:
         data = request.get_json()
-        print("Received JSON:", data)
+        logger.debug("save_task payload: %s", data)
 
         if not data or "transcript" not in data:
-            print("No transcript provided")
             return jsonify(error='Transcript is required'), 400
 
         transcript = data["transcript"]
-        parsed_tasks = task_parser.prefill_gcalen(transcript, None, None, None, None, None)
+        tz_name = data.get("timezone")
+        parsed_tasks = task_parser.prefill_gcalen(
+            transcript, None, None, None, None, None, tz_name=tz_name)
 
         if not isinstance(parsed_tasks, list):
             return jsonify(error="Failed to parse tasks"), 500
-        
-        count = 0
-        for task_data in parsed_tasks:
-            task_text = task_data.get("text")
-            due_date = task_data.get("due")
-            start_date = task_data.get("start_date")
-            end_date = task_data.get("end_date")
-            start_time = task_data.get("start_time")
-            end_time = task_data.get("end_time")
-            recurrence = task_data.get("recurrence")
-            
-            if due_date and isinstance(due_date, str):
-                due_date = due_date.strip().capitalize()
-                
-            print(f"Trying to save task: {task_text} (Due: {due_date})")
-            if task_text:
-                create_task(user_id=current_user.id, name=task_text, due_date=due_date, raw_text=task_text,
-                            start_date=start_date, end_date=end_date, start_time=start_time,
-                            end_time=end_time, recurrence=recurrence)
-                count += 1
-        db.session.commit()
-        print(f"Saved {count} tasks to database")
+
+        count = save_parsed_tasks(current_user.id, parsed_tasks, tz_name)
         return jsonify(message=f'{count} tasks saved'), 200
     except Exception as e:
-        print(f"Error saving tasks: {e}")
+        logger.exception("Error saving tasks")
+        metrics.errors.inc(endpoint=request.endpoint)
         return jsonify(error="Failed to save tasks"), 500
     
+
+# batch version of save_task: one round trip, far fewer model calls
+@bp.route('/api/save_tasks_batch', methods=['POST'])
+@login_required
+def save_tasks_batch():
+    data = request.get_json(silent=True) or {}
+    transcripts = data.get("transcripts")
+    if not isinstance(transcripts, list) or not transcripts \
+            or not all(isinstance(t, str) for t in transcripts):
+        return jsonify(error='A list of transcripts is required'), 400
+    if len(transcripts) > current_app.config['MAX_BATCH_TRANSCRIPTS']:
+        return jsonify(error='Too many transcripts in one batch'), 413
+    try:
+        tz_name = data.get("timezone")
+        parsed = task_parser.prefill_gcalen_batch(transcripts, tz_name=tz_name)
+        saved = [save_parsed_tasks(current_user.id, tasks, tz_name)
+                 for tasks in parsed]
+    except Exception as e:
+        logger.exception("Error saving task batch")
+        metrics.errors.inc(endpoint=request.endpoint)
+        return jsonify(error="Failed to save tasks"), 500
+    return jsonify(message=f'{sum(saved)} tasks saved', saved=saved), 200
+
+
+# Prometheus scrape endpoint
+@bp.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Needs `Authorization: Bearer <METRICS_TOKEN>`; without a token set,
+    only scrapes from this machine are answered."""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        allowed = request.headers.get('Authorization') == f"Bearer {token}"
+    else:
+        allowed = request.remote_addr in ("127.0.0.1", "::1")
+    if not allowed:
+        return jsonify(error="Forbidden"), 403
+    return current_app.response_class(
+        metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+# Admin route: reload prompt_template.txt now and report its version hash
+@bp.route('/admin/reload_prompt', methods=['POST'])
+def reload_prompt():
+    token = current_app.config.get('ADMIN_TOKEN')
+    if not token or request.headers.get('X-Admin-Token') != token:
+        return jsonify(error="Forbidden"), 403
+    return jsonify(version=task_parser.template.load()), 200
+
+
+# Background job routes; create_app registers these handlers with each
+# app's JobQueue
+def run_transcribe_job(job):
+    return {"transcript": transcribe_cached(job.audio)}
+
+
+def run_parse_job(job):
+    transcript = json.loads(job.payload)["transcript"]
+    parsed_tasks = task_parser.prefill_gcalen(transcript, None, None, None,
+                                              None, None)
+    return {"saved": save_parsed_tasks(job.user_id, parsed_tasks)}
+
+
+def run_pipeline_job(job):
+    transcript = transcribe_cached(job.audio)
+    parsed_tasks = task_parser.prefill_gcalen(transcript, None, None, None,
+                                              None, None)
+    return {"transcript": transcript,
+            "saved": save_parsed_tasks(job.user_id, parsed_tasks)}
+
+
+@bp.route('/api/jobs', methods=['POST'])
+@login_required
+def submit_job():
+    """Queue audio (multipart) or a transcript (JSON) and return a job id.
+
+    Audio runs the full transcribe -> parse -> save pipeline unless
+    ?kind=transcribe asks for the transcript only.
+    """
+    try:
+        if 'audio' in request.files:
+            kind = request.args.get('kind', 'pipeline')
+            if kind not in ('pipeline', 'transcribe'):
+                return jsonify(error='Unknown job kind'), 400
+            job = job_queue.submit(current_user.id, kind,
+                                   audio=request.files['audio'].read())
+        else:
+            data = request.get_json(silent=True) or {}
+            if not data.get("transcript"):
+                return jsonify(error='Audio or transcript is required'), 400
+            job = job_queue.submit(current_user.id, 'parse',
+                                   payload={"transcript": data["transcript"]})
+    except QueueFull as e:
+        return jsonify(error=str(e)), 503
+    return jsonify(job.to_dict()), 202
+
+
+@bp.route('/api/jobs/<job_id>', methods=['GET'])
+@login_required
+def job_status(job_id):
+    """Job status; ?wait=N&status=S long-polls until the status changes."""
+    wait = min(request.args.get('wait', 0, type=float), 30)
+    job = job_queue.wait(job_id, current_user.id,
+                         known_status=request.args.get('status'),
+                         timeout=wait)
+    if not job:
+        return jsonify(error="Not found"), 404
+    return jsonify(job.to_dict()), 200
+
+
+# Server-sent events: live task deltas and job updates for this user
+@bp.route('/api/stream', methods=['GET'])
+@login_required
+def stream():
+    """Each open stream holds a worker thread, so run a threaded server."""
+    return current_app.response_class(
+        broker.stream(current_user.id,
+                      heartbeat=current_app.config['SSE_HEARTBEAT']),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 # Update task route
-@app.route('/api/tasks/<int:task_id>', methods=['PUT'])
+@bp.route('/api/tasks/<int:task_id>', methods=['PUT'])
 @login_required
 def update_task_route(task_id):
     data = request.get_json() or {}
@@ -265,17 +938,23 @@ def update_task_route(task_id):
         return jsonify(error="Not found"), 404
     t.name      = data.get('name', t.name)
     t.completed = data.get('completed', t.completed)
+    bump_user_version(current_user.id)
     db.session.commit()
+    broker.publish(current_user.id, "task_updated", t.to_dict())
     return jsonify(message="Updated"), 200
 
+
 # Delete task route
-@app.route('/api/tasks/<int:task_id>', methods=['DELETE'])
+@bp.route('/api/tasks/<int:task_id>', methods=['DELETE'])
 @login_required
 def delete_task_route(task_id):
     t = Task.query.filter_by(id=task_id, user_id=current_user.id).first()
     if not t:
         return jsonify(error="Not found"), 404
-    db.session.delete(t); db.session.commit()
+    db.session.delete(t)
+    bump_user_version(current_user.id)
+    db.session.commit()
+    broker.publish(current_user.id, "task_deleted", {"id": task_id})
     return jsonify(message="Deleted"), 200
     success = delete_task(task_id)
     
@@ -284,8 +963,9 @@ def delete_task_route(task_id):
     else:
         return jsonify(error='Task not found'), 404
 
+
 #route to prefill a google task event
-@app.route("/api/prefill_gtask", methods=["POST"])
+@bp.route("/api/prefill_gtask", methods=["POST"])
 @login_required
 def prefill_gtask():
     data = request.get_json()
@@ -305,8 +985,9 @@ def prefill_gtask():
         "due_date": task.due_date or ""
     })
 
+
 #route to prefill a google calendar event
-@app.route("/api/prefill_gcalen", methods=["POST"])
+@bp.route("/api/prefill_gcalen", methods=["POST"])
 @login_required
 def prefill_gcalen():
     data = request.get_json()
@@ -333,15 +1014,10 @@ SCOPES = [
 
 os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"  # For local dev without HTTPS
 
-@app.route("/authorize")
-def authorize():
-    session.clear()
-
-    # ✅ Debug: See what redirect URL is being generated
-    generated_redirect = url_for("oauth2callback", _external=True)
-    print("DEBUG: Generated redirect URI ->", generated_redirect)
 
-    flow = Flow.from_client_config(
+def make_oauth_flow(redirect_uri):
+    from google_auth_oauthlib.flow import Flow
+    return Flow.from_client_config(
         {
             "web": {
                 "client_id": CLIENT_ID,
@@ -352,25 +1028,29 @@ def authorize():
             }
         },
         scopes=SCOPES,
+        redirect_uri=redirect_uri
+    )
+
+
+@bp.route("/authorize")
+def authorize():
+    session.clear()
+
+    # ✅ Debug: See what redirect URL is being generated
+    generated_redirect = url_for("main.oauth2callback", _external=True)
+    logger.debug("OAuth redirect URI: %s", generated_redirect)
+
+    flow = make_oauth_flow(
         redirect_uri=generated_redirect  # use what was generated
     )
     auth_url, _ = flow.authorization_url(prompt="consent")
     return redirect(auth_url)
 
-@app.route("/oauth2callback")
+
+@bp.route("/oauth2callback")
 def oauth2callback():
-    flow = Flow.from_client_config(
-        {
-            "web": {
-                "client_id": CLIENT_ID,
-                "client_secret": CLIENT_SECRET,
-                "redirect_uris": ["http://127.0.0.1:5000/oauth2callback"],
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token"
-            }
-        },
-        scopes=SCOPES,
-        redirect_uri=url_for("oauth2callback", _external=True)
+    flow = make_oauth_flow(
+        redirect_uri=url_for("main.oauth2callback", _external=True)
     )
     flow.fetch_token(authorization_response=request.url)
     creds = flow.credentials
@@ -382,21 +1062,122 @@ def oauth2callback():
         "client_secret": creds.client_secret,
         "scopes": creds.scopes
     }
-    return redirect(url_for("index"))
+    if current_user.is_authenticated:
+        # start over with the "Google Connected" nav
+        user_cache.invalidate(current_user.id)
+    return redirect(url_for("main.index"))
 
 def get_tasks_service():
     if "credentials" not in session:
         return None
-    creds = google.oauth2.credentials.Credentials(**session["credentials"])
-    return build("tasks", "v1", credentials=creds)
+    return clients.service("tasks", "v1", session["credentials"])
 
 def get_calendar_service():
     if "credentials" not in session:
         return None
-    creds = google.oauth2.credentials.Credentials(**session["credentials"])
-    return build("calendar", "v3", credentials=creds)
+    return clients.service("calendar", "v3", session["credentials"])
+
+
+@bp.route("/api/google_sync", methods=["POST"])
+@login_required
+def google_sync_route():
+    """Push local tasks to Google Tasks or Calendar in one call.
+
+    Body: {"task_ids": [...], "target": "tasks"|"calendar", "timezone": "..."}.
+    Without task_ids the user's tasks are considered MAX_SYNC_ITEMS at a
+    time: pass the next_cursor of the response as "cursor" for the next
+    ones (null once all were seen). Only new or changed tasks are sent.
+    Returns one result per id, in order, with status
+    created/updated/unchanged/failed/not_found.
+    """
+    if "credentials" not in session:
+        return jsonify({"error": "Not authorized with Google"}), 401
+    data = request.get_json(silent=True) or {}
+    task_ids = data.get("task_ids")
+    target = data.get("target", "tasks")
+    if task_ids is not None and (
+            not isinstance(task_ids, list) or not task_ids
+            or not all(isinstance(i, int) for i in task_ids)):
+        return jsonify(error="A list of task ids is required"), 400
+    if target not in ("tasks", "calendar"):
+        return jsonify(error="Unknown target"), 400
+    max_items = current_app.config['MAX_SYNC_ITEMS']
+    if task_ids and len(task_ids) > max_items:
+        return jsonify(error="Too many tasks in one sync"), 413
+    cursor = data.get("cursor")
+    if cursor is not None and (task_ids is not None
+                               or not isinstance(cursor, int)):
+        return jsonify(error="Invalid cursor"), 400
+
+    tz_name = data.get("timezone") or "UTC"
+    try:
+        ZoneInfo(tz_name)
+    except (ValueError, KeyError):
+        return jsonify(error="Unknown timezone"), 400
+
+    query = Task.query.filter(Task.user_id == current_user.id)
+    next_cursor = None
+    if task_ids is None:
+        if cursor is not None:
+            query = query.filter(Task.id > cursor)
+        tasks = query.order_by(Task.id).limit(max_items + 1).all()
+        if len(tasks) > max_items:
+            tasks = tasks[:max_items]
+            next_cursor = tasks[-1].id
+        task_ids = [t.id for t in tasks]
+    else:
+        task_ids = list(dict.fromkeys(task_ids))
+        found = {t.id: t for t in query.filter(Task.id.in_(task_ids))}
+        tasks = [found[i] for i in task_ids if i in found]
+    # workers have no request context, so hand them the credentials directly
+    creds = dict(session["credentials"])
+    if target == "tasks":
+        pushed = push_tasks(google_sync, current_user.id, tasks,
+                            partial(clients.service, "tasks", "v1", creds))
+    else:
+        pushed = push_task_events(
+            google_sync, current_user.id, tasks,
+            partial(clients.service, "calendar", "v3", creds),
+            tz_name=tz_name)
+    by_id = {r["id"]: r for r in pushed}
+    results = [by_id.get(i) or {"id": i, "status": "not_found",
+                                "remote_id": None,
+                                "error": "Task not found", "attempts": 0}
+               for i in task_ids]
+    counts = {status: sum(r["status"] == status for r in results)
+              for status in ("created", "updated", "unchanged")}
+    failed = len(results) - sum(counts.values())
+    return jsonify(results=results, failed=failed, next_cursor=next_cursor,
+                   **counts), 200
 
-@app.route("/api/google_task_create", methods=["POST"])
+
+@bp.route("/api/google_sync/pull", methods=["POST"])
+@login_required
+def google_sync_pull():
+    """Fetch changes made in Google since the last pull (one delta listing)."""
+    if "credentials" not in session:
+        return jsonify({"error": "Not authorized with Google"}), 401
+    target = (request.get_json(silent=True) or {}).get("target", "tasks")
+    if target not in ("tasks", "calendar"):
+        return jsonify(error="Unknown target"), 400
+    try:
+        if target == "tasks":
+            result = pull_tasks(google_sync, current_user.id,
+                                get_tasks_service())
+        else:
+            result = pull_events(google_sync, current_user.id,
+                                 get_calendar_service())
+    except Exception as e:
+        db.session.rollback()
+        logger.warning("Error pulling from Google: %s", e,
+                       extra={"user_id": current_user.id})
+        return jsonify(error="Google sync failed"), 502
+    if result["changed"]:
+        broker.publish(current_user.id, "resync", {})
+    return jsonify(result), 200
+
+
+@bp.route("/api/google_task_create", methods=["POST"])
 def google_task_create():
     service = get_tasks_service()
     if not service:
@@ -413,14 +1194,15 @@ def google_task_create():
     created_task = service.tasks().insert(tasklist='@default', body=task_body).execute()
     return jsonify(created_task)
 
-@app.route("/api/google_event_create", methods=["POST"])
+
+@bp.route("/api/google_event_create", methods=["POST"])
 def google_event_create():
     service = get_calendar_service()
     if not service:
         return jsonify({"error": "Not authorized with Google"}), 401
 
     data = request.get_json()
-    print("📌 Incoming event data:", data)
+    logger.debug("Calendar event payload: %s", data)
 
     tz_name = data.get("timezone", "UTC")
 
@@ -445,3 +1227,9 @@ def google_event_create():
 
     created_event = service.events().insert(calendarId='primary', body=event).execute()
     return jsonify(created_event)
+
+
+if __name__ == "__main__":
+    app = create_app()
+    reload_prompt_on_sighup(app)
+    app.run()
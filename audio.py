@@ -0,0 +1,296 @@
+"""Audio preprocessing before speech recognition.
+
+Browser recordings arrive as 48 kHz (often stereo) WebM/Opus or WAV with
+silence at both ends. Google bills and waits for every second we send,
+so prepare_audio() decodes the upload, downmixes to mono, resamples to
+16 kHz, trims leading/trailing silence with an energy VAD and encodes
+the result as FLAC (or Ogg/Opus). Decoding anything but WAV and all
+compressed encoding go through ffmpeg; without it WAV input is sent as
+16 kHz LINEAR16 and other formats are passed through untouched.
+"""
+import io
+import os
+import shutil
+import subprocess
+import wave
+
+import numpy as np
+
+
+TARGET_RATE = 16000
+FRAME_MS = 30
+
+# encodings as named by google.cloud.speech.RecognitionConfig.AudioEncoding
+PASSTHROUGH_ENCODINGS = {
+    "webm": ("WEBM_OPUS", 48000),
+    "ogg": ("OGG_OPUS", 48000),
+    "flac": ("FLAC", None),
+}
+
+
+class AudioError(Exception):
+    """Raised when audio can't be decoded or encoded."""
+
+
+class PreparedAudio:
+    """Bytes ready for the recognizer plus the config that describes them."""
+
+    def __init__(self, content, encoding=None, sample_rate_hertz=None,
+                 duration=None, trimmed=0.0, extension="bin", samples=None,
+                 offset=0.0):
+        self.content = content
+        self.encoding = encoding
+        self.sample_rate_hertz = sample_rate_hertz
+        self.duration = duration      # seconds after trimming, None if unknown
+        self.trimmed = trimmed        # seconds of silence removed
+        self.extension = extension
+        self.samples = samples        # decoded mono float32, kept for chunking
+        self.offset = offset          # start in the whole recording (chunks)
+
+    @property
+    def is_silent(self):
+        return self.duration == 0
+
+
+def ffmpeg_path():
+    return os.getenv("FFMPEG_PATH") or shutil.which("ffmpeg")
+
+
+def ffmpeg_error(proc):
+    return proc.stderr.decode(errors="replace").strip() or "ffmpeg failed"
+
+
+def sniff_format(data):
+    """Container format from the first bytes, or None if unknown."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "wav"
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if data[:4] == b"OggS":
+        return "ogg"
+    if data[:4] == b"fLaC":
+        return "flac"
+    if data[:3] == b"ID3" or data[:2] in (b"\xff\xfb", b"\xff\xf3"):
+        return "mp3"
+    return None
+
+
+# Decoding
+
+def decode_wav(data):
+    """(samples, rate) from PCM WAV; samples are float32, shape
+    (n, channels)."""
+    try:
+        with wave.open(io.BytesIO(data)) as w:
+            channels, width = w.getnchannels(), w.getsampwidth()
+            rate = w.getframerate()
+            frames = w.readframes(w.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise AudioError(f"Invalid WAV: {e}")
+    if width == 1:
+        samples = np.frombuffer(frames, np.uint8).astype(np.float32)
+        samples = (samples - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(frames, "<i2").astype(np.float32) / 32768
+    elif width == 4:
+        samples = np.frombuffer(frames, "<i4").astype(np.float32) / 2147483648
+    else:
+        raise AudioError(f"Unsupported WAV sample width: {width}")
+    return samples.reshape(-1, channels), rate
+
+
+def decode_ffmpeg(data, rate=TARGET_RATE):
+    """Let ffmpeg decode any container straight to mono float32 at `rate`."""
+    ffmpeg = ffmpeg_path()
+    if not ffmpeg:
+        raise AudioError("ffmpeg is not installed")
+    proc = subprocess.run(
+        [ffmpeg, "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+         "-ac", "1", "-ar", str(rate), "-f", "f32le", "pipe:1"],
+        input=data, capture_output=True)
+    if proc.returncode != 0:
+        raise AudioError(ffmpeg_error(proc))
+    return np.frombuffer(proc.stdout, "<f4").reshape(-1, 1), rate
+
+
+def decode(data):
+    if sniff_format(data) == "wav":
+        return decode_wav(data)
+    return decode_ffmpeg(data)
+
+
+# Signal processing (all vectorized)
+
+def to_mono(samples):
+    return samples.mean(axis=1) if samples.ndim == 2 else samples
+
+
+def resample(samples, rate, target=TARGET_RATE, taps=101):
+    """Linear-interpolation resampler with a windowed-sinc low-pass first."""
+    if rate == target or len(samples) == 0:
+        return samples.astype(np.float32)
+    if target < rate:
+        cutoff = 0.5 * target / rate
+        n = np.arange(taps) - (taps - 1) / 2
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+        samples = np.convolve(samples, kernel / kernel.sum(), mode="same")
+    duration = len(samples) / rate
+    positions = np.arange(int(duration * target)) * (rate / target)
+    resampled = np.interp(positions, np.arange(len(samples)), samples)
+    return resampled.astype(np.float32)
+
+
+def frame_energy_db(samples, rate, frame_ms=FRAME_MS):
+    """RMS level of each frame in dBFS."""
+    size = max(int(rate * frame_ms / 1000), 1)
+    n = len(samples) // size
+    if n == 0:
+        return np.empty(0, np.float32)
+    frames = samples[:n * size].reshape(n, size)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def voiced_frames(samples, rate, floor_db=-50.0, margin_db=12.0,
+                  frame_ms=FRAME_MS):
+    """Boolean mask of frames louder than the noise floor.
+
+    The threshold adapts to the recording: margin_db above its quietest
+    tenth of frames, but never below floor_db (absolute silence).
+    """
+    db = frame_energy_db(samples, rate, frame_ms)
+    if len(db) == 0:
+        return np.zeros(0, bool)
+    threshold = max(floor_db, np.percentile(db, 10) + margin_db)
+    return db > threshold
+
+
+def trim_silence(samples, rate, pad_ms=200, **vad_args):
+    """Cut leading/trailing silence, keeping pad_ms around the speech."""
+    voiced = voiced_frames(samples, rate, **vad_args)
+    hits = np.flatnonzero(voiced)
+    if len(hits) == 0:
+        return samples[:0]
+    size = int(rate * vad_args.get("frame_ms", FRAME_MS) / 1000)
+    pad = int(rate * pad_ms / 1000)
+    start = max(hits[0] * size - pad, 0)
+    end = min((hits[-1] + 1) * size + pad, len(samples))
+    return samples[start:end]
+
+
+# Encoding
+
+def to_pcm16(samples):
+    return (np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes()
+
+
+def encode_wav(samples, rate):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(to_pcm16(samples))
+    return buf.getvalue()
+
+
+def encode_ffmpeg(samples, rate, codec):
+    ffmpeg = ffmpeg_path()
+    if not ffmpeg:
+        raise AudioError("ffmpeg is not installed")
+    if codec == "opus":
+        out = ["-c:a", "libopus", "-b:a", "24k", "-f", "ogg"]
+    else:
+        out = ["-c:a", "flac", "-f", "flac"]
+    proc = subprocess.run(
+        [ffmpeg, "-nostdin", "-loglevel", "error",
+         "-f", "s16le", "-ar", str(rate), "-ac", "1", "-i", "pipe:0",
+         *out, "pipe:1"],
+        input=to_pcm16(samples), capture_output=True)
+    if proc.returncode != 0:
+        raise AudioError(ffmpeg_error(proc))
+    return proc.stdout
+
+
+def encode(samples, rate, codec="flac"):
+    """Returns (bytes, encoding, sample_rate_hertz, file extension)."""
+    if codec in ("flac", "opus") and ffmpeg_path():
+        if codec == "opus":
+            # Opus only runs at 8/12/16/24/48 kHz; 16 kHz is one of them
+            return encode_ffmpeg(samples, rate, codec), "OGG_OPUS", rate, "ogg"
+        return encode_ffmpeg(samples, rate, codec), "FLAC", rate, "flac"
+    return encode_wav(samples, rate), "LINEAR16", rate, "wav"
+
+
+def prepare_audio(data, target_rate=TARGET_RATE, codec="flac", trim=True):
+    """Decode, downmix, resample, trim and re-encode an upload.
+
+    Audio we can't decode here (no ffmpeg for WebM, or junk) comes back
+    unchanged, tagged with whatever encoding its header suggests.
+    """
+    try:
+        samples, rate = decode(data)
+    except AudioError:
+        fmt = sniff_format(data)
+        encoding, sample_rate = PASSTHROUGH_ENCODINGS.get(fmt, (None, None))
+        return PreparedAudio(data, encoding, sample_rate,
+                             extension=fmt or "bin")
+
+    samples = resample(to_mono(samples), rate, target_rate)
+    original = len(samples) / target_rate
+    if trim:
+        samples = trim_silence(samples, target_rate)
+    duration = len(samples) / target_rate
+    if duration == 0:
+        return PreparedAudio(b"", None, target_rate, duration=0.0,
+                             trimmed=original)
+    content, encoding, sample_rate, ext = encode(samples, target_rate, codec)
+    return PreparedAudio(content, encoding, sample_rate, duration=duration,
+                         trimmed=original - duration, extension=ext,
+                         samples=samples)
+
+
+# Long recordings
+
+def split_points(samples, rate, max_chunk=30.0, min_chunk=5.0, quiet_ms=300,
+                 frame_ms=FRAME_MS):
+    """Sample offsets to cut at so no piece is longer than max_chunk seconds.
+
+    Each cut lands in the quietest quiet_ms stretch between min_chunk and
+    max_chunk seconds after the previous cut, i.e. in a pause between
+    words whenever the speaker made one.
+    """
+    size = max(int(rate * frame_ms / 1000), 1)
+    db = frame_energy_db(samples, rate, frame_ms)
+    width = max(quiet_ms // frame_ms, 1)
+    # mean level over a sliding window, so one quiet frame mid-word doesn't win
+    smoothed = np.convolve(db, np.ones(width) / width, mode="same")
+    max_frames = int(max_chunk * 1000 / frame_ms)
+    min_frames = min(int(min_chunk * 1000 / frame_ms), max_frames - 1)
+    cuts, pos = [], 0
+    while len(db) - pos > max_frames:
+        window = smoothed[pos + min_frames:pos + max_frames]
+        pos = pos + min_frames + int(np.argmin(window))
+        cuts.append(pos * size)
+    return cuts
+
+
+def chunk_audio(prepared, max_chunk=30.0, overlap=0.5, codec="flac"):
+    """Split prepared audio at pauses into encoded, overlapping chunks.
+
+    Neighbouring chunks share `overlap` seconds so a word cut at a
+    boundary is heard whole by at least one of them; the duplicate text
+    is removed again by transcription.stitch_transcripts().
+    """
+    samples, rate = prepared.samples, prepared.sample_rate_hertz
+    bounds = [0] + split_points(samples, rate, max_chunk) + [len(samples)]
+    pad = int(overlap * rate)
+    chunks = []
+    for start, end in zip(bounds, bounds[1:]):
+        start, end = max(start - pad, 0), min(end + pad, len(samples))
+        piece = samples[start:end]
+        content, encoding, sample_rate, ext = encode(piece, rate, codec)
+        chunks.append(PreparedAudio(content, encoding, sample_rate,
+                                    duration=len(piece) / rate, extension=ext,
+                                    offset=start / rate))
+    return chunks
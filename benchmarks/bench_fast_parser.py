@@ -0,0 +1,99 @@
+"""Accuracy/latency tradeoff of the rule-based fast path in TaskParser.
+
+Usage:
+    python benchmarks/bench_fast_parser.py --llm-ms 1500 --runs 200
+
+Runs every transcript of fast_parse_corpus.jsonl through
+fast_parser.fast_parse() and, for a range of confidence thresholds,
+reports how many transcripts would skip Gemini, how many of those are
+parsed exactly like the labels (wrongly accepted ones included), and the
+expected mean latency per transcript when the rest costs --llm-ms.
+A label of null means the transcript should go to the model.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dates import parse_date  # noqa: E402
+from fast_parser import fast_parse  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fast_parse_corpus.jsonl")
+FIELDS = ("text", "start_time", "end_time", "start_date", "end_date", "repeat", "due")
+
+
+def load_corpus(path=CORPUS):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def matches(tasks, expected, today):
+    """True if fast_parse found exactly the labelled task."""
+    if expected is None or len(tasks) != 1:
+        return False
+    expected, task = dict(expected), dict(tasks[0])
+    due = expected.get("due") or ""
+    if due.startswith("+"):  # relative labels: "+3" = three days from today
+        expected["due"] = (today + timedelta(days=int(due[1:]))).isoformat()
+        task["due"] = task["due"] and str(parse_date(task["due"], today))
+    return all(task.get(field) == expected.get(field) for field in FIELDS)
+
+
+def evaluate(corpus, thresholds, llm_ms, today):
+    results = [(item, *fast_parse(item["transcript"])) for item in corpus]
+    rows = []
+    for threshold in thresholds:
+        accepted = [(item, tasks) for item, tasks, conf in results if tasks and conf >= threshold]
+        correct = sum(matches(tasks, item["expected"], today) for item, tasks in accepted)
+        wrong_skip = sum(item["expected"] is None for item, _ in accepted)
+        to_model = len(corpus) - len(accepted)
+        rows.append({
+            "threshold": threshold,
+            "fast": len(accepted),
+            "correct": correct,
+            "wrongly_fast": wrong_skip,
+            "model_calls": to_model,
+            "mean_ms": to_model * llm_ms / len(corpus),
+        })
+    return rows
+
+
+def time_fast_path(corpus, runs):
+    """Per-transcript fast_parse latency in microseconds."""
+    samples = []
+    for _ in range(runs):
+        for item in corpus:
+            start = time.perf_counter()
+            fast_parse(item["transcript"])
+            samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--corpus", default=CORPUS)
+    ap.add_argument("--llm-ms", type=float, default=1500.0, help="assumed Gemini round trip")
+    ap.add_argument("--runs", type=int, default=200)
+    args = ap.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    today = date.today()
+    p50, p99 = time_fast_path(corpus, args.runs)
+    labelled = sum(item["expected"] is not None for item in corpus)
+    print(f"{len(corpus)} transcripts, {labelled} simple enough for the fast path")
+    print(f"fast_parse: p50 {p50:.1f} us, p99 {p99:.1f} us\n")
+    print(f"{'threshold':>9} {'fast':>5} {'correct':>8} {'wrong':>6} {'model':>6} {'mean ms':>8}")
+    print(f"{'LLM only':>9} {0:>5} {'-':>8} {0:>6} {len(corpus):>6} {args.llm_ms:>8.0f}")
+    for row in evaluate(corpus, (1.0, 0.9, 0.8, 0.6, 0.4, 0.01), args.llm_ms, today):
+        print(f"{row['threshold']:>9} {row['fast']:>5} {row['correct']:>8} {row['wrongly_fast']:>6} "
+              f"{row['model_calls']:>6} {row['mean_ms']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""Load test of the HTTP API, with a JSON report and a regression gate.
+
+Usage:
+    python benchmarks/bench_http.py --requests 50 --threads 4 --out report.json
+    python benchmarks/bench_http.py --baseline benchmarks/http_baseline.json
+    python benchmarks/bench_http.py --save-baseline benchmarks/http_baseline.json
+
+Starts the app on a throwaway database with fake speech and Gemini
+backends (--speech-latency / --gemini-latency seconds per call), then
+has --threads logged-in clients send --requests requests between them
+for each scenario: login, /api/tasks (first page and the full list) for
+users owning --table-sizes tasks, save_task with a model answer of
+--tasks-per-transcript tasks, transcribe_audio on a short clip, and
+theme reads and writes. Every request is a cache miss: the transcript
+and parse caches and the local fast parser are off.
+
+The report has throughput and p50/p95/p99 latency per scenario. With
+--baseline, a scenario whose p95 grew, or whose throughput fell, by more
+than --tolerance (and by more than --min-delta-ms) fails the run with
+exit status 1. Baselines only compare on the machine that made them.
+"""
+import argparse
+import gc
+import io
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import wave
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("FLASK_ENV", "testing")  # keeps the SDK clients offline
+
+from sqlalchemy import insert  # noqa: E402
+from app import create_app  # noqa: E402
+from database import db, Task, User  # noqa: E402
+
+SCENARIOS = ("login", "tasks_page", "tasks_all", "save_task", "transcribe",
+             "theme_get", "theme_save")
+
+
+class FakeGemini:
+    """Stands in for the Gemini model: sleeps, then answers with n tasks."""
+
+    def __init__(self, latency=0.0, tasks=1):
+        self.latency = latency
+        self.tasks = tasks
+
+    def generate_content(self, prompt):
+        if self.latency:
+            time.sleep(self.latency)
+        text = json.dumps([{"text": f"Benchmark task {i}", "due": "tomorrow"}
+                           for i in range(self.tasks)])
+        return type("Response", (object,), {"text": text})()
+
+
+def make_wav(seconds=5.0, rate=16000):
+    """Tone bursts with pauses over faint noise: speech, as far as trimming
+    can tell, so every upload reaches the recognizer."""
+    t = np.arange(int(seconds * rate)) / rate
+    talking = (t % 1.5) < 1.0
+    noise = np.random.default_rng(1).normal(0, 1e-4, len(t))
+    samples = 0.4 * np.sin(2 * np.pi * 300 * t) * talking + noise
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((samples * 32767).astype("<i2").tobytes())
+    return buf.getvalue()
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    return samples[max(math.ceil(p / 100 * len(samples)) - 1, 0)]
+
+
+def summarize(latencies, errors, seconds):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(seconds, 4),
+        "throughput": round(len(latencies) / seconds, 2) if seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+def load_user(app, username, n_tasks):
+    """A user owning n_tasks tasks; the password is always "secret"."""
+    user = User(username=username, pw_hash=app.extensions["passwords"].hash("secret"))
+    db.session.add(user)
+    db.session.commit()
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    if n_tasks:
+        db.session.execute(insert(Task), [{
+            "user_id": user.id, "name": f"task {i}", "completed": i % 3 == 0,
+            "created_at": start + timedelta(seconds=i),
+        } for i in range(n_tasks)])
+        db.session.commit()
+
+
+def run_scenario(app, username, send, expect, requests, threads, warmup=2):
+    """Split `requests` calls of send(client, i) over logged-in client threads,
+    each of which first sends `warmup` untimed ones."""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        client = app.test_client()
+        client.post("/login", data={"username": username, "password": "secret"})
+        for i in range(warmup):
+            send(client, -1 - i)
+        mine, failed = [], 0
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            t0 = time.perf_counter()
+            resp = send(client, i)
+            mine.append((time.perf_counter() - t0) * 1000)
+            failed += resp.status_code != expect
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    gc.collect()  # don't bill this scenario for the previous one's garbage
+    t0 = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return summarize(latencies, sum(errors), time.perf_counter() - t0)
+
+
+def run(args, tmp):
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'http.db')}",
+        "UPLOAD_FOLDER": os.path.join(tmp, "uploads"),
+        "SPEECH_BACKEND": "fake",
+        "SPEECH_FAKE_LATENCY": args.speech_latency,
+        "TRANSCRIPT_CACHE": False,
+        "LOGIN_IP_LIMIT": 0,
+        "LOGIN_USER_LIMIT": 0,
+        "WARM_UP_CLIENTS": False,
+        "LOG_LEVEL": "WARNING",
+    })
+    with app.app_context():
+        db.create_all()
+        load_user(app, "bench", 0)
+        for size in args.table_sizes:
+            load_user(app, f"list{size}", size)
+
+    # a fresh app's own parser: no parse cache, no local fast path
+    task_parser = app.extensions["task_parser"]
+    task_parser.cache = task_parser.fast_threshold = None
+    wav = make_wav()
+    plan = []  # (name, username, send, expected status)
+    if "login" in args.scenarios:
+        plan.append(("login", "bench", lambda c, i: c.post(
+            "/login", data={"username": "bench", "password": "secret"}), 302))
+    for size in args.table_sizes:
+        if "tasks_page" in args.scenarios:
+            plan.append((f"tasks_page_{size}", f"list{size}",
+                         lambda c, i: c.get("/api/tasks?limit=50"), 200))
+        if "tasks_all" in args.scenarios:
+            plan.append((f"tasks_all_{size}", f"list{size}",
+                         lambda c, i: c.get("/api/tasks"), 200))
+    if "transcribe" in args.scenarios:
+        plan.append(("transcribe", "bench", lambda c, i: c.post(
+            "/api/transcribe", data={"audio": (io.BytesIO(wav), "bench.wav")},
+            content_type="multipart/form-data"), 200))
+    if "theme_get" in args.scenarios:
+        plan.append(("theme_get", "bench", lambda c, i: c.get("/api/get_theme"), 200))
+    if "theme_save" in args.scenarios:
+        plan.append(("theme_save", "bench", lambda c, i: c.post(
+            "/api/save_theme", json={"bgPrimary": f"#{i % 0xffffff:06x}"}), 200))
+
+    results = {}
+    try:
+        for name, username, send, expect in plan:
+            results[name] = run_scenario(app, username, send, expect,
+                                         args.requests, args.threads, args.warmup)
+        if "save_task" in args.scenarios:
+            for n in args.tasks_per_transcript:
+                task_parser.model = FakeGemini(args.gemini_latency, n)
+                # distinct transcripts, in case a cache is switched back on
+                send = lambda c, i, n=n: c.post("/api/save_task", json={
+                    "transcript": f"benchmark transcript {n} {i}"})
+                results[f"save_task_{n}"] = run_scenario(app, "bench", send, 200, args.requests,
+                                                         args.threads, args.warmup)
+    finally:
+        app.extensions["passwords"].shutdown()
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "settings": {"requests": args.requests, "threads": args.threads,
+                     "warmup": args.warmup, "speech_latency": args.speech_latency,
+                     "gemini_latency": args.gemini_latency},
+        "scenarios": results,
+    }
+
+
+def compare(report, baseline, tolerance=0.5, min_delta_ms=5.0):
+    """Regressions of `report` against `baseline`, as readable strings.
+
+    Only scenarios present in both are compared; errors always count.
+    """
+    problems = []
+    for name, now in report["scenarios"].items():
+        if now["errors"]:
+            problems.append(f"{name}: {now['errors']} of {now['requests']} requests failed")
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        if now["p95_ms"] > before["p95_ms"] * (1 + tolerance) \
+                and now["p95_ms"] - before["p95_ms"] > min_delta_ms:
+            problems.append(f"{name}: p95 {now['p95_ms']:.1f} ms, "
+                            f"baseline {before['p95_ms']:.1f} ms")
+        if now["throughput"] < before["throughput"] * (1 - tolerance):
+            problems.append(f"{name}: {now['throughput']:.1f} req/s, "
+                            f"baseline {before['throughput']:.1f} req/s")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50, help="per scenario")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=2, help="untimed requests per thread")
+    parser.add_argument("--table-sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--tasks-per-transcript", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--speech-latency", type=float, default=0.05)
+    parser.add_argument("--gemini-latency", type=float, default=0.2)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--baseline", help="fail on regressions against this report")
+    parser.add_argument("--save-baseline", help="write the report here as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--min-delta-ms", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = run(args, tmp)
+
+    print(f"{'scenario':<18} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>6}")
+    for name, r in report["scenarios"].items():
+        print(f"{name:<18} {r['throughput']:>8.1f} {r['p50_ms']:>9.2f} "
+              f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['errors']:>6}")
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+                f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            return 1
+        print(f"no regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
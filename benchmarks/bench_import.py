@@ -0,0 +1,61 @@
+"""How long `import app` takes, and which modules it spends the time on.
+
+Usage:
+    python benchmarks/bench_import.py --runs 5 --top 15
+
+Runs `python -X importtime -c "import app"` in fresh interpreters and
+prints the median cumulative time of app plus the slowest modules from
+the last run. tests/test_import_time.py enforces a budget on the same
+number and keeps the Google SDKs out of the import graph.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# imported on first use only; none of these may load with `import app`
+LAZY_MODULES = (
+    "google.cloud.speech",
+    "google.generativeai",
+    "googleapiclient.discovery",
+    "google_auth_oauthlib.flow",
+    "grpc",
+)
+
+
+def import_times(module="app"):
+    """{module name: cumulative microseconds} for one fresh import."""
+    env = dict(os.environ, FLASK_ENV=os.environ.get("FLASK_ENV", "testing"))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.runs)]
+    total = statistics.median(r["app"] for r in runs) / 1000
+    print(f"import app: {total:.1f} ms (median of {args.runs})")
+    for name, us in sorted(runs[-1].items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+    loaded = [m for m in LAZY_MODULES if m in runs[-1]]
+    if loaded:
+        print(f"eagerly imported: {', '.join(loaded)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Login throughput, and what a login storm does to other requests.
+
+Usage:
+    python benchmarks/bench_login.py --logins 200 --threads 16 --workers 0 2 4
+
+For each PASSWORD_WORKERS value (0 = verify on the request thread) the
+app is started on a throwaway database with one user, --threads client
+threads post --logins logins between them, and one more thread keeps
+requesting a page that does no hashing. Prints logins/s and the p50/p95
+latency of those other requests during the storm.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("FLASK_ENV", "testing")  # keeps the SDK clients offline
+
+from app import create_app  # noqa: E402
+from database import db, User  # noqa: E402
+
+
+def run(workers, method, logins, threads, tmp):
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, f'login{workers}.db')}",
+        "PASSWORD_WORKERS": workers,
+        "PASSWORD_HASH_METHOD": method,
+        "PASSWORD_MAX_PENDING": logins,
+        "LOGIN_IP_LIMIT": 0,
+        "LOGIN_USER_LIMIT": 0,
+        "WARM_UP_CLIENTS": False,
+    })
+    passwords = app.extensions["passwords"]
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username="bench", pw_hash=passwords.hash("secret")))
+        db.session.commit()
+    passwords.verify(None, "warm up the pool")
+
+    done = threading.Event()
+    other = []
+
+    def background():
+        client = app.test_client()
+        while not done.is_set():
+            t0 = time.perf_counter()
+            client.get("/sign_up")
+            other.append((time.perf_counter() - t0) * 1000)
+
+    def storm(n):
+        client = app.test_client()
+        for _ in range(n):
+            resp = client.post("/login", data={"username": "bench", "password": "secret"})
+            assert resp.status_code == 302, resp.status_code
+            client.get("/logout")
+
+    watcher = threading.Thread(target=background)
+    watcher.start()
+    per_thread = [logins // threads + (i < logins % threads) for i in range(threads)]
+    clients = [threading.Thread(target=storm, args=(n,)) for n in per_thread]
+    t0 = time.perf_counter()
+    for t in clients:
+        t.start()
+    for t in clients:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    done.set()
+    watcher.join()
+    passwords.shutdown()
+
+    other.sort()
+    return logins / elapsed, statistics.median(other), other[int(len(other) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--method", default="pbkdf2:sha256:600000")
+    args = parser.parse_args()
+
+    print(f"{args.logins} logins, {args.threads} threads, {args.method}")
+    print(f"{'workers':>7} {'logins/s':>9} {'other p50 ms':>13} {'other p95 ms':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in args.workers:
+            rate, p50, p95 = run(workers, args.method, args.logins, args.threads, tmp)
+            print(f"{workers:>7} {rate:>9.1f} {p50:>13.2f} {p95:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
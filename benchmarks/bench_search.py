@@ -0,0 +1,109 @@
+"""/api/search latency: the FTS5 index against a LIKE scan.
+
+Usage:
+    python benchmarks/bench_search.py --tasks 1000000 --users 1000
+
+Loads a throwaway SQLite database with generated tasks (the triggers
+fill the search index while loading), then times database.search() and
+the equivalent `name LIKE %word% OR raw_text LIKE %word%` query for a
+common word, a rare word, a prefix and a two-word query.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import insert, or_  # noqa: E402
+from database import db, init_db, search, Task, User  # noqa: E402
+
+VERBS = ["buy", "call", "email", "finish", "clean", "book", "pay", "send", "review", "fix"]
+OBJECTS = ["groceries", "report", "plumber", "rent", "slides", "dentist", "invoice",
+           "kitchen", "car", "flights", "homework", "garden", "insurance", "laptop"]
+FILLER = ["for", "the", "before", "meeting", "with", "team", "mom", "landlord", "friday",
+          "tomorrow", "again", "quickly", "project", "budget", "weekend", "client"]
+RARE = "zeppelin"
+
+QUERIES = {
+    "common word": "report",
+    "rare word": RARE,
+    "prefix": "gro",
+    "two words": "pay rent",
+}
+
+
+def load(n_tasks, n_users, batch=50000):
+    db.session.execute(insert(User), [
+        {"username": f"user{i}", "pw_hash": "x"} for i in range(n_users)])
+    for offset in range(0, n_tasks, batch):
+        rows = []
+        for i in range(offset, min(offset + batch, n_tasks)):
+            name = f"{random.choice(VERBS)} {random.choice(OBJECTS)}"
+            words = random.choices(FILLER, k=8)
+            if i % 10000 == 0:
+                words.append(RARE)
+            rows.append({"user_id": random.randint(1, n_users), "name": name,
+                         "raw_text": f"{name} {' '.join(words)}"})
+        db.session.execute(insert(Task), rows)
+    db.session.commit()
+
+
+def like_search(user_id, terms, limit=20):
+    query = Task.query.filter(Task.user_id == user_id)
+    for word in terms.split():
+        query = query.filter(or_(Task.name.like(f"%{word}%"), Task.raw_text.like(f"%{word}%")))
+    return query.limit(limit).all()
+
+
+def like_search_all(terms):
+    # what a cross-user scan costs: no user_id index to lean on
+    query = Task.query
+    for word in terms.split():
+        query = query.filter(or_(Task.name.like(f"%{word}%"), Task.raw_text.like(f"%{word}%")))
+    return query.count()
+
+
+def time_query(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = \
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        init_db(app)
+        with app.app_context():
+            db.create_all()
+            t0 = time.perf_counter()
+            load(args.tasks, args.users)
+            print(f"loaded and indexed {args.tasks} tasks in "
+                  f"{time.perf_counter() - t0:.1f}s")
+
+            user_id = random.randint(1, args.users)
+            print(f"{'query':12} {'fts5 ms':>9} {'like ms':>9} {'like, all users':>16}")
+            for label, terms in QUERIES.items():
+                fts = time_query(lambda: search(user_id, terms, limit=20), args.repeat)
+                like = time_query(lambda: like_search(user_id, terms), args.repeat)
+                scan = time_query(lambda: like_search_all(terms), max(args.repeat // 10, 1))
+                print(f"{label:12} {fts:9.3f} {like:9.3f} {scan:16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Per-user task listing latency with and without the composite indexes.
+
+Usage:
+    python benchmarks/bench_task_list.py --tasks 1000000 --users 1000
+
+Loads a throwaway SQLite database with the given number of tasks spread
+over the users, then times the queries behind index()/get_all_tasks
+(user_id + ORDER BY created_at DESC) and the completed filter, first
+without and then with the indexes from database.py.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import insert, text  # noqa: E402
+from database import db, init_db, Task, User, upgrade_schema  # noqa: E402
+
+
+def load(n_tasks, n_users, batch=50000):
+    db.session.execute(insert(User), [
+        {"username": f"user{i}", "pw_hash": "x"} for i in range(n_users)])
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+    for offset in range(0, n_tasks, batch):
+        rows = [{
+            "user_id": random.randint(1, n_users),
+            "name": f"task {i}",
+            "completed": i % 3 == 0,
+            "created_at": start + timedelta(seconds=i * 7),
+        } for i in range(offset, min(offset + batch, n_tasks))]
+        db.session.execute(insert(Task), rows)
+    db.session.commit()
+
+
+def time_query(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def run_queries(n_users, repeat):
+    user_id = random.randint(1, n_users)
+    listing = lambda: Task.query.filter_by(user_id=user_id) \
+        .order_by(Task.created_at.desc()).limit(50).all()
+    open_tasks = lambda: Task.query.filter_by(user_id=user_id,
+                                              completed=False).count()
+    return {
+        "list_first_page_ms": time_query(listing, repeat),
+        "count_open_ms": time_query(open_tasks, repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = \
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        init_db(app)
+        with app.app_context():
+            db.create_all()
+            index_names = [ix.name for t in db.metadata.sorted_tables
+                           for ix in t.indexes]
+            for name in index_names:
+                db.session.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            t0 = time.perf_counter()
+            load(args.tasks, args.users)
+            print(f"loaded {args.tasks} tasks in "
+                  f"{time.perf_counter() - t0:.1f}s")
+
+            before = run_queries(args.users, args.repeat)
+            t0 = time.perf_counter()
+            upgrade_schema()
+            db.session.execute(text("ANALYZE"))
+            print(f"built indexes in {time.perf_counter() - t0:.1f}s")
+            after = run_queries(args.users, args.repeat)
+
+        for key in before:
+            print(f"{key:22} no index {before[key]:9.3f}  "
+                  f"indexed {after[key]:9.3f}  "
+                  f"({before[key] / max(after[key], 1e-6):.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
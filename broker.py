@@ -0,0 +1,94 @@
+"""In-process pub/sub for per-user change events.
+
+Routes and background jobs publish task deltas for a user; every open
+/api/stream connection of that user gets them as server-sent events.
+Each subscriber has a bounded queue: a client that stops reading can't
+grow memory, it just gets a "resync" event telling it to refetch.
+"""
+import json
+import queue
+import threading
+from collections import defaultdict
+
+
+class Subscription:
+    def __init__(self, user_id, max_queue):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+
+class Broker:
+    def __init__(self, max_queue=100, app=None):
+        self.max_queue = max_queue
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._next_id = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("SSE_QUEUE_SIZE", self.max_queue)
+        self.max_queue = app.config["SSE_QUEUE_SIZE"]
+        app.extensions["broker"] = self
+
+    def subscribe(self, user_id):
+        sub = Subscription(user_id, self.max_queue)
+        with self._lock:
+            self._subscribers[user_id].add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.user_id]
+
+    def subscriber_count(self, user_id=None):
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscribers.get(user_id, ()))
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def publish(self, user_id, event, data):
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+            self._next_id += 1
+            message = (self._next_id, event, json.dumps(data))
+        for sub in subs:
+            try:
+                sub.queue.put_nowait(message)
+            except queue.Full:
+                sub.overflowed = True
+
+    def stream(self, user_id, heartbeat=15.0):
+        """Subscribe and yield SSE-formatted text until disconnect.
+
+        The subscription is made when iteration starts, inside the
+        try/finally that drops it, so a response that is never iterated
+        (client gone early, HEAD request) holds none. A comment line goes
+        out every `heartbeat` seconds of silence so proxies keep the
+        connection open and dead clients get noticed.
+        """
+        sub = self.subscribe(user_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                if sub.overflowed:
+                    # the client missed events: drop the backlog and ask
+                    # it to refetch
+                    sub.overflowed = False
+                    while not sub.queue.empty():
+                        sub.queue.get_nowait()
+                    yield "event: resync\ndata: {}\n\n"
+                    continue
+                try:
+                    event_id, event, data = sub.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+        finally:
+            self.unsubscribe(sub)
@@ -0,0 +1,172 @@
+"""One place that builds (and keeps) the Google SDK clients.
+
+SpeechClient and the Gemini model are built once per registry (one per
+app) on first use. Tasks/Calendar services are built once per credential
+(and per thread, because the httplib2 transport they sit on is not
+thread-safe) from a discovery document that is parsed once and cached on
+disk.
+Tests swap any of them out with override()/override_service().
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+logger = logging.getLogger(__name__)
+
+
+class ClientRegistry:
+    def __init__(self, discovery_cache_dir=None, max_services=256):
+        self.discovery_cache_dir = discovery_cache_dir
+        self.max_services = max_services
+        self._factories = {}
+        self._instances = {}
+        self._documents = {}
+        self._services = OrderedDict()
+        self._service_overrides = {}
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        """Take the discovery cache dir from config; warm up if asked to."""
+        app.config.setdefault("DISCOVERY_CACHE_DIR", self.discovery_cache_dir)
+        app.config.setdefault("WARM_UP_CLIENTS", False)
+        self.discovery_cache_dir = app.config["DISCOVERY_CACHE_DIR"]
+        app.extensions["clients"] = self
+        if app.config["WARM_UP_CLIENTS"]:
+            threading.Thread(target=self.warm_up, daemon=True, kwargs={
+                "names": tuple(self._factories),
+                "services": (("tasks", "v1"), ("calendar", "v3")),
+            }).start()
+
+    # process-wide clients
+
+    def register(self, name, factory):
+        """Register a zero-argument factory building the client `name`."""
+        self._factories[name] = factory
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def override(self, name, instance):
+        with self._lock:
+            self._instances[name] = instance
+
+    def reset(self, name=None):
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+                self._services.clear()
+                self._service_overrides.clear()
+            else:
+                self._instances.pop(name, None)
+
+    # discovery-based services (Tasks, Calendar)
+
+    def discovery_document(self, api, version):
+        """Parsed discovery doc: memory, then the disk cache, then the SDK."""
+        key = (api, version)
+        doc = self._documents.get(key)
+        if doc is not None:
+            return doc
+        path = None
+        if self.discovery_cache_dir:
+            path = os.path.join(self.discovery_cache_dir,
+                                f"{api}.{version}.json")
+        text = None
+        if path and os.path.exists(path):
+            with open(path) as f:
+                text = f.read()
+        if text is None:
+            from googleapiclient import discovery_cache
+            text = discovery_cache.get_static_doc(api, version)
+            if text is None:
+                return None
+            if path:
+                # write a temp file and rename it, so readers never see
+                # half a doc
+                os.makedirs(self.discovery_cache_dir, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=self.discovery_cache_dir,
+                                           suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w") as f:
+                        f.write(text)
+                    os.replace(tmp, path)
+                except BaseException:
+                    os.unlink(tmp)
+                    raise
+        doc = json.loads(text)
+        self._documents[key] = doc
+        return doc
+
+    def override_service(self, api, version, service):
+        """Use `service` for (api, version) regardless of credentials.
+
+        Passing None removes the override again.
+        """
+        if service is None:
+            self._service_overrides.pop((api, version), None)
+        else:
+            self._service_overrides[(api, version)] = service
+
+    def service(self, api, version, credentials_info):
+        override = self._service_overrides.get((api, version))
+        if override is not None:
+            return override
+        key = (api, version, credential_key(credentials_info),
+               threading.get_ident())
+        with self._lock:
+            service = self._services.get(key)
+            if service is not None:
+                self._services.move_to_end(key)
+                return service
+        service = self._build_service(api, version, credentials_info)
+        with self._lock:
+            self._services[key] = service
+            while len(self._services) > self.max_services:
+                self._services.popitem(last=False)
+        return service
+
+    def _build_service(self, api, version, credentials_info):
+        import google.oauth2.credentials
+        from googleapiclient.discovery import build, build_from_document
+
+        creds = google.oauth2.credentials.Credentials(**credentials_info)
+        doc = self.discovery_document(api, version)
+        if doc is None:
+            return build(api, version, credentials=creds)
+        return build_from_document(doc, credentials=creds)
+
+    def warm_up(self, names=(), services=()):
+        """Build clients and load discovery docs ahead of the first request."""
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.warning("Warm-up of %s client failed: %s", name, e)
+        for api, version in services:
+            try:
+                self.discovery_document(api, version)
+            except Exception as e:
+                logger.warning("Loading %s %s discovery doc failed: %s",
+                               api, version, e)
+
+
+def credential_key(credentials_info):
+    """Stable id for a stored credential, so refreshed tokens reuse a
+    service."""
+    ident = {k: credentials_info.get(k)
+             for k in ("refresh_token", "client_id", "scopes")}
+    if not ident["refresh_token"]:
+        ident["token"] = credentials_info.get("token")
+    raw = json.dumps(ident, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
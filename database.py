@@ -1,13 +1,97 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime, timezone
-from typing import Optional, List
+from datetime import date, datetime, timezone
+from typing import Optional, List, Tuple
 from flask_login import UserMixin
-from sqlalchemy import Text
+from sqlalchemy import (Text, insert, update, event, text,
+                        inspect as sa_inspect, or_, and_, func)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+from functools import partial
+from dates import local_today, parse_date, typed_task_fields
+import base64
+import binascii
 import json
+import os
+import re
 
 # create a SQLite database
 db = SQLAlchemy()
 
+# Engine configuration
+# Production-friendly SQLite defaults: WAL lets readers run alongside a
+# writer, busy_timeout waits for the lock instead of failing with
+# "database is locked", and mmap/cache keep hot pages in memory.
+DEFAULT_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,          # ms
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64000,          # negative = KiB, so ~64MB
+}
+
+DEFAULT_POOL_OPTIONS = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_recycle": 1800,          # seconds
+    "pool_pre_ping": True,
+}
+
+
+def configure_database(app):
+    """Resolve the database URI and engine options before db.init_app.
+
+    Precedence, lowest to highest: whatever app.config already holds, a
+    JSON file named by ECHONOTE_DB_CONFIG, then environment variables
+    (DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE).
+    Setting DATABASE_URL to a postgresql:// URI points the app at Postgres.
+    """
+    config_file = os.getenv("ECHONOTE_DB_CONFIG")
+    if config_file:
+        app.config.from_file(os.path.abspath(config_file), load=json.load)
+
+    uri = (os.getenv("DATABASE_URL")
+           or app.config.get("SQLALCHEMY_DATABASE_URI"))
+    if uri and uri.startswith("postgres://"):
+        uri = "postgresql://" + uri[len("postgres://"):]  # Heroku-style URLs
+    app.config["SQLALCHEMY_DATABASE_URI"] = uri
+
+    options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    in_memory = uri.startswith("sqlite") and (
+        ":memory:" in uri or uri.rstrip("/") == "sqlite:")
+    if not in_memory:
+        for key, value in DEFAULT_POOL_OPTIONS.items():
+            options.setdefault(key, value)
+        for env_name, key in (("DB_POOL_SIZE", "pool_size"),
+                              ("DB_MAX_OVERFLOW", "max_overflow"),
+                              ("DB_POOL_RECYCLE", "pool_recycle")):
+            if os.getenv(env_name):
+                options[key] = int(os.getenv(env_name))
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+    pragmas = dict(DEFAULT_SQLITE_PRAGMAS)
+    pragmas.update(app.config.get("SQLITE_PRAGMAS") or {})
+    app.config["SQLITE_PRAGMAS"] = pragmas
+
+
+def _apply_sqlite_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def init_db(app):
+    """Configure the engine(s) and bind db to the app."""
+    configure_database(app)
+    db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == "sqlite":
+                event.listen(engine, "connect",
+                             partial(_apply_sqlite_pragmas,
+                                     app.config["SQLITE_PRAGMAS"]))
+
 #define the events model
 class Event(db.Model):
     __tablename__ = 'events'
@@ -19,6 +103,20 @@ class Event(db.Model):
     end_time = db.Column(db.DateTime, nullable=True)
     recurrence = db.Column(db.String(50), nullable=True)  # e.g., 'daily', 'weekly', 'monthly'
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    # Google Calendar sync: the task this event mirrors, the remote event id,
+    # and a hash of the body last pushed (unchanged hash = nothing to send)
+    task_id = db.Column(db.Integer,
+                        db.ForeignKey('tasks.id', ondelete='CASCADE'),
+                        nullable=True)
+    remote_id = db.Column(db.String(255), nullable=True)
+    sync_hash = db.Column(db.String(64), nullable=True)
+    synced_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_events_user_start', 'user_id', 'start_time'),
+        db.Index('ix_events_user_remote', 'user_id', 'remote_id'),
+        db.Index('ix_events_task', 'task_id'),
+    )
 
     def __repr__(self):
         return (f"<Event(id={self.id}, user_id={self.user_id}, "
@@ -29,15 +127,27 @@ class User(UserMixin, db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    pw_hash = db.Column(db.String(128), nullable=False)
+    # scrypt hashes run to ~162 chars
+    pw_hash = db.Column(db.String(256), nullable=False)
     tasks = db.relationship('Task', backref='owner', lazy=True, cascade="all, delete-orphan")
     events = db.relationship('Event', backref='owner', lazy=True, cascade="all, delete-orphan")
     theme = db.Column(db.Text, nullable=True)
+    # bumped on every task/theme change; drives ETag/Last-Modified on reads
+    data_version = db.Column(db.Integer, nullable=False, default=0,
+                             server_default='0')
+    data_modified_at = db.Column(db.DateTime, nullable=True)
 
     def get_theme(self):
-        if self.theme:
-            return json.loads(self.theme)
-        return None
+        # parsed once per theme string (user_cache primes it from the cache)
+        parsed = getattr(self, "_parsed_theme", None)
+        if parsed is not None and parsed[0] == self.theme:
+            return parsed[1]
+        value = json.loads(self.theme) if self.theme else None
+        self.prime_theme(value)
+        return value
+
+    def prime_theme(self, value):
+        self._parsed_theme = (self.theme, value)
 
 # define the Task model
 class Task(db.Model):
@@ -54,37 +164,464 @@ class Task(db.Model):
     start_time = db.Column(db.String(50), nullable=True)
     end_time = db.Column(db.String(50), nullable=True)
     recurrence = db.Column(db.String(50), nullable=True)  
+    # the fields above resolved to real dates/times when the task is saved
+    # (dates.typed_task_fields); the strings keep what the user said
+    due_on = db.Column(db.Date, nullable=True)
+    start_on = db.Column(db.Date, nullable=True)
+    end_on = db.Column(db.Date, nullable=True)
+    starts_at = db.Column(db.Time, nullable=True)
+    ends_at = db.Column(db.Time, nullable=True)
+    # Google Tasks sync: remote task id, hash of the body last pushed, when
+    remote_id = db.Column(db.String(255), nullable=True)
+    sync_hash = db.Column(db.String(64), nullable=True)
+    synced_at = db.Column(db.DateTime, nullable=True)
+    calendar_events = db.relationship('Event', backref='task', lazy=True,
+                                      cascade="all, delete-orphan")
+
+    # every hot query filters on user_id, then sorts or filters on these
+    __table_args__ = (
+        db.Index('ix_tasks_user_created', 'user_id', 'created_at'),
+        db.Index('ix_tasks_user_completed', 'user_id', 'completed'),
+        db.Index('ix_tasks_user_remote', 'user_id', 'remote_id'),
+        db.Index('ix_tasks_user_due', 'user_id', 'due_on'),
+        db.Index('ix_tasks_user_start', 'user_id', 'start_on'),
+    )
+
+    def to_dict(self):
+        def iso(value):
+            return value.isoformat() if value else None
+
+        def hhmm(value):
+            return value.strftime("%H:%M") if value else None
+
+        return {
+            "id": self.id,
+            "name": self.name,
+            "completed": self.completed,
+            "created_at": iso(self.created_at),
+            "due_date": self.due_date,
+            "raw_text": self.raw_text,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "recurrence": self.recurrence,
+            "due_on": iso(self.due_on),
+            "start_on": iso(self.start_on),
+            "end_on": iso(self.end_on),
+            "starts_at": hhmm(self.starts_at),
+            "ends_at": hhmm(self.ends_at),
+            "remote_id": self.remote_id,
+            "synced_at": iso(self.synced_at),
+        }
 
     def __repr__(self):
         return (f"<Task(id={self.id}, user_id={self.user_id}, "
                 f"name='{self.name}', completed={self.completed}, due_date='{self.due_date}')>")
 
+
+# define the background job model
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    # 'transcribe', 'parse' or 'pipeline'
+    kind = db.Column(db.String(20), nullable=False)
+    # queued, running, retrying, done, failed
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    # JSON input, e.g. the transcript
+    payload = db.Column(db.Text, nullable=True)
+    audio = db.Column(db.LargeBinary, nullable=True)
+    result = db.Column(db.Text, nullable=True)  # JSON output
+    error = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime,
+                           default=lambda: datetime.now(timezone.utc))
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "attempts": self.attempts,
+            "result": json.loads(self.result) if self.result else None,
+            "error": self.error,
+        }
+
+    def __repr__(self):
+        return (f"<Job(id={self.id}, kind='{self.kind}', "
+                f"status='{self.status}')>")
+
+
+# uploaded audio: one row per (user, file); the bytes live in
+# storage.AudioStore
+class AudioFile(db.Model):
+    __tablename__ = 'audio_files'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    size = db.Column(db.Integer, nullable=False)
+    original_name = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'sha256',
+                            name='uq_audio_files_user_sha256'),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "sha256": self.sha256,
+            "size": self.size,
+            "original_name": self.original_name,
+            "created_at": (self.created_at.isoformat()
+                           if self.created_at else None),
+        }
+
+
+# recognizer output by audio hash, so the same audio is never recognized twice
+class TranscriptCache(db.Model):
+    __tablename__ = 'transcript_cache'
+    sha256 = db.Column(db.String(64), primary_key=True)
+    # backend/language/codec
+    settings = db.Column(db.String(100), primary_key=True)
+    transcript = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+# per-user cursor for pulling changes back from Google
+class SyncState(db.Model):
+    __tablename__ = 'sync_state'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    resource = db.Column(db.String(20), nullable=False)  # tasks/calendar
+    sync_token = db.Column(db.Text, nullable=True)  # Calendar nextSyncToken
+    last_pulled_at = db.Column(db.DateTime, nullable=True)  # Tasks updatedMin
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'resource',
+                            name='uq_sync_state_user_resource'),
+    )
+
+
+# Full-text search (SQLite FTS5)
+# One index over task names/raw text and event titles/descriptions, kept
+# current by triggers, so every write path (bulk inserts, Google pulls)
+# is covered. Rowids are id*2 for tasks and id*2+1 for events, which lets
+# the triggers delete by rowid instead of scanning. user_id is an indexed
+# column so "this user's matches" is part of the MATCH itself (the search
+# terms are limited to title and body).
+SEARCH_TABLE = "search_index"
+
+SEARCH_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        kind UNINDEXED, user_id, title, body,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')""",
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_search_insert
+        AFTER INSERT ON tasks BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, kind, user_id, title, body)
+        VALUES (new.id * 2, 'task', new.user_id, new.name, new.raw_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_search_update
+        AFTER UPDATE OF name, raw_text, user_id ON tasks BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2;
+        INSERT INTO {SEARCH_TABLE}(rowid, kind, user_id, title, body)
+        VALUES (new.id * 2, 'task', new.user_id, new.name, new.raw_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_search_delete
+        AFTER DELETE ON tasks BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS events_search_insert
+        AFTER INSERT ON events BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, kind, user_id, title, body)
+        VALUES (new.id * 2 + 1, 'event', new.user_id, new.title,
+                new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS events_search_update
+        AFTER UPDATE OF title, description, user_id ON events BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2 + 1;
+        INSERT INTO {SEARCH_TABLE}(rowid, kind, user_id, title, body)
+        VALUES (new.id * 2 + 1, 'event', new.user_id, new.title,
+                new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS events_search_delete
+        AFTER DELETE ON events BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2 + 1;
+    END""",
+]
+
+SEARCH_REBUILD = [
+    f"DELETE FROM {SEARCH_TABLE}",
+    f"""INSERT INTO {SEARCH_TABLE}(rowid, kind, user_id, title, body)
+        SELECT id * 2, 'task', user_id, name, raw_text FROM tasks""",
+    f"""INSERT INTO {SEARCH_TABLE}(rowid, kind, user_id, title, body)
+        SELECT id * 2 + 1, 'event', user_id, title, description FROM events""",
+]
+
+
+def _create_search_index(target, connection, **kw):
+    # events is created after tasks (it references it), so this runs with
+    # both in place
+    if connection.dialect.name == "sqlite":
+        for statement in SEARCH_DDL:
+            connection.execute(text(statement))
+
+
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+
+
+event.listen(Event.__table__, "after_create", _create_search_index)
+event.listen(Task.__table__, "after_drop", _drop_search_index)
+
+
+def ensure_search_index() -> bool:
+    """Create and fill the search index if this database lacks it."""
+    if db.engine.dialect.name != "sqlite":
+        return False
+    if SEARCH_TABLE in sa_inspect(db.engine).get_table_names():
+        return False
+    with db.engine.begin() as conn:
+        _create_search_index(None, conn)
+        for statement in SEARCH_REBUILD:
+            conn.execute(text(statement))
+    return True
+
+
+# Schema upgrades for existing databases
+def upgrade_schema() -> List[str]:
+    """Bring an existing database up to the current models.
+
+    create_all only creates missing tables, so columns and indexes added to
+    tables that already exist have to be created here. Safe to run
+    repeatedly; returns the names of the columns and indexes it created.
+    """
+    db.create_all()
+    created = []
+    inspector = sa_inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        # columns added to a model after its table was created
+        columns = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                with db.engine.begin() as conn:
+                    conn.execute(text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                created.append(f"{table.name}.{column.name}")
+            elif widen_column(table, column, inspector):
+                created.append(f"{table.name}.{column.name}")
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                created.append(index.name)
+    if ensure_search_index():
+        created.append(SEARCH_TABLE)
+    return created
+
+
+def widen_column(table, column, inspector) -> bool:
+    """Grow a VARCHAR column that is shorter in the database than in the
+    model.
+
+    SQLite doesn't enforce VARCHAR lengths, so only other databases need it.
+    """
+    length = getattr(column.type, "length", None)
+    if not length or db.engine.dialect.name == "sqlite":
+        return False
+    current = next(c["type"] for c in inspector.get_columns(table.name)
+                   if c["name"] == column.name)
+    if not getattr(current, "length", None) or current.length >= length:
+        return False
+    if db.engine.dialect.name == "mysql":
+        null = "NULL" if column.nullable else "NOT NULL"
+        ddl = (f"ALTER TABLE {table.name} MODIFY {column.name} "
+               f"VARCHAR({length}) {null}")
+    else:
+        ddl = (f"ALTER TABLE {table.name} ALTER COLUMN {column.name} "
+               f"TYPE VARCHAR({length})")
+    with db.engine.begin() as conn:
+        conn.execute(text(ddl))
+    return True
+
+
+def normalize_task_dates(batch: int = 1000) -> int:
+    """Fill the typed date/time columns of tasks saved before they existed.
+
+    Relative strings ("Tomorrow") are resolved against the day the task
+    was created. Returns how many tasks were updated.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        tasks = Task.query.filter(Task.id > last_id, Task.due_on.is_(None),
+                                  Task.start_on.is_(None),
+                                  Task.starts_at.is_(None)) \
+                          .order_by(Task.id).limit(batch).all()
+        if not tasks:
+            break
+        for task in tasks:
+            created = task.created_at.date() if task.created_at else None
+            fields = typed_task_fields(
+                {f: getattr(task, f) for f in TASK_FIELDS}, today=created)
+            if any(value is not None for value in fields.values()):
+                for key, value in fields.items():
+                    setattr(task, key, value)
+                updated += 1
+        last_id = tasks[-1].id
+        db.session.commit()
+    return updated
+
+
+_user_change_listeners = []
+
+
+def on_user_change(fn):
+    """Call fn(user_id) once a bump_user_version for that user is
+    committed."""
+    _user_change_listeners.append(fn)
+    return fn
+
+
+def bump_user_version(user_id: int) -> None:
+    """Mark the user's data as changed; committed with the caller's changes."""
+    db.session.execute(update(User).where(User.id == user_id).values(
+        data_version=User.data_version + 1,
+        data_modified_at=datetime.now(timezone.utc)))
+    db.session.info.setdefault("_changed_users", set()).add(user_id)
+
+
+# listeners run only after the commit: run before it, a concurrent request
+# could re-cache the old row in between and serve it until the entry expires
+@event.listens_for(Session, "after_commit")
+def _notify_user_change(session):
+    for user_id in session.info.pop("_changed_users", ()):
+        for fn in _user_change_listeners:
+            fn(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_user_change(session):
+    session.info.pop("_changed_users", None)
+
 # CRUD operations for Tasks
 
-def create_task(user_id: int, name: str, due_date: Optional[str] = None, raw_text: Optional[str] = None,
-                start_date: Optional[str] = None, end_date: Optional[str] = None, start_time: Optional[str] = None, end_time: Optional[str] = None, recurrence: Optional[str] = None) -> Task:
-    task = Task(user_id=user_id, name=name, due_date=due_date, raw_text=raw_text,
-                start_date=start_date, end_date=end_date,
-                start_time=start_time, end_time=end_time, recurrence=recurrence)
+def create_task(user_id: int, name: str, due_date: Optional[str] = None,
+                raw_text: Optional[str] = None,
+                start_date: Optional[str] = None,
+                end_date: Optional[str] = None,
+                start_time: Optional[str] = None,
+                end_time: Optional[str] = None,
+                recurrence: Optional[str] = None,
+                tz_name: Optional[str] = None) -> Task:
+    fields = dict(due_date=due_date, raw_text=raw_text, start_date=start_date,
+                  end_date=end_date, start_time=start_time, end_time=end_time,
+                  recurrence=recurrence)
+    task = Task(user_id=user_id, name=name, **fields,
+                **typed_task_fields(fields, tz_name=tz_name))
     db.session.add(task)
+    bump_user_version(user_id)
     db.session.commit()
     return task
 
+
+TASK_FIELDS = ("name", "due_date", "raw_text", "start_date", "end_date",
+               "start_time", "end_time", "recurrence")
+
+
+def create_tasks_bulk(user_id: int, tasks: List[dict],
+                      tz_name: Optional[str] = None) -> List[int]:
+    """Insert many tasks in one statement/transaction and return their ids.
+
+    Each dict uses the create_task keyword names. Ids come back in the same
+    order as `tasks`. Relative dates resolve against today in tz_name.
+    """
+    if not tasks:
+        return []
+    today = local_today(tz_name)
+    rows = [{"user_id": user_id,
+             **{field: task.get(field) for field in TASK_FIELDS},
+             **typed_task_fields(task, today=today)}
+            for task in tasks]
+    stmt = insert(Task).returning(Task.id, sort_by_parameter_order=True)
+    ids = list(db.session.execute(stmt, rows).scalars())
+    bump_user_version(user_id)
+    db.session.commit()
+    return ids
+
 def get_all_tasks(user_id: int) -> List[Task]:
     return Task.query.filter_by(user_id=user_id) \
                      .order_by(Task.created_at.desc()) \
                      .all()
 
+
+def encode_cursor(task: Task) -> str:
+    raw = f"{task.created_at.isoformat()}|{task.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, task_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(task_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def list_tasks_page(user_id: int, limit: int = 50,
+                    cursor: Optional[str] = None,
+                    completed: Optional[bool] = None,
+                    created_from: Optional[datetime] = None,
+                    created_to: Optional[datetime] = None,
+                    due_from: Optional[date] = None,
+                    due_to: Optional[date] = None):
+    """One page of a user's tasks, newest first, plus the cursor for the
+    next.
+
+    Keyset pagination on (created_at, id): each page starts right after the
+    last row of the previous one, so it costs the same on page 1 and page
+    1000 and it rides the (user_id, created_at) index.
+    """
+    query = Task.query.filter(Task.user_id == user_id)
+    if completed is not None:
+        query = query.filter(Task.completed == completed)
+    if created_from is not None:
+        query = query.filter(Task.created_at >= created_from)
+    if created_to is not None:
+        query = query.filter(Task.created_at < created_to)
+    if due_from is not None:
+        query = query.filter(Task.due_on >= due_from)
+    if due_to is not None:
+        query = query.filter(Task.due_on <= due_to)
+    if cursor:
+        after_created, after_id = decode_cursor(cursor)
+        query = query.filter(or_(Task.created_at < after_created,
+                                 and_(Task.created_at == after_created,
+                                      Task.id < after_id)))
+    rows = query.order_by(Task.created_at.desc(), Task.id.desc()) \
+                .limit(limit + 1).all()
+    tasks = rows[:limit]
+    next_cursor = encode_cursor(tasks[-1]) if len(rows) > limit else None
+    return tasks, next_cursor
+
 def get_task(task_id: int) -> Optional[Task]:
-    return Task.query.get(task_id)
+    return db.session.get(Task, task_id)
 
 def update_task(task_id: int,
     name: Optional[str] = None,
     completed: Optional[bool] = None,
     due_date: Optional[str] = None,
-    raw_text: Optional[str] = None
+    raw_text: Optional[str] = None,
+    tz_name: Optional[str] = None
 ) -> Optional[Task]:
-    task = Task.query.get(task_id)
+    task = db.session.get(Task, task_id)
     if not task:
         return None
 
@@ -94,17 +631,20 @@ def update_task(task_id: int,
         task.completed = completed
     if due_date is not None:
         task.due_date = due_date
+        task.due_on = parse_date(due_date, tz_name=tz_name) or task.start_on
     if raw_text is not None:
         task.raw_text = raw_text
 
+    bump_user_version(task.user_id)
     db.session.commit()
     return task
 
 def delete_task(task_id: int) -> bool:
-    task = Task.query.get(task_id)
+    task = db.session.get(Task, task_id)
     if not task:
         return False
     db.session.delete(task)
+    bump_user_version(task.user_id)
     db.session.commit()
     return True
 
@@ -126,12 +666,12 @@ def get_all_events(user_id: int) -> List[Event]:
                      .all()
 
 def get_event(event_id: int) -> Optional[Event]:
-    return Event.query.get(event_id)
+    return db.session.get(Event, event_id)
 
 def update_event(event_id: int, title: Optional[str] = None, 
                 description: Optional[str] = None, start_time: Optional[datetime] = None,
                 end_time: Optional[datetime] = None, recurrence: Optional[str] = None) -> Optional[Event]:
-    event = Event.query.get(event_id)
+    event = db.session.get(Event, event_id)
     if not event:
         return None
     
@@ -150,12 +690,228 @@ def update_event(event_id: int, title: Optional[str] = None,
     return event
 
 def delete_event(event_id: int) -> bool:
-    event = Event.query.get(event_id)
+    event = db.session.get(Event, event_id)
     if not event:
         return False
     db.session.delete(event)
     db.session.commit()
     return True
 
+# Search
+
+
+SEARCH_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def search_query(terms: str) -> Optional[str]:
+    """FTS5 MATCH string for what the user typed: every word must occur,
+    each as a prefix ("gro" finds "groceries"). None if there are no words."""
+    tokens = SEARCH_TOKEN.findall(terms.lower())
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens[:16])
+
+
+def search(user_id: int, terms: str, limit: int = 20, offset: int = 0,
+           kind: Optional[str] = None) -> Tuple[List[dict], Optional[int]]:
+    """The user's tasks/events matching `terms`, best first, plus the next
+    offset.
+
+    Ranked with bm25, a title hit counting four times a body hit. Each
+    result has kind, id, title and a snippet with matches in [brackets].
+    """
+    match = search_query(terms)
+    if match is None:
+        return [], None
+    if db.engine.dialect.name != "sqlite":
+        return _search_like(user_id, terms, limit, offset, kind)
+    # snippet() of title and body separately; -1 ("best column") can pick
+    # user_id
+    kind_filter = "AND kind = :kind" if kind else ""
+    sql = f"""SELECT rowid, kind, title,
+                     snippet({SEARCH_TABLE}, 3, '[', ']', '…', 12)
+                         AS body_snippet,
+                     snippet({SEARCH_TABLE}, 2, '[', ']', '…', 12)
+                         AS title_snippet,
+                     bm25({SEARCH_TABLE}, 0.0, 0.0, 4.0, 1.0) AS score
+              FROM {SEARCH_TABLE}
+              WHERE {SEARCH_TABLE} MATCH :match {kind_filter}
+              ORDER BY score LIMIT :limit OFFSET :offset"""
+    rows = db.session.execute(text(sql), {
+        # terms only against the text columns: "1" must not match user_id 1
+        "match": f'user_id:"{int(user_id)}" AND {{title body}}: ({match})',
+        "kind": kind, "limit": limit + 1, "offset": offset}).all()
+    results = [{"kind": row.kind, "id": row.rowid // 2, "title": row.title,
+                "snippet": (row.body_snippet if "[" in (row.body_snippet or "")
+                            else row.title_snippet),
+                "score": -row.score} for row in rows[:limit]]
+    return results, offset + limit if len(rows) > limit else None
+
+
+def _search_like(user_id, terms, limit, offset, kind):
+    """Unranked substring search for databases without FTS5 (Postgres)."""
+    results = []
+    words = SEARCH_TOKEN.findall(terms)
+    if kind in (None, "task"):
+        query = Task.query.filter(Task.user_id == user_id)
+        for word in words:
+            query = query.filter(or_(Task.name.ilike(f"%{word}%"),
+                                     Task.raw_text.ilike(f"%{word}%")))
+        results += [{"kind": "task", "id": t.id, "title": t.name,
+                     "snippet": t.raw_text or t.name, "score": 0.0}
+                    for t in query.order_by(Task.id.desc())
+                                  .limit(offset + limit + 1)]
+    if kind in (None, "event"):
+        query = Event.query.filter(Event.user_id == user_id)
+        for word in words:
+            query = query.filter(or_(Event.title.ilike(f"%{word}%"),
+                                     Event.description.ilike(f"%{word}%")))
+        results += [{"kind": "event", "id": e.id, "title": e.title,
+                     "snippet": e.description or e.title, "score": 0.0}
+                    for e in query.order_by(Event.id.desc())
+                                  .limit(offset + limit + 1)]
+    page = results[offset:offset + limit + 1]
+    return page[:limit], offset + limit if len(page) > limit else None
+
 def get_user_by_username(username: str) -> Optional[User]:
-    return User.query.filter_by(username=username).first()
\ No newline at end of file
+    return User.query.filter_by(username=username).first()
+
+# Uploaded audio and transcripts
+
+
+def get_audio_file(user_id: int, sha256: str) -> Optional[AudioFile]:
+    return AudioFile.query.filter_by(user_id=user_id, sha256=sha256).first()
+
+
+def add_audio_file(user_id: int, sha256: str, size: int,
+                   original_name: Optional[str] = None,
+                   quota: Optional[int] = None
+                   ) -> Tuple[Optional[AudioFile], bool]:
+    """Record that the user owns this audio; returns (row, created).
+
+    With a quota the row is only added if the user's total stays within
+    it, checked and inserted in one statement so parallel uploads can't
+    overshoot; (None, False) if it wouldn't fit. Audio the user already
+    owns is returned as is and costs nothing.
+    """
+    existing = get_audio_file(user_id, sha256)
+    if existing:
+        return existing, False
+    values = {"user_id": user_id, "sha256": sha256, "size": size,
+              "original_name": original_name,
+              "created_at": datetime.now(timezone.utc)}
+    if quota is None:
+        statement = insert(AudioFile).values(**values)
+    else:
+        used = db.select(func.coalesce(func.sum(AudioFile.size), 0)) \
+            .where(AudioFile.user_id == user_id).scalar_subquery()
+        statement = insert(AudioFile).from_select(
+            list(values), db.select(*(db.literal(v) for v in values.values()))
+            .where(used + size <= quota))
+    try:
+        inserted = db.session.execute(statement).rowcount
+        db.session.commit()
+    except IntegrityError:  # the same upload finished in another request first
+        db.session.rollback()
+        return get_audio_file(user_id, sha256), False
+    if not inserted:
+        return None, False
+    return get_audio_file(user_id, sha256), True
+
+
+def audio_bytes_used(user_id: int) -> int:
+    return db.session.query(db.func.coalesce(db.func.sum(AudioFile.size), 0)) \
+        .filter(AudioFile.user_id == user_id).scalar()
+
+
+def remove_audio_file(user_id: int, sha256: str) -> Optional[bool]:
+    """Drop the user's ownership row. None if they didn't own it, else
+    whether anyone else still references the same bytes."""
+    row = get_audio_file(user_id, sha256)
+    if row is None:
+        return None
+    db.session.delete(row)
+    db.session.commit()
+    return audio_in_use(sha256)
+
+
+def audio_in_use(sha256: str) -> bool:
+    return AudioFile.query.filter_by(sha256=sha256).first() is not None
+
+
+def get_cached_transcript(sha256: str, settings: str) -> Optional[str]:
+    row = db.session.get(TranscriptCache, (sha256, settings))
+    return row.transcript if row else None
+
+
+def cache_transcript(sha256: str, settings: str, transcript: str) -> None:
+    db.session.merge(TranscriptCache(sha256=sha256, settings=settings,
+                                     transcript=transcript))
+    db.session.commit()
+
+# Sync state
+
+
+def get_sync_state(user_id: int, resource: str) -> SyncState:
+    """The user's pull cursor for `resource`, created (uncommitted) if new."""
+    state = SyncState.query.filter_by(user_id=user_id,
+                                      resource=resource).first()
+    if state is None:
+        state = SyncState(user_id=user_id, resource=resource)
+        db.session.add(state)
+    return state
+
+# CRUD operations for Jobs
+
+
+def create_job(job_id: str, user_id: int, kind: str,
+               payload: Optional[dict] = None,
+               audio: Optional[bytes] = None) -> Job:
+    job = Job(id=job_id, user_id=user_id, kind=kind, status='queued',
+              payload=json.dumps(payload) if payload is not None else None,
+              audio=audio)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def get_job(job_id: str, user_id: Optional[int] = None) -> Optional[Job]:
+    query = Job.query.filter_by(id=job_id)
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    return query.execution_options(populate_existing=True).first()
+
+
+def claim_job(job_id: str) -> Optional[Job]:
+    """Mark a queued/retrying job running and count the attempt, atomically,
+    so a job submitted twice (or resumed by two processes) runs once.
+    None if it is gone, finished or already claimed."""
+    claimed = Job.query.filter(Job.id == job_id,
+                               Job.status.in_(("queued", "retrying"))) \
+        .update({"status": "running",
+                 "attempts": func.coalesce(Job.attempts, 0) + 1,
+                 "updated_at": datetime.now(timezone.utc)},
+                synchronize_session=False)
+    db.session.commit()
+    return get_job(job_id) if claimed else None
+
+
+def pending_job_ids() -> List[str]:
+    """Jobs stored as queued or retrying, oldest first ([] before the table
+    exists)."""
+    if not sa_inspect(db.engine).has_table(Job.__tablename__):
+        return []
+    return [row.id for row in Job.query.with_entities(Job.id)
+            .filter(Job.status.in_(("queued", "retrying")))
+            .order_by(Job.created_at)]
+
+
+def update_job(job_id: str, **fields) -> Optional[Job]:
+    job = db.session.get(Job, job_id)
+    if not job:
+        return None
+    for key, value in fields.items():
+        setattr(job, key, value)
+    job.updated_at = datetime.now(timezone.utc)
+    db.session.commit()
+    return job
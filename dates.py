@@ -0,0 +1,254 @@
+"""Normalize spoken/LLM date and time strings to real date/time values.
+
+Gemini and the fast parser hand back whatever the user said: "tomorrow",
+"Friday", "July 29th", "the 3rd", "09:00 AM", "5pm". Everything that
+compares, sorts or syncs tasks needs actual dates, so they are resolved
+once, when a task is saved, against "today" in the user's timezone and
+stored in the typed Task columns next to the original text.
+
+All patterns are compiled at import and the words go through lookup
+tables; results are memoized per (text, today), so re-resolving the same
+handful of phrases costs a dict lookup.
+"""
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+DEFAULT_TZ = "UTC"
+
+WEEKDAY_INDEX = {}
+for _i, _name in enumerate(("monday", "tuesday", "wednesday", "thursday",
+                            "friday", "saturday", "sunday")):
+    WEEKDAY_INDEX[_name] = WEEKDAY_INDEX[_name[:3]] = _i
+WEEKDAY_INDEX.update({"tues": 1, "weds": 2, "thur": 3, "thurs": 3})
+
+MONTHS = {}
+for _i, _name in enumerate(("january", "february", "march", "april", "may",
+                            "june", "july", "august", "september", "october",
+                            "november", "december"), 1):
+    MONTHS[_name] = MONTHS[_name[:3]] = _i
+MONTHS["sept"] = 9
+
+_UNITS = ("first", "second", "third", "fourth", "fifth", "sixth", "seventh",
+          "eighth", "ninth")
+ORDINAL_WORDS = {word: n for n, word in enumerate(_UNITS, 1)}
+ORDINAL_WORDS.update({"tenth": 10, "eleventh": 11, "twelfth": 12,
+                      "thirteenth": 13, "fourteenth": 14, "fifteenth": 15,
+                      "sixteenth": 16, "seventeenth": 17, "eighteenth": 18,
+                      "nineteenth": 19, "twentieth": 20, "thirtieth": 30})
+for _n, _word in enumerate(_UNITS, 1):
+    ORDINAL_WORDS[f"twenty {_word}"] = 20 + _n
+    ORDINAL_WORDS[f"twenty-{_word}"] = 20 + _n
+ORDINAL_WORDS["thirty first"] = ORDINAL_WORDS["thirty-first"] = 31
+
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4,
+                "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+                "ten": 10}
+
+RELATIVE_DAYS = {"today": 0, "tonight": 0, "now": 0, "tomorrow": 1, "tmrw": 1,
+                 "yesterday": -1, "day after tomorrow": 2,
+                 "the day after tomorrow": 2}
+
+NAMED_TIMES = {"noon": time(12, 0), "midday": time(12, 0),
+               "midnight": time(0, 0), "morning": time(9, 0),
+               "afternoon": time(15, 0), "evening": time(18, 0),
+               "tonight": time(20, 0), "night": time(20, 0)}
+
+
+def _alternation(words):
+    # longest first so "twenty first" wins over "twenty"
+    escaped = sorted((re.escape(w) for w in words), key=len, reverse=True)
+    return "|".join(escaped)
+
+
+_MONTH = rf"(?P<month>{_alternation(MONTHS)})\.?"
+_DAY = rf"(?P<day>\d{{1,2}}(?:st|nd|rd|th)?|{_alternation(ORDINAL_WORDS)})"
+_YEAR = r"(?:,?\s+(?P<year>\d{4}))?"
+_WEEKDAY = rf"(?:{_alternation(WEEKDAY_INDEX)})"
+_LEAD = (rf"^(?:(?:on|by|due|for|this|next)\s+)*(?:{_WEEKDAY},?\s+)?"
+         r"(?:the\s+)?")
+
+ISO_DATE = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})(?:[t ].*)?$")
+NUMERIC_DATE = re.compile(r"^(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?$")
+MONTH_DAY = re.compile(rf"{_LEAD}{_MONTH}\s+(?:the\s+)?{_DAY}{_YEAR}$")
+DAY_MONTH = re.compile(rf"{_LEAD}{_DAY}\s+(?:of\s+)?{_MONTH}{_YEAR}$")
+DAY_ONLY = re.compile(
+    rf"^(?:(?:on|by|due|for)\s+)?(?:the\s+)?"
+    rf"(?P<day>\d{{1,2}}(?:st|nd|rd|th)|{_alternation(ORDINAL_WORDS)})$")
+WEEKDAY = re.compile(
+    rf"^(?:(?:on|by|due|for)\s+)?(?P<next>this|next|coming)?\s*"
+    rf"(?P<weekday>{_alternation(WEEKDAY_INDEX)})$")
+IN_UNITS = re.compile(rf"^in\s+(?P<n>\d+|{_alternation(NUMBER_WORDS)})\s+"
+                      r"(?P<unit>day|week|month)s?$")
+NEXT_UNIT = re.compile(r"^next\s+(?P<unit>week|month|year)$")
+
+TIME_RE = re.compile(r"^(?:at\s+)?(?P<h>\d{1,2})(?:[:.](?P<m>\d{2}))?"
+                     r"(?::(?P<s>\d{2}))?\s*(?P<ampm>a\.?m\.?|p\.?m\.?)?$")
+
+
+def zone(tz_name: Optional[str] = None) -> ZoneInfo:
+    """ZoneInfo for tz_name, UTC if it is missing or unknown."""
+    try:
+        return ZoneInfo(tz_name or DEFAULT_TZ)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(DEFAULT_TZ)
+
+
+def local_today(tz_name: Optional[str] = None) -> date:
+    """Today's date where the user is, not where the server is."""
+    return datetime.now(zone(tz_name)).date()
+
+
+def _clean(value: str) -> str:
+    return " ".join(value.lower().split()).strip(" .,")
+
+
+def _day_number(text):
+    text = text.lower()
+    return ORDINAL_WORDS.get(text) or int(re.sub(r"\D", "", text))
+
+
+def _safe_date(year, month, day):
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _upcoming(month, day, year, today):
+    """month/day in `year`, or the next time it comes round if no year was
+    said."""
+    if year is not None:
+        return _safe_date(int(year), month, day)
+    found = _safe_date(today.year, month, day)
+    if found is not None and found < today:
+        found = _safe_date(today.year + 1, month, day)
+    return found
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    for d in (day.day, 30, 29, 28):
+        found = _safe_date(year, month, d)
+        if found:
+            return found
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(text: str, today: date) -> Optional[date]:
+    if text in RELATIVE_DAYS:
+        return today + timedelta(days=RELATIVE_DAYS[text])
+
+    m = ISO_DATE.match(text)
+    if m:
+        return _safe_date(*map(int, m.groups()))
+
+    m = WEEKDAY.match(text)
+    if m:
+        delta = (WEEKDAY_INDEX[m.group("weekday")] - today.weekday()) % 7 or 7
+        if m.group("next") == "next":  # the friday after this friday
+            delta += 7
+        return today + timedelta(days=delta)  # a weekday is never today
+
+    m = MONTH_DAY.match(text) or DAY_MONTH.match(text)
+    if m:
+        return _upcoming(MONTHS[m.group("month")], _day_number(m.group("day")),
+                         m.group("year"), today)
+
+    m = DAY_ONLY.match(text)
+    if m:  # "the 3rd": this month, or next month if that's past
+        day = _day_number(m.group("day"))
+        found = _safe_date(today.year, today.month, day)
+        if found is None or found < today:
+            following = _add_months(today.replace(day=1), 1)
+            found = _safe_date(following.year, following.month, day)
+        return found
+
+    m = NUMERIC_DATE.match(text)
+    if m:
+        month, day, year = m.groups()
+        if year and len(year) == 2:
+            year = "20" + year
+        return _upcoming(int(month), int(day), year, today)
+
+    m = IN_UNITS.match(text)
+    if m:
+        n = NUMBER_WORDS.get(m.group("n")) or int(m.group("n"))
+        if m.group("unit") == "month":
+            return _add_months(today, n)
+        weeks = m.group("unit") == "week"
+        return today + timedelta(days=n * (7 if weeks else 1))
+
+    m = NEXT_UNIT.match(text)
+    if m:
+        if m.group("unit") == "week":  # Monday of next week
+            return today + timedelta(days=7 - today.weekday())
+        if m.group("unit") == "month":
+            return _add_months(today.replace(day=1), 1)
+        return date(today.year + 1, 1, 1)
+    return None
+
+
+def parse_date(value, today: Optional[date] = None,
+               tz_name: Optional[str] = None) -> Optional[date]:
+    """Resolve a date phrase to a date, or None if it isn't one.
+
+    Relative phrases ("tomorrow", "Friday", "the 3rd", "in 2 weeks") are
+    counted from `today`, which defaults to today in tz_name.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return _parse_date(_clean(value), today or local_today(tz_name))
+
+
+@lru_cache(maxsize=1024)
+def _parse_time(text: str) -> Optional[time]:
+    if text in NAMED_TIMES:
+        return NAMED_TIMES[text]
+    m = TIME_RE.match(text)
+    if not m:
+        return None
+    hour = int(m.group("h"))
+    minute, second = int(m.group("m") or 0), int(m.group("s") or 0)
+    if m.group("ampm"):
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if m.group("ampm").startswith("p") else 0)
+    if hour > 23 or minute > 59 or second > 59:
+        return None
+    return time(hour, minute, second)
+
+
+def parse_time(value) -> Optional[time]:
+    """"09:00 AM", "9pm", "21:30", "noon" ... -> time, or None."""
+    if isinstance(value, datetime):
+        return value.time()
+    if isinstance(value, time):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return _parse_time(_clean(value))
+
+
+def typed_task_fields(fields: dict, today: Optional[date] = None,
+                      tz_name: Optional[str] = None) -> dict:
+    """Typed Task columns for the string fields of a task (create_task
+    names)."""
+    today = today or local_today(tz_name)
+    due_on = parse_date(fields.get("due_date"), today)
+    start_on = parse_date(fields.get("start_date"), today) or due_on
+    return {
+        "due_on": due_on or start_on,
+        "start_on": start_on,
+        "end_on": parse_date(fields.get("end_date"), today) or start_on,
+        "starts_at": parse_time(fields.get("start_time")),
+        "ends_at": parse_time(fields.get("end_time")),
+    }
@@ -0,0 +1,182 @@
+"""Rule-based task extraction for simple transcripts.
+
+Most dictations are one short task with maybe a day and a time ("buy
+milk tomorrow", "gym every weekday from 9 to 5"). Those are pulled apart
+here with precompiled patterns in well under a millisecond, in the same
+shape Gemini answers with. fast_parse() also returns a confidence score;
+TaskParser only calls the model when it is below its threshold, i.e.
+when something in the transcript wasn't understood. Relative days stay
+relative ("tomorrow", "in 3 days"); dates.py resolves them in the
+user's timezone when the tasks are saved.
+"""
+import re
+from datetime import datetime
+from typing import List, Tuple
+
+from genai_parser import WEEKDAYS
+
+
+WEEKDAY_NAMES = [d.lower() for d in WEEKDAYS]
+_DAY = "|".join(WEEKDAY_NAMES)
+
+# phrases that mean "here is a task", not part of the task itself
+LEAD_IN = re.compile(
+    r"^(?:(?:ok(?:ay)?|so|um+|uh+|hey|please)[, ]+)*"
+    r"(?:(?:i|we)\s+(?:need|have|got|want|should)\s+to\s+|i\s+must\s+|"
+    r"remind\s+me\s+to\s+|don'?t\s+forget\s+to\s+|remember\s+to\s+|"
+    r"(?:add\s+)?(?:a\s+)?(?:task|todo|to-do)\s*(?:to|:)?\s+|"
+    r"i'?ll\s+|let'?s\s+)?", re.I)
+
+# several tasks in one breath go to the model
+MULTI_TASK = re.compile(
+    r"\b(?:and then|then|also|after that|plus)\b|[;\n]|\.\s+\w|,\s*and\b|"
+    r"\band\s+(?:call|email|text|buy|go|pay|send|write|finish|clean|book|"
+    r"pick|meet|read|study|submit|schedule|get|take|make|do|visit|check)\b",
+    re.I)
+
+# date/time words we don't handle here (month names, parts of day, ...)
+UNHANDLED = re.compile(
+    r"\b(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|"
+    r"aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|"
+    r"dec(?:ember)?|weekend|morning|afternoon|evening|night|noon|midnight|"
+    r"o'?clock|until|till|before|after|by|next\s+(?:week|month|year)|"
+    r"this\s+(?:week|month|year)|\d+(?:st|nd|rd|th)|"
+    rf"\d+|quarter|half|today|tonight|tomorrow|{_DAY})\b", re.I)
+
+# what's left of a word a pattern was cut out of ("every day's" -> "'s")
+FRAGMENT = re.compile(r"(?:^|\s)['\u2019]")
+
+_TIME = r"(\d{1,2})(?::(\d{2}))?\s*(a\.?m\.?|p\.?m\.?)?"
+TIME_RANGE = re.compile(
+    rf"\b(?:from\s+)?{_TIME}\s*(?:to|-|until|till)\s*{_TIME}(?=\s|$)", re.I)
+TIME_AT = re.compile(
+    rf"\bat\s+{_TIME}(?=\s|$)|"
+    r"\b(\d{1,2})(?::(\d{2}))?\s*(a\.?m\.?|p\.?m\.?)(?=\s|$)", re.I)
+
+RECURRENCE = [
+    (re.compile(r"\b(?:every\s+weekday|on\s+weekdays|weekdays)\b", re.I),
+     "weekdays"),
+    (re.compile(r"\b(?:every\s*day|daily|each\s+day)\b", re.I), "daily"),
+    (re.compile(rf"\bevery\s+({_DAY})\b", re.I), "weekly"),
+    (re.compile(r"\b(?:every\s+week|weekly)\b", re.I), "weekly"),
+    (re.compile(r"\b(?:every\s+month|monthly)\b", re.I), "monthly"),
+]
+
+# not "today's", and not "next friday" (this one or the one after?)
+RELATIVE_DAY = re.compile(
+    r"\b(?<!next )(?:(?:on|this|by)\s+)?"
+    rf"(today|tonight|tomorrow|the\s+day\s+after\s+tomorrow|{_DAY})"
+    r"\b(?!['\u2019])", re.I)
+IN_DAYS = re.compile(
+    r"\bin\s+(\d{1,2}|one|two|three|four|five|six|seven)\s+days?\b", re.I)
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+                "seven": 7}
+
+
+def _clock(hour, minute, meridiem, default_pm=None):
+    """(hour 0-23, minute) or None; without am/pm, 1-6 read as afternoon."""
+    hour, minute = int(hour), int(minute or 0)
+    if hour > 23 or minute > 59:
+        return None
+    if meridiem:
+        if hour > 12 or hour == 0:
+            return None
+        pm = meridiem.lower().startswith("p")
+        hour = hour % 12 + (12 if pm else 0)
+    elif hour <= 12:
+        pm = default_pm if default_pm is not None else 1 <= hour <= 6
+        if pm and hour < 12:
+            hour += 12
+    return hour, minute
+
+
+def _fmt(clock):
+    """"09:00 AM" -- the format the prompt asks Gemini for."""
+    return datetime(2000, 1, 1, *clock).strftime("%I:%M %p")
+
+
+def _take(pattern, text):
+    """First match of pattern and the text with it removed."""
+    m = pattern.search(text)
+    if not m:
+        return None, text
+    return m, (text[:m.start()] + " " + text[m.end():])
+
+
+def fast_parse(transcript: str) -> Tuple[List[dict], float]:
+    """Extract tasks without the LLM; returns (tasks, confidence 0..1)."""
+    text = " ".join((transcript or "").split()).strip(" .!?,")
+    if not text:
+        return [], 0.0
+    if MULTI_TASK.search(text):
+        return [], 0.0
+    confidence = 1.0
+    task = {"text": None, "start_time": None, "end_time": None,
+            "start_date": None, "end_date": None, "repeat": None, "due": None}
+
+    for pattern, repeat in RECURRENCE:
+        m, text = _take(pattern, text)
+        if m:
+            task["repeat"] = repeat
+            if repeat == "weekly" and m.groups():
+                task["start_date"] = m.group(1).capitalize()
+            break
+
+    m, text = _take(TIME_RANGE, text)
+    if m:
+        start = _clock(*m.group(1, 2, 3))
+        # "9 to 5": the end is later than the start, so it's 5 PM
+        end = _clock(*m.group(4, 5, 6), default_pm=None)
+        if start and end and not m.group(6) and end <= start:
+            end = _clock(*m.group(4, 5), "pm") or end
+        bare = not m.group(3) and not m.group(6)
+        if start and end and bare and start[0] >= 12 and end[0] < start[0]:
+            start = (start[0] - 12, start[1])
+        if not (start and end):
+            return [], 0.0
+        task["start_time"], task["end_time"] = _fmt(start), _fmt(end)
+    else:
+        m, text = _take(TIME_AT, text)
+        if m:
+            groups = m.group(1, 2, 3) if m.group(1) else m.group(4, 5, 6)
+            clock = _clock(*groups)
+            if not clock:
+                return [], 0.0
+            task["start_time"] = _fmt(clock)
+
+    m, text = _take(IN_DAYS, text)
+    if m:
+        n = m.group(1).lower()
+        days = NUMBER_WORDS.get(n) or int(n)
+        task["due"] = f"in {days} day{'s' if days != 1 else ''}"
+    else:
+        m, text = _take(RELATIVE_DAY, text)
+        if m:
+            day = m.group(1).lower()
+            if day == "tonight":
+                day = "today"
+                task["start_time"] = task["start_time"] or "08:00 PM"
+            elif day.startswith("the day after"):
+                day = "the day after tomorrow"
+            # weekday names capitalized, like Gemini returns them
+            task["due"] = day.capitalize() if day in WEEKDAY_NAMES else day
+
+    if task["repeat"] and task["due"] and not task["start_date"]:
+        task["start_date"], task["due"] = task["due"], None
+
+    text = LEAD_IN.sub("", " ".join(text.split())).strip(" ,.")
+    text = re.sub(r"\s+(?:on|at|by|from)$", "", text, flags=re.I)
+    if not text:
+        return [], 0.0
+    task["text"] = text
+
+    if UNHANDLED.search(text):
+        confidence *= 0.4  # a date/time we didn't parse is probably in there
+    if FRAGMENT.search(text):
+        confidence *= 0.4  # a pattern matched part of a word
+    words = len(text.split())
+    if words > 10:
+        confidence *= 0.6  # long dictations often hide several tasks
+    elif words == 1:
+        confidence *= 0.8  # "milk" -- could be anything
+    return [task], confidence
@@ -1,9 +1,18 @@
 import os
 from dotenv import load_dotenv
-import google.generativeai as genai
 import json
+import logging
 import re
-from datetime import datetime, timedelta
+import copy
+import hashlib
+import threading
+import time
+from typing import List, Optional
+from parse_cache import ParseCache, make_key
+from dates import parse_date
+import metrics
+
+logger = logging.getLogger(__name__)
 
 #List of weekdays for date conversion
 WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
@@ -15,61 +24,268 @@ WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday",
   \"due\": \"Monday\"\n  }\n]\n```"
 '''
 
-def get_date_from_due(due: str):
-    """Convert a due date string to a datetime object."""
+
+def get_date_from_due(due: str, tz_name: Optional[str] = None):
+    """Convert a due date string to an ISO date (YYYY-MM-DD).
+
+    Anything dates.parse_date understands (today, weekdays, "July 29th",
+    "in 3 days", ISO, ...) is resolved against today in tz_name; other
+    strings are returned as they are.
+    """
     if not due:
         return None
-    
-    due_lower = due.strip().lower()
-    today = datetime.today()
-
-    if due_lower == "today":
-        return today.date().isoformat()
-    if due_lower == "tomorrow":
-        return (today + timedelta(days=1)).date().isoformat()
-    if due_lower in WEEKDAYS:
-        target_idx = WEEKDAYS.index(due_lower)
-        delta = (target_idx - today.weekday() + 7) % 7
-        if delta == 0:
-            delta = 7  #next week if same day
-        return (today + timedelta(days=delta)).date().isoformat()
-
-    #If its already a proper date string (YYYY-MM-DD), return as is
-    try:
-        parsed = datetime.strptime(due, "%Y-%m-%d")
-        return parsed.date().isoformat()
-    except ValueError:
-        return due  
-    
+    resolved = parse_date(due, tz_name=tz_name)
+    return resolved.isoformat() if resolved else due
+
+
+def clean_json(text: str):
+    """Strip markdown fences from a model answer and decode the JSON."""
+    clean_it = re.sub(r"```json|```", "", text.strip()).strip()
+    return json.loads(clean_it)
+
+
+def add_calendar_dates(tasks: list, tz_name: Optional[str] = None) -> list:
+    """Fill start/end dates from the due date, resolved against today."""
+    enriched_tasks = []
+
+    for task in tasks:
+        due = task.get("due")
+        converted_date = get_date_from_due(due, tz_name)
+        task["start_date"] = task.get("start_date") or converted_date
+        task["end_date"] = task.get("end_date") or converted_date
+        enriched_tasks.append(task)
+
+    return enriched_tasks
+
+
+BATCH_INSTRUCTIONS = """\
+You will receive several transcripts. Each one starts with a line
+"### TRANSCRIPT <id>". Extract the tasks of every transcript separately.
+
+Respond only with one JSON object mapping each id (as a string) to the JSON
+array of tasks for that transcript, e.g. {"0": [...], "1": [...]}. Include
+every id, using [] when a transcript has no tasks."""
+
+DEFAULT_TEMPLATE_PATH = os.path.join(os.path.dirname(__file__),
+                                     "prompt_template.txt")
+
+
+class PromptTemplate:
+    """prompt_template.txt, read once and re-read only when the file changes.
+
+    The file's mtime is checked at most every check_interval seconds, so the
+    parse hot path normally does no filesystem work at all. mark_stale()
+    forces a re-read on the next render.
+    """
+
+    def __init__(self, path: str = DEFAULT_TEMPLATE_PATH,
+                 check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._stale = False
+        self.load()
+
+    def load(self):
+        """(Re)read the template now; used by the admin route."""
+        with self._lock:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, "r") as file:
+                text = file.read()
+            self.text = text
+            self.version = hashlib.sha256(text.encode()).hexdigest()[:16]
+            self._prefix = f"{text}\n\n"
+            self._mtime = mtime
+            self._next_check = time.monotonic() + self.check_interval
+        logger.info("Loaded prompt template version %s", self.version)
+        return self.version
+
+    def mark_stale(self):
+        """Reload on the next render. Safe in a signal handler: it takes no
+        lock and can't raise, unlike load()."""
+        self._stale = True
+
+    def refresh(self):
+        """Reload if marked stale or the file's mtime moved since the last
+        load."""
+        now = time.monotonic()
+        if now < self._next_check and not self._stale:
+            return
+        self._next_check = now + self.check_interval
+        stale, self._stale = self._stale, False
+        try:
+            if stale or os.stat(self.path).st_mtime_ns != self._mtime:
+                self.load()
+        except OSError as e:
+            # keep serving the last good template
+            logger.warning("Could not reload prompt template %s: %s",
+                           self.path, e)
+
+    def render(self, transcript: str) -> str:
+        self.refresh()
+        return self._prefix + transcript
+
+    def render_batch(self, items) -> str:
+        """Prompt for several (id, transcript) pairs answered in one call."""
+        self.refresh()
+        blocks = "\n\n".join(f"### TRANSCRIPT {item_id}\n{text}"
+                               for item_id, text in items)
+        return f"{self._prefix}{BATCH_INSTRUCTIONS}\n\n{blocks}"
+
+
+def make_gemini_model():
+    """Configure the SDK and build the Gemini model TaskParser talks to."""
+    import google.generativeai as genai  # slow import, only on first use
+    load_dotenv()
+    genai.configure(api_key=os.getenv("GENAI_KEY"))
+    return genai.GenerativeModel("gemini-1.5-pro")
+
 class TaskParser:
-    def __init__(self):
-        load_dotenv()
-        genai.configure(api_key=os.getenv("GENAI_KEY")) 
-        self.model = genai.GenerativeModel("gemini-1.5-pro") 
+    """Transcript -> task list via Gemini.
+
+    With fast_threshold set, transcripts are first run through the local
+    rule-based extractor (fast_parser.py) and only sent to the model when
+    its confidence is below the threshold.
+    """
+
+    def __init__(self, cache: Optional[ParseCache] = None,
+                 template: Optional[PromptTemplate] = None,
+                 model=None, model_factory=make_gemini_model,
+                 fast_threshold: Optional[float] = None):
+        self._model = model
+        self._model_factory = model_factory
+        self._model_lock = threading.Lock()
+        self.cache = cache
+        self.template = template or PromptTemplate()
+        self.fast_threshold = fast_threshold
+        self.stats = {"fast": 0, "model": 0}
+        # parse() runs on request and job threads alike
+        self._stats_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The Gemini model, built on first use rather than at import."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._model_factory()
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    def _count(self, path: str):
+        with self._stats_lock:
+            self.stats[path] += 1
+
+    @property
+    def template_version(self) -> str:
+        return self.template.version
+
+    def fast_parse(self, transcript: str) -> Optional[list]:
+        """Tasks from the rule-based extractor, or None if it isn't sure
+        enough."""
+        if self.fast_threshold is None:
+            return None
+        from fast_parser import fast_parse  # imports WEEKDAYS from this module
+        tasks, confidence = fast_parse(transcript)
+        if tasks and confidence >= self.fast_threshold:
+            self._count("fast")
+            return tasks
+        return None
 
     def parse_transcript(self, transcript: str):
-        base_directory = os.path.dirname(__file__)
-        template = os.path.join(base_directory, "prompt_template.txt")
-        with open(template, "r") as file:
-            base_prompt = file.read()
+        tasks = self.fast_parse(transcript)
+        if tasks is not None:
+            return tasks
 
-        full_prompt = f"{base_prompt}\n\n{transcript}"
+        full_prompt = self.template.render(transcript)
+
+        # identical transcripts (re-submits, retries) skip the model call
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_key(transcript, self.template_version)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
 
         try:
-            response = self.model.generate_content(full_prompt)
-            print("RAW GEMINI OUTPUT:")
-            print(response.text)
-            
-            original = response.text.strip()
-            clean_it = re.sub(r"```json|```", "", original).strip()
-            tasks = json.loads(clean_it)
-            print("Parsed tasks:", tasks)
+            self._count("model")
+            with metrics.timer("gemini"):
+                response = self.model.generate_content(full_prompt)
+            logger.debug("Raw Gemini output: %s", response.text)
+
+            with metrics.timer("json_cleanup"):
+                tasks = clean_json(response.text)
+            logger.debug("Parsed tasks: %s", tasks)
+            if cache_key is not None and isinstance(tasks, list):
+                self.cache.set(cache_key, tasks)
             return tasks
         except Exception as e:
-            print("Error parsing transcript:", e)
-            print("Raw Gemini output:", response.text if 'response' in locals() else "None")
+            raw = response.text if 'response' in locals() else None
+            logger.warning(
+                "Error parsing transcript: %s; raw Gemini output: %s", e, raw)
             return []
-        
+
+    def parse_transcripts(self, transcripts: List[str],
+                          batch_size: int = 10) -> List[list]:
+        """Parse many transcripts with as few model calls as possible.
+
+        Up to batch_size transcripts share one prompt, each tagged with an id,
+        and the model answers with a JSON object of id -> task list. Anything
+        missing or malformed in that answer falls back to parse_transcript.
+        """
+        results: List[Optional[list]] = [None] * len(transcripts)
+
+        # cache hits, simple transcripts and duplicates inside the batch never
+        # reach the model
+        pending = {}
+        for i, transcript in enumerate(transcripts):
+            results[i] = self.fast_parse(transcript)
+            if results[i] is not None:
+                continue
+            key = make_key(transcript, self.template_version)
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.setdefault(key, []).append(i)
+
+        keys = list(pending)
+        for start in range(0, len(keys), batch_size):
+            group = keys[start:start + batch_size]
+            if len(group) < 2:
+                # a lone transcript goes through the normal path below
+                continue
+            items = [(str(n), transcripts[pending[key][0]])
+                     for n, key in enumerate(group)]
+            try:
+                self._count("model")
+                with metrics.timer("gemini"):
+                    prompt = self.template.render_batch(items)
+                    response = self.model.generate_content(prompt)
+                with metrics.timer("json_cleanup"):
+                    answer = clean_json(response.text)
+            except Exception as e:
+                logger.warning("Error parsing transcript batch: %s", e)
+                continue
+            if not isinstance(answer, dict):
+                continue
+            for n, key in enumerate(group):
+                tasks = answer.get(str(n))
+                if not isinstance(tasks, list):
+                    continue
+                if self.cache is not None:
+                    self.cache.set(key, tasks)
+                for i in pending[key]:
+                    results[i] = copy.deepcopy(tasks)
+
+        for i, transcript in enumerate(transcripts):
+            if results[i] is None:
+                results[i] = self.parse_transcript(transcript)
+        return results
+
     def prefill_gtask(self, text):
         tasks = self.parse_transcript(text)
         for task in tasks:
@@ -80,19 +296,17 @@ class TaskParser:
                 task["due"] = get_date_from_due(task.get("due"))
         return tasks
 
-    def prefill_gcalen(self, text, start_date, end_date, start_time, end_time, due_date):
+    def prefill_gcalen(self, text, start_date, end_date, start_time, end_time,
+                       due_date, tz_name=None):
         """Prefill Google Calendar event with parsed tasks."""
-        tasks = self.parse_transcript(text)
-        enriched_tasks = []
-
-        for task in tasks:
-            due = task.get("due")
-            converted_date = get_date_from_due(due)
-            task["start_date"] = task.get("start_date") or converted_date
-            task["end_date"] = task.get("end_date") or converted_date
-            enriched_tasks.append(task)
+        return add_calendar_dates(self.parse_transcript(text), tz_name)
 
-        return enriched_tasks
+    def prefill_gcalen_batch(self, texts: List[str],
+                             tz_name: Optional[str] = None) -> List[list]:
+        """prefill_gcalen for many transcripts, parsed via
+        parse_transcripts."""
+        return [add_calendar_dates(tasks, tz_name)
+                for tasks in self.parse_transcripts(texts)]
 
 '''class that reads a transcript and sends it to Gemini using a custom prompt.
 returns a list of tasks based on what the user said. This lets us take 
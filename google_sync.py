@@ -0,0 +1,559 @@
+"""Push many local tasks to Google Tasks / Calendar in one request.
+
+Each item is one Google API call run on a shared, bounded thread pool,
+so a 20-task dictation takes about as long as its slowest insert rather
+than the sum of them, and all users together never have more than
+GOOGLE_SYNC_WORKERS calls in flight. Rate-limit and 5xx answers are
+retried with backoff (honouring Retry-After); every item gets its own
+result so one bad task doesn't fail the batch.
+
+Sync is incremental: tasks remember their remote id and a hash of the
+body last pushed, so unchanged tasks cost no API call and changed ones
+are patched instead of duplicated. Pulls ask Google only for what
+changed (Tasks: updatedMin, Calendar: syncToken).
+"""
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from database import db, Event, Task, bump_user_version, get_sync_state
+from dates import parse_time
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RATE_LIMIT_REASONS = (b"rateLimitExceeded", b"userRateLimitExceeded")
+
+
+class SyncError(Exception):
+    """A task that can't be turned into a Google Tasks/Calendar item."""
+
+
+def _parse_date(value):
+    # only absolute dates: "tomorrow" resolved at sync time would be wrong,
+    # the typed columns hold what it meant when the task was saved
+    try:
+        return date.fromisoformat((value or "").strip())
+    except ValueError:
+        return None
+
+
+def task_body(task):
+    """Google Tasks body for a local Task (same shape as
+    google_task_create)."""
+    body = {"title": task.name}
+    due = (task.due_on or task.start_on or _parse_date(task.due_date)
+           or _parse_date(task.start_date))
+    if due:
+        # Google expects RFC3339
+        body["due"] = f"{due.isoformat()}T00:00:00.000Z"
+    return body
+
+
+def event_body(task, tz_name="UTC"):
+    """Calendar event for a local Task; all-day when it has no start time."""
+    start_date = (task.start_on or task.due_on or _parse_date(task.start_date)
+                  or _parse_date(task.due_date))
+    if start_date is None:
+        raise SyncError("Task has no start date")
+    end_date = task.end_on or _parse_date(task.end_date) or start_date
+    event = {"summary": task.name, "description": ""}
+
+    start_time = task.starts_at or parse_time(task.start_time)
+    if start_time is None:
+        event["start"] = {"date": start_date.isoformat()}
+        # all-day end dates are exclusive
+        end = max(end_date, start_date) + timedelta(days=1)
+        event["end"] = {"date": end.isoformat()}
+    else:
+        tz = ZoneInfo(tz_name)
+        start = datetime.combine(start_date, start_time, tz)
+        end_time = task.ends_at or parse_time(task.end_time)
+        end = datetime.combine(end_date, end_time or start_time, tz)
+        if end <= start:
+            end = start + timedelta(hours=1)
+        event["start"] = {"dateTime": start.isoformat(), "timeZone": tz_name}
+        event["end"] = {"dateTime": end.isoformat(), "timeZone": tz_name}
+
+    if task.recurrence and task.recurrence.startswith("RRULE:"):
+        event["recurrence"] = [task.recurrence]
+    return event
+
+
+def retry_delay(error, attempt, backoff, max_delay=30.0):
+    """Seconds to wait before retrying `error`, or None if it isn't retryable.
+
+    Works on googleapiclient's HttpError without importing it: anything
+    with a `resp.status` is treated as an HTTP answer.
+    """
+    resp = getattr(error, "resp", None)
+    status = getattr(resp, "status", None)
+    if status is None:
+        return None
+    content = getattr(error, "content", b"") or b""
+    rate_limited = status == 403 and any(r in content
+                                         for r in RATE_LIMIT_REASONS)
+    if status not in RETRY_STATUSES and not rate_limited:
+        return None
+    retry_after = resp.get("retry-after") if hasattr(resp, "get") else None
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), max_delay)
+        except ValueError:
+            pass
+    delay = backoff * 2 ** (attempt - 1)
+    return min(delay + random.uniform(0, delay), max_delay)
+
+
+def content_hash(body):
+    """Stable hash of an API body; equal hashes mean nothing to push."""
+    raw = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def rfc3339(dt):
+    """UTC RFC 3339 timestamp as Google's updatedMin expects it."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.isoformat(timespec="milliseconds") + "Z"
+
+
+def _status(error):
+    return getattr(getattr(error, "resp", None), "status", None)
+
+
+class Api:
+    """The three calls the sync engine needs from one Google API."""
+
+    def __init__(self, insert, patch, list_):
+        self.insert, self.patch, self.list = insert, patch, list_
+
+
+TASKS_API = Api(
+    insert=lambda svc, body: svc.tasks().insert(tasklist="@default",
+                                                body=body),
+    patch=lambda svc, rid, body: svc.tasks().patch(tasklist="@default",
+                                                   task=rid, body=body),
+    list_=lambda svc, **kw: svc.tasks().list(tasklist="@default", **kw),
+)
+CALENDAR_API = Api(
+    insert=lambda svc, body: svc.events().insert(calendarId="primary",
+                                                 body=body),
+    patch=lambda svc, rid, body: svc.events().patch(calendarId="primary",
+                                                    eventId=rid, body=body),
+    list_=lambda svc, **kw: svc.events().list(calendarId="primary", **kw),
+)
+
+
+class GoogleSync:
+    """Flask extension running Google API calls on a shared worker pool."""
+
+    def __init__(self, app=None, sleep=time.sleep):
+        self.executor = None
+        self.max_attempts = 5
+        self.backoff = 0.5
+        self.sleep = sleep
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("GOOGLE_SYNC_WORKERS", 8)
+        app.config.setdefault("GOOGLE_SYNC_MAX_ATTEMPTS", 5)
+        app.config.setdefault("GOOGLE_SYNC_BACKOFF", 0.5)
+        app.config.setdefault("MAX_SYNC_ITEMS", 100)
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config["GOOGLE_SYNC_WORKERS"],
+            thread_name_prefix="echonote-gsync")
+        self.max_attempts = app.config["GOOGLE_SYNC_MAX_ATTEMPTS"]
+        self.backoff = app.config["GOOGLE_SYNC_BACKOFF"]
+        app.extensions["google_sync"] = self
+
+    def execute(self, make_request):
+        """Run make_request().execute(), retrying rate limits and 5xx.
+
+        Returns (response, attempts); the last error is raised once the
+        attempts run out or the error isn't retryable.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return make_request().execute(), attempt
+            except Exception as e:
+                delay = retry_delay(e, attempt, self.backoff)
+                if delay is None or attempt == self.max_attempts:
+                    e.attempts = attempt
+                    raise
+                self.sleep(delay)
+
+    def push(self, items, service_factory, api):
+        """Send new/changed items concurrently; results keep the input order.
+
+        Each item is a dict with id, body (or error), remote_id and the
+        sync_hash of the last push. Items whose body still hashes to
+        sync_hash are reported "unchanged" without an API call.
+        service_factory() runs on the worker thread, so every thread gets
+        its own (non thread-safe) API client from the registry.
+        """
+        results = [None] * len(items)
+        futures = {}
+        for i, item in enumerate(items):
+            if item.get("error"):
+                results[i] = {"id": item["id"], "status": "failed",
+                              "remote_id": item.get("remote_id"),
+                              "error": item["error"], "attempts": 0}
+            elif (item.get("remote_id")
+                  and item.get("sync_hash") == content_hash(item["body"])):
+                results[i] = {"id": item["id"], "status": "unchanged",
+                              "remote_id": item["remote_id"],
+                              "error": None, "attempts": 0}
+            else:
+                futures[i] = self.executor.submit(self._push_one, item,
+                                                  service_factory, api)
+        for i, future in futures.items():
+            results[i] = future.result()
+        return results
+
+    def _push_one(self, item, service_factory, api):
+        body, remote_id = item["body"], item.get("remote_id")
+        result = {"id": item["id"], "status": "failed", "remote_id": remote_id,
+                  "error": None, "attempts": 0}
+        service = service_factory()
+
+        def insert():
+            return api.insert(service, body)
+
+        try:
+            if remote_id:
+                try:
+                    created, attempts = self.execute(
+                        lambda: api.patch(service, remote_id, body))
+                    result["status"] = "updated"
+                except Exception as e:
+                    if _status(e) not in (404, 410):
+                        raise
+                    # deleted on Google's side: push it again as a new item
+                    created, attempts = self.execute(insert)
+                    attempts += e.attempts
+                    result["status"] = "created"
+            else:
+                created, attempts = self.execute(insert)
+                result["status"] = "created"
+        except Exception as e:
+            result.update(status="failed", error=str(e),
+                          attempts=getattr(e, "attempts", 1))
+            return result
+        result.update(remote_id=created.get("id") or remote_id,
+                      attempts=attempts, sync_hash=content_hash(body))
+        return result
+
+    def list_changes(self, service, api, **params):
+        """Every page of a list call; returns (items, nextSyncToken)."""
+        items, page_token = [], None
+        while True:
+            kwargs = params
+            if page_token:
+                kwargs = dict(params, pageToken=page_token)
+            page, _ = self.execute(lambda: api.list(service, **kwargs))
+            items.extend(page.get("items", []))
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return items, page.get("nextSyncToken")
+
+
+# Incremental sync against the database
+
+def _finish_push(results):
+    """Drop the internal hash before results go back to the client."""
+    for r in results:
+        r.pop("sync_hash", None)
+    return results
+
+
+def push_tasks(gsync, user_id, tasks, service_factory):
+    """Push tasks to Google Tasks, skipping ones unchanged since last push."""
+    items = [{"id": t.id, "body": task_body(t), "remote_id": t.remote_id,
+              "sync_hash": t.sync_hash} for t in tasks]
+    results = gsync.push(items, service_factory, TASKS_API)
+    now = datetime.now(timezone.utc)
+    pushed = False
+    for task, r in zip(tasks, results):
+        if r["status"] in ("created", "updated"):
+            task.remote_id, task.sync_hash = r["remote_id"], r["sync_hash"]
+            task.synced_at = now
+            pushed = True
+    if pushed:
+        bump_user_version(user_id)
+    db.session.commit()
+    return _finish_push(results)
+
+
+def _event_times(body):
+    times = []
+    for key in ("start", "end"):
+        value = body[key].get("dateTime") or body[key].get("date")
+        times.append(datetime.fromisoformat(value).replace(tzinfo=None))
+    return times
+
+
+def push_task_events(gsync, user_id, tasks, service_factory, tz_name="UTC"):
+    """Push tasks as Calendar events; each task is mirrored by an Event row."""
+    events = {e.task_id: e for e in Event.query.filter(
+        Event.user_id == user_id, Event.task_id.in_([t.id for t in tasks]))}
+    items = []
+    for t in tasks:
+        event = events.get(t.id)
+        item = {"id": t.id, "remote_id": event and event.remote_id,
+                "sync_hash": event and event.sync_hash}
+        try:
+            item["body"] = event_body(t, tz_name)
+        except (SyncError, ValueError) as e:
+            item["error"] = str(e)
+        items.append(item)
+    results = gsync.push(items, service_factory, CALENDAR_API)
+    now = datetime.now(timezone.utc)
+    for task, item, r in zip(tasks, items, results):
+        if r["status"] not in ("created", "updated"):
+            continue
+        event = events.get(task.id)
+        if event is None:
+            event = Event(user_id=user_id, task_id=task.id, title=task.name)
+            db.session.add(event)
+        event.title = task.name
+        event.start_time, event.end_time = _event_times(item["body"])
+        event.recurrence = task.recurrence
+        event.remote_id, event.sync_hash = r["remote_id"], r["sync_hash"]
+        event.synced_at = now
+    db.session.commit()
+    return _finish_push(results)
+
+
+def pull_tasks(gsync, user_id, service):
+    """Apply Google Tasks edits made since the last pull to linked tasks.
+
+    One list call with updatedMin returns only what changed; tasks we
+    never pushed are ignored.
+    """
+    state = get_sync_state(user_id, "tasks")
+    started = datetime.now(timezone.utc)
+    params = {"showCompleted": True, "showDeleted": True, "showHidden": True,
+              "maxResults": 100}
+    if state.last_pulled_at:
+        # a little overlap for clock skew; re-applying a change is harmless
+        since = state.last_pulled_at - timedelta(seconds=60)
+        params["updatedMin"] = rfc3339(since)
+    items, _ = gsync.list_changes(service, TASKS_API, **params)
+
+    linked = {t.remote_id: t for t in Task.query.filter(
+        Task.user_id == user_id, Task.remote_id.in_([i["id"] for i in items]))}
+    changed = 0
+    for item in items:
+        task = linked.get(item["id"])
+        if task is None:
+            continue
+        if item.get("deleted"):
+            task.remote_id = task.sync_hash = task.synced_at = None
+        else:
+            task.name = item.get("title") or task.name
+            task.completed = item.get("status") == "completed"
+            if item.get("due"):
+                task.due_date = item["due"][:10]
+                # task_body() reads due_on first
+                task.due_on = date.fromisoformat(task.due_date)
+            # what we'd push now matches Google, so the next push skips it
+            task.sync_hash = content_hash(task_body(task))
+            task.synced_at = started
+        changed += 1
+    state.last_pulled_at = started
+    if changed:
+        bump_user_version(user_id)
+    db.session.commit()
+    return {"received": len(items), "changed": changed}
+
+
+def pull_events(gsync, user_id, service):
+    """Apply Calendar changes since the last pull using its syncToken.
+
+    The first pull (or one whose token expired, HTTP 410) lists the
+    calendar once to obtain a token; later pulls only return deltas.
+    """
+    state = get_sync_state(user_id, "calendar")
+    try:
+        if state.sync_token:
+            items, token = gsync.list_changes(service, CALENDAR_API,
+                                              syncToken=state.sync_token)
+        else:
+            items, token = gsync.list_changes(service, CALENDAR_API,
+                                              showDeleted=True)
+    except Exception as e:
+        if _status(e) != 410:
+            raise
+        items, token = gsync.list_changes(service, CALENDAR_API,
+                                          showDeleted=True)
+
+    remote_ids = [i["id"] for i in items]
+    linked = {e.remote_id: e for e in Event.query.filter(
+        Event.user_id == user_id, Event.remote_id.in_(remote_ids))}
+    changed = 0
+    for item in items:
+        event = linked.get(item["id"])
+        if event is None:
+            continue
+        if item.get("status") == "cancelled":
+            event.remote_id = event.sync_hash = event.synced_at = None
+        else:
+            # remote edits stay until the task itself changes (sync_hash
+            # is kept)
+            event.title = item.get("summary") or event.title
+            event.description = item.get("description", event.description)
+            if item.get("start") and item.get("end"):
+                event.start_time, event.end_time = _event_times(item)
+        changed += 1
+    state.sync_token = token
+    state.last_pulled_at = datetime.now(timezone.utc)
+    db.session.commit()
+    return {"received": len(items), "changed": changed}
+
+
+class FakeHttpError(Exception):
+    """Looks like googleapiclient's HttpError to retry_delay()."""
+
+    def __init__(self, status, retry_after=None, content=b""):
+        super().__init__(f"HTTP {status}")
+        headers = {"status": str(status)}
+        if retry_after is not None:
+            headers["retry-after"] = str(retry_after)
+        self.resp = _FakeResponse(headers, status)
+        self.content = content
+
+
+class _FakeResponse(dict):
+    def __init__(self, headers, status):
+        super().__init__(headers)
+        self.status = status
+
+
+class _FakeRequest:
+    def __init__(self, server, fn):
+        self.server, self.fn = server, fn
+
+    def execute(self):
+        return self.server.call(self.fn)
+
+
+class _FakeCollection:
+    def __init__(self, server, kind):
+        self.server, self.kind = server, kind
+
+    def insert(self, body, **kwargs):
+        return _FakeRequest(self.server,
+                            lambda: self.server.insert(self.kind, body))
+
+    def patch(self, body, task=None, eventId=None, **kwargs):
+        remote_id = task or eventId
+        return _FakeRequest(self.server,
+                            lambda: self.server.patch(self.kind, remote_id,
+                                                      body))
+
+    def list(self, **kwargs):
+        return _FakeRequest(self.server,
+                            lambda: self.server.list(self.kind, **kwargs))
+
+
+class FakeGoogleService:
+    """Offline stand-in for the Tasks and Calendar services.
+
+    Keeps items in memory with an `updated` time and a change sequence
+    (so updatedMin and syncToken listings work), can answer the first
+    `rate_limit` calls with 429s, fail titles listed in `fail_titles`
+    with a 400, and sleep `latency` seconds per call to mimic the network.
+    """
+
+    def __init__(self, latency=0.0, rate_limit=0, retry_after=0,
+                 fail_titles=(), page_size=100):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.fail_titles = set(fail_titles)
+        self.page_size = page_size
+        self.created = {"tasks": [], "events": []}
+        self.items = {"tasks": {}, "events": {}}
+        self.calls = 0
+        self.min_sync_token = 0
+        self._seq = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def tasks(self):
+        return _FakeCollection(self, "tasks")
+
+    def events(self):
+        return _FakeCollection(self, "events")
+
+    def call(self, fn):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            if self.rate_limit > 0:
+                self.rate_limit -= 1
+                raise FakeHttpError(429, retry_after=self.retry_after)
+            return fn()
+
+    def _touch(self, item):
+        self._seq += 1
+        item["_seq"] = self._seq
+        item["updated"] = rfc3339(datetime.now(timezone.utc))
+        return {k: v for k, v in item.items() if k != "_seq"}
+
+    def insert(self, kind, body):
+        if (body.get("title") or body.get("summary")) in self.fail_titles:
+            raise FakeHttpError(400)
+        item = dict(body, id=f"{kind}-{next(self._ids)}")
+        self.items[kind][item["id"]] = item
+        self.created[kind].append(item)
+        return self._touch(item)
+
+    def patch(self, kind, remote_id, body):
+        item = self.items[kind].get(remote_id)
+        if (item is None or item.get("deleted")
+                or item.get("status") == "cancelled"):
+            raise FakeHttpError(404)
+        item.update(body)
+        return self._touch(item)
+
+    def list(self, kind, pageToken=None, maxResults=None, syncToken=None,
+             updatedMin=None, **kwargs):
+        if syncToken is not None and int(syncToken) < self.min_sync_token:
+            raise FakeHttpError(410)
+        items = sorted(self.items[kind].values(), key=lambda i: i["_seq"])
+        if syncToken is not None:
+            items = [i for i in items if i["_seq"] > int(syncToken)]
+        if updatedMin is not None:
+            items = [i for i in items if i["updated"] >= updatedMin]
+        start = int(pageToken or 0)
+        size = maxResults or self.page_size
+        page = {"items": [{k: v for k, v in i.items() if k != "_seq"}
+                          for i in items[start:start + size]]}
+        if start + size < len(items):
+            page["nextPageToken"] = str(start + size)
+        else:
+            page["nextSyncToken"] = str(self._seq)
+        return page
+
+    # helpers for tests: changes made "in Google"
+
+    def remote_update(self, kind, remote_id, **fields):
+        with self._lock:
+            self.items[kind][remote_id].update(fields)
+            self._touch(self.items[kind][remote_id])
+
+    def remote_delete(self, kind, remote_id):
+        if kind == "tasks":
+            deleted = {"deleted": True}
+        else:
+            deleted = {"status": "cancelled"}
+        self.remote_update(kind, remote_id, **deleted)
@@ -0,0 +1,162 @@
+"""Background jobs for the transcribe -> parse -> save pipeline.
+
+Slow model calls (Google Speech, Gemini) run on a bounded worker pool
+instead of the request thread. The route hands back a job id right away
+and the client polls (or long-polls) GET /api/jobs/<id> for the result.
+Job state lives in the jobs table, so every worker sees the same status,
+and jobs still queued or retrying when a process stopped are picked up
+again by the next one (JOB_RESUME).
+"""
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from database import (db, claim_job, create_job, get_job, pending_job_ids,
+                      update_job)
+
+
+TERMINAL_STATUSES = ("done", "failed")
+
+
+class QueueFull(Exception):
+    """Raised when the worker pool has no room for another job."""
+
+
+class InProcessBackend:
+    """Runs jobs on a bounded thread pool inside this process."""
+
+    def __init__(self, max_workers=4, max_pending=100):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="echonote-job")
+        self.slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def submit(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            return False
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(lambda _: self.slots.release())
+        return True
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+class JobQueue:
+    """Flask extension that stores jobs in the DB and runs them async.
+
+    Handlers are registered per job kind and get the Job row; whatever
+    they return (JSON-serializable) becomes the job result.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.backend = None
+        self.handlers = {}
+        self.listeners = []
+        self._changed = threading.Condition()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("JOB_WORKERS", 4)
+        app.config.setdefault("JOB_MAX_PENDING", 100)
+        app.config.setdefault("JOB_MAX_ATTEMPTS", 3)
+        app.config.setdefault("JOB_RETRY_BACKOFF", 0.5)
+        app.config.setdefault("JOB_RESUME", True)
+        self.app = app
+        self.backend = InProcessBackend(app.config["JOB_WORKERS"],
+                                        app.config["JOB_MAX_PENDING"])
+        app.extensions["job_queue"] = self
+        if app.config["JOB_RESUME"]:
+            self.resume()
+
+    def handler(self, kind):
+        """Decorator registering the function that runs jobs of a kind."""
+        def register(fn):
+            self.handlers[kind] = fn
+            return fn
+        return register
+
+    def on_update(self, fn):
+        """Register fn(job) to be called after every job status change."""
+        self.listeners.append(fn)
+        return fn
+
+    def submit(self, user_id, kind, payload=None, audio=None):
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = create_job(uuid.uuid4().hex, user_id, kind,
+                         payload=payload, audio=audio)
+        if not self.backend.submit(self._run, job.id):
+            update_job(job.id, status="failed", error="Job queue is full")
+            raise QueueFull("Job queue is full")
+        return job
+
+    def resume(self):
+        """Submit the stored jobs nobody is running (queued/retrying ones
+        left by a previous process). Returns how many were submitted."""
+        with self.app.app_context():
+            job_ids = pending_job_ids()
+        return sum(self.backend.submit(self._run, job_id)
+                   for job_id in job_ids)
+
+    def wait(self, job_id, user_id, known_status=None, timeout=0):
+        """Return the job once its status differs from known_status.
+
+        Lets clients long-poll instead of hammering the status route.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = get_job(job_id, user_id)
+            if job is None or job.status in TERMINAL_STATUSES:
+                return job
+            if known_status is None or job.status != known_status:
+                return job
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return job
+            with self._changed:
+                self._changed.wait(min(remaining, 1.0))
+
+    def _set(self, job_id, **fields):
+        self._notify(update_job(job_id, **fields))
+
+    def _notify(self, job):
+        with self._changed:
+            self._changed.notify_all()
+        if job is not None:
+            for listener in self.listeners:
+                listener(job)
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            job = claim_job(job_id)
+            if job is None:
+                return  # gone, finished, or another worker has it
+            attempt = job.attempts
+            self._notify(job)
+            try:
+                result = self.handlers[job.kind](job)
+            except Exception as e:
+                # a failed flush/commit leaves the session unusable until
+                # it is rolled back
+                db.session.rollback()
+                if attempt < self.app.config["JOB_MAX_ATTEMPTS"]:
+                    self._set(job_id, status="retrying", error=str(e))
+                    delay = (self.app.config["JOB_RETRY_BACKOFF"]
+                             * 2 ** (attempt - 1))
+                    timer = threading.Timer(delay, self._retry, args=(job_id,))
+                    timer.daemon = True
+                    timer.start()
+                else:
+                    self._set(job_id, status="failed", error=str(e))
+                return
+            self._set(job_id, status="done", result=json.dumps(result),
+                      error=None, audio=None)
+
+    def _retry(self, job_id):
+        if not self.backend.submit(self._run, job_id):
+            with self.app.app_context():
+                self._set(job_id, status="failed", error="Job queue is full")
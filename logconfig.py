@@ -0,0 +1,46 @@
+"""Logging setup: leveled, optionally JSON, one line per record.
+
+Modules log through logging.getLogger(__name__) with %-style arguments,
+so a message below LOG_LEVEL is dropped before it is formatted. Extra
+fields passed as `extra={...}` show up as keys in LOG_FORMAT=json.
+"""
+import json
+import logging
+import sys
+
+
+# attributes every LogRecord has; anything else came in through `extra`
+_STANDARD = set(vars(logging.LogRecord("", 0, "", 0, "", (), None)))
+_STANDARD |= {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({k: v for k, v in vars(record).items()
+                      if k not in _STANDARD})
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(app):
+    """Apply LOG_LEVEL/LOG_FORMAT.
+
+    Leaves handlers someone else installed alone.
+    """
+    root = logging.getLogger()
+    root.setLevel(app.config["LOG_LEVEL"])
+    if not root.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        if app.config["LOG_FORMAT"] == "json":
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter(
+                "%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        root.addHandler(handler)
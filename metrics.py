@@ -0,0 +1,291 @@
+"""Request and pipeline instrumentation, exported in Prometheus format.
+
+A deliberately small registry (counters, histograms and callback
+gauges) rather than another dependency. The Metrics extension times
+every request per endpoint, counts SQL statements per request and times
+each commit; code that wants a stage timed wraps it in
+`metrics.timer("stage")` (speech recognition, the Gemini call, JSON
+cleanup, ...). GET /metrics renders everything via render(). Each app
+has its own Metrics in app.extensions["metrics"].
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import db
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    value = str(value).replace("\\", "\\\\")
+    return value.replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            labels = _labels(self.labelnames, key)
+            yield f"{self.name}{labels} {_number(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[i] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        row = self._values.get(key)
+        return sum(row[:-1]) if row else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(row)) for key, row in self._values.items()]
+        for key, row in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), row[:-1]):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                bucket = _labels(self.labelnames, key, le)
+                yield f"{self.name}_bucket{bucket} {cumulative}"
+            labels = _labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_number(row[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Gauge:
+    """Read at scrape time: callback() returns {label values tuple: value}."""
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), callback=None):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.callback = callback
+
+    def samples(self):
+        for key, value in self.callback().items():
+            labels = _labels(self.labelnames, key)
+            yield f"{self.name}{labels} {_number(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name, help, labelnames=(), callback=None):
+        return self._add(Gauge(name, help, labelnames, callback))
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class Metrics:
+    def __init__(self, registry=None, app=None):
+        self.registry = registry or Registry()
+        self.requests = self.registry.histogram(
+            "echonote_request_duration_seconds",
+            "Request latency by endpoint.", ("endpoint", "method", "status"))
+        self.request_queries = self.registry.histogram(
+            "echonote_request_sql_queries", "SQL statements run per request.",
+            ("endpoint",), QUERY_BUCKETS)
+        self.errors = self.registry.counter(
+            "echonote_request_errors_total",
+            "Requests that failed with an unexpected (logged) error.",
+            ("endpoint",))
+        self.queries = self.registry.counter(
+            "echonote_sql_queries_total",
+            "SQL statements run, in or out of requests.")
+        self.stages = self.registry.histogram(
+            "echonote_stage_duration_seconds",
+            "Time spent in pipeline stages "
+            "(speech, gemini, json_cleanup, db_commit, ...).",
+            ("stage",))
+        self._cache_sources = {}
+        self._lookup_counters = {}
+        self.registry.gauge("echonote_cache_hits", "Cache hits.",
+                            ("cache",), lambda: self._cache_stat("hits"))
+        self.registry.gauge("echonote_cache_misses", "Cache misses.",
+                            ("cache",), lambda: self._cache_stat("misses"))
+        self.registry.gauge("echonote_cache_hit_ratio",
+                            "Cache hits / lookups.", ("cache",),
+                            lambda: self._cache_stat("hit_ratio"))
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._start_request)
+        app.after_request(self._end_request)
+        with app.app_context():
+            for engine in db.engines.values():
+                if not event.contains(engine, "before_cursor_execute",
+                                      self._count_query):
+                    event.listen(engine, "before_cursor_execute",
+                                 self._count_query)
+        app.extensions["metrics"] = self
+
+    def timer(self, stage):
+        """Context manager timing one run of `stage`."""
+        return self.stages.time(stage=stage)
+
+    def add_cache(self, name, stats):
+        """Export a cache whose stats() returns hits, misses and hit_ratio."""
+        self._cache_sources[name] = stats
+
+    def lookup_counter(self, name):
+        """A hit/miss counter for a cache without stats() of its own, exported
+        like add_cache() ones; call .inc(result="hit"|"miss")."""
+        if name in self._lookup_counters:
+            return self._lookup_counters[name]
+        counter = self.registry.counter(f"echonote_{name}_cache_lookups_total",
+                                        f"{name} cache lookups.", ("result",))
+
+        def stats():
+            hits = counter.value(result="hit")
+            misses = counter.value(result="miss")
+            ratio = hits / (hits + misses) if hits + misses else 0.0
+            return {"hits": hits, "misses": misses, "hit_ratio": ratio}
+        self.add_cache(name, stats)
+        self._lookup_counters[name] = counter
+        return counter
+
+    def _cache_stat(self, field):
+        sources = list(self._cache_sources.items())
+        return {(name, ): stats()[field] for name, stats in sources}
+
+    def render(self):
+        return self.registry.render()
+
+    # request hooks
+
+    def _start_request(self):
+        g._metrics_started = time.perf_counter()
+        g._metrics_queries = 0
+
+    def _end_request(self, response):
+        started = g.pop("_metrics_started", None)
+        if started is not None:
+            endpoint = request.endpoint or "unmatched"
+            self.requests.observe(time.perf_counter() - started,
+                                  endpoint=endpoint, method=request.method,
+                                  status=response.status_code)
+            self.request_queries.observe(g.pop("_metrics_queries", 0),
+                                         endpoint=endpoint)
+        return response
+
+    def _count_query(self, conn, cursor, statement, parameters, context,
+                     executemany):
+        self.queries.inc()
+        if has_request_context() and "_metrics_queries" in g:
+            g._metrics_queries += 1
+
+
+def current_metrics():
+    """The current app's Metrics, or None outside an app (or without one)."""
+    return current_app.extensions.get("metrics") if has_app_context() else None
+
+
+def timer(stage):
+    """Time `stage` into the current app's metrics; a no-op outside an app."""
+    m = current_metrics()
+    return m.timer(stage) if m is not None else nullcontext()
+
+
+# commit timing, for every session: listened for once per process and
+# recorded in the metrics of whichever app is doing the commit
+
+@event.listens_for(Session, "before_commit")
+def _start_commit(session):
+    session.info["_metrics_commit"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _end_commit(session):
+    started = session.info.pop("_metrics_commit", None)
+    m = current_metrics()
+    if started is not None and m is not None:
+        m.stages.observe(time.perf_counter() - started, stage="db_commit")
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_commit(session):
+    session.info.pop("_metrics_commit", None)
@@ -0,0 +1,113 @@
+"""Content-addressed cache for TaskParser.parse_transcript.
+
+Keys are a hash of the normalized transcript plus the prompt template
+hash, so editing prompt_template.txt naturally invalidates old entries.
+Values are the raw parsed task list, *before* relative dates like
+"tomorrow" are resolved, so a cached entry is still correct the next day.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_transcript(transcript: str) -> str:
+    """Collapse whitespace and case so trivially different re-submits match."""
+    return " ".join(transcript.split()).casefold()
+
+
+def make_key(transcript: str, template_hash: str) -> str:
+    text = normalize_transcript(transcript)
+    return hashlib.sha256(f"{template_hash}\0{text}".encode()).hexdigest()
+
+
+class ParseCache:
+    """LRU + TTL cache with optional persistence to a SQLite table."""
+
+    def __init__(self, max_entries=1024, ttl=24 * 3600, persist_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stored_at, json text)
+        self._lock = threading.Lock()
+        self._conn = None
+        if persist_path:
+            self._conn = sqlite3.connect(persist_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL)")
+            self._conn.commit()
+
+    def _expired(self, stored_at):
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def _remember(self, key, stored_at, value):
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key):
+        if self._conn is None:
+            return None
+        row = self._conn.execute(
+            "SELECT stored_at, value FROM parse_cache WHERE key = ?",
+            (key,)).fetchone()
+        if row is None:
+            return None
+        if self._expired(row[0]):
+            self._conn.execute("DELETE FROM parse_cache WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+        return row
+
+    def get(self, key):
+        """Return a fresh copy of the cached tasks, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                entry = self._load(key)
+                if entry is not None:
+                    self._remember(key, *entry)
+            else:
+                self._entries.move_to_end(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(entry[1])
+
+    def set(self, key, tasks):
+        value = json.dumps(tasks)
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, stored_at, value)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO parse_cache VALUES (?, ?, ?)",
+                    (key, value, stored_at))
+                self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM parse_cache")
+                self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,118 @@
+"""Password hashing and verification off the request threads.
+
+Hashing is deliberately slow, and a burst of logins used to run it on
+the request threads, where it starved every other request. Hashes are
+now made and checked on a small process pool (a separate GIL per
+worker). At most PASSWORD_MAX_PENDING jobs may wait for it; past that,
+callers get PasswordsBusy right away instead of queueing without limit.
+
+The hash method is configurable (PASSWORD_HASH_METHOD, any werkzeug
+method string such as "scrypt:32768:8:1" or "pbkdf2:sha256:600000").
+Stored hashes made with other parameters still verify, and
+needs_rehash() tells the login route to replace them.
+PASSWORD_WORKERS=0 runs everything inline, which is what tests use.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+DEFAULT_METHOD = "pbkdf2:sha256:600000"
+
+
+class PasswordsBusy(Exception):
+    """Raised when too many hash jobs are already waiting for the pool."""
+
+
+def method_id(method):
+    """The prefix werkzeug stores for `method`, e.g. "pbkdf2:sha256:600000"."""
+    return generate_password_hash("", method).split("$", 1)[0]
+
+
+class PasswordHasher:
+    def __init__(self, method=DEFAULT_METHOD, workers=2, max_pending=64,
+                 app=None):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = None
+        self._method_id = None
+        self._method_id_future = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        # guards executor and _dummy_hash creation
+        self._lock = threading.Lock()
+        self._dummy_hash = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("PASSWORD_HASH_METHOD", self.method)
+        app.config.setdefault("PASSWORD_WORKERS", self.workers)
+        app.config.setdefault("PASSWORD_MAX_PENDING", self.max_pending)
+        self.method = app.config["PASSWORD_HASH_METHOD"]
+        self.workers = app.config["PASSWORD_WORKERS"]
+        self.max_pending = app.config["PASSWORD_MAX_PENDING"]
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        # method_id() makes a full hash: do it now, on the pool, not in a login
+        if self.workers:
+            self._method_id_future = self._executor().submit(
+                method_id, self.method)
+        else:
+            self._method_id = method_id(self.method)
+        app.extensions["passwords"] = self
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordsBusy(
+                "Too many logins in progress, try again shortly")
+        try:
+            return self._executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def _executor(self):
+        with self._lock:
+            if self.executor is None:
+                # spawn, not fork: forking a threaded server can deadlock
+                # the child
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"))
+            return self.executor
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pw_hash, password):
+        """True if password matches; pw_hash=None still costs one hash,
+        so unknown usernames take as long as wrong passwords."""
+        if pw_hash is None:
+            self._run(check_password_hash, self._get_dummy_hash(), password)
+            return False
+        return self._run(check_password_hash, pw_hash, password)
+
+    def _get_dummy_hash(self):
+        if self._dummy_hash is None:
+            dummy = self._run(generate_password_hash, "dummy password",
+                              self.method)
+            with self._lock:
+                self._dummy_hash = self._dummy_hash or dummy
+        return self._dummy_hash
+
+    def needs_rehash(self, pw_hash):
+        """Whether pw_hash was made with other parameters than the
+        configured ones."""
+        if self._method_id is None:
+            future = self._method_id_future
+            self._method_id = (future.result() if future is not None
+                               else self._run(method_id, self.method))
+        return pw_hash.split("$", 1)[0] != self._method_id
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
@@ -0,0 +1,73 @@
+"""In-process sliding-window rate limiting.
+
+Each key (e.g. "ip:1.2.3.4" or "user:alice") keeps the timestamps of its
+recent hits; a key over `limit` hits within `window` seconds is refused
+until the oldest hit ages out. The number of tracked keys is bounded, so
+a flood of distinct IPs can't grow memory. Counts are per process.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class RateLimiter:
+    """`limit` hits per `window` seconds per key; limit 0 disables it."""
+
+    def __init__(self, limit, window, max_keys=10000, name=None, app=None):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self.name = name
+        self._hits = OrderedDict()  # key -> list of monotonic timestamps
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read <NAME>_LIMIT and <NAME>_WINDOW from the config."""
+        app.config.setdefault(f"{self.name}_LIMIT", self.limit)
+        app.config.setdefault(f"{self.name}_WINDOW", self.window)
+        self.limit = app.config[f"{self.name}_LIMIT"]
+        self.window = app.config[f"{self.name}_WINDOW"]
+        self.clear()
+        app.extensions.setdefault("rate_limiters", {})[self.name] = self
+
+    def _recent(self, key, now):
+        hits = [t for t in self._hits.get(key, ()) if now - t < self.window]
+        if hits:
+            self._hits[key] = hits
+            self._hits.move_to_end(key)
+        else:
+            self._hits.pop(key, None)
+        return hits
+
+    def retry_after(self, key):
+        """Seconds until key may try again, 0 if it may now."""
+        if not self.limit:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            hits = self._recent(key, now)
+            if len(hits) < self.limit:
+                return 0
+            return max(self.window - (now - hits[-self.limit]), 0.001)
+
+    def hit(self, key):
+        if not self.limit:
+            return
+        now = time.monotonic()
+        with self._lock:
+            hits = self._recent(key, now)
+            hits.append(now)
+            self._hits[key] = hits
+            self._hits.move_to_end(key)
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._hits.clear()
@@ -57,6 +57,70 @@ function highlightNav() {
   });
 }
 
+// how often MediaRecorder hands us a chunk while recording (ms)
+const STREAM_TIMESLICE_MS = 250;
+
+// Build a recorder that streams chunks to /api/transcribe/stream while
+// recording, so interim text appears right away. Falls back to the
+// one-shot /api/transcribe upload if a streaming session can't be opened.
+function createStreamingRecorder(mediaStream, transcriptArea) {
+    const recorder = new MediaRecorder(mediaStream);
+    let chunks = [];
+    let sessionId = null;
+    let pending = Promise.resolve();
+
+    recorder.onstart = () => {
+        chunks = [];
+        sessionId = null;
+        pending = fetch('/api/transcribe/stream', { method: 'POST' })
+            .then(res => res.ok ? res.json() : null)
+            .then(payload => { sessionId = payload && payload.session_id; })
+            .catch(() => { sessionId = null; });
+    };
+
+    recorder.ondataavailable = e => {
+        chunks.push(e.data);
+        // chain uploads so chunks reach the server in order
+        pending = pending.then(async () => {
+            if (!sessionId || !e.data.size) return;
+            const res = await fetch(`/api/transcribe/stream/${sessionId}`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/octet-stream' },
+                body: e.data
+            });
+            const payload = await res.json();
+            if (res.ok && payload.transcript) {
+                transcriptArea.value = payload.transcript;
+            }
+        }).catch(error => console.warn('Streaming chunk failed:', error));
+    };
+
+    recorder.onstop = async () => {
+        await pending;
+        const blob = new Blob(chunks, { type: 'audio/webm'});
+        chunks = [];
+
+        try {
+            let res;
+            if (sessionId) {
+                res = await fetch(`/api/transcribe/stream/${sessionId}/finish`, { method: 'POST' });
+            } else {
+                const form = new FormData();
+                form.append('audio', blob, 'recording.webm');
+                res = await fetch('/api/transcribe', { method: 'POST', body: form});
+            }
+            const payload = await res.json();
+            if (!res.ok) throw new Error(payload.error || "Transcription failed");
+            transcriptArea.value = payload.transcript;
+        } catch (error) {
+            console.error('Error transcribing audio:', error);
+            transcriptArea.value = 'Error transcribing audio. Please try again.';
+        }
+    };
+
+    return recorder;
+}
+
 // once the DOM is ready
 document.addEventListener('DOMContentLoaded', () => {
 
@@ -73,27 +137,7 @@ document.addEventListener('DOMContentLoaded', () => {
     navigator.mediaDevices.getUserMedia({ audio: true }).then(
         mediaStream => {
             stream = mediaStream;
-            recorder = new MediaRecorder(stream);
-            let chunks = [];
-
-            recorder.ondataavailable = e => chunks.push(e.data);
-            recorder.onstop = async () => {
-                const blob = new Blob(chunks, { type: 'audio/webm'});
-                chunks = [];
-
-                const form = new FormData();
-                form.append('audio', blob, 'recording.webm')
-
-                try {
-                    const res = await fetch('/api/transcribe', { method: 'POST', body: form});
-                    const payload = await res.json();
-                    if (!res.ok) throw new Error(payload.error || "Transcription failed");
-                    transcriptArea.value = payload.transcript;
-                } catch (error) {
-                    console.error('Error transcribing audio:', error);
-                    transcriptArea.value = 'Error transcribing audio. Please try again.';
-                }
-            };
+            recorder = createStreamingRecorder(stream, transcriptArea);
         }
         ).catch(error => {
             console.error('Error accessing microphone:', error);
@@ -103,7 +147,7 @@ document.addEventListener('DOMContentLoaded', () => {
         // Record button
         recordButton.addEventListener('click', function() {
             if (recorder && recorder.state === 'inactive') {
-                recorder.start();
+                recorder.start(STREAM_TIMESLICE_MS);
                 recordButton.classList.add('recording');
                 stopButton.disabled = false;
             }
@@ -129,27 +173,7 @@ document.addEventListener('DOMContentLoaded', () => {
         navigator.mediaDevices.getUserMedia({ audio: true }).then(
             mediaStream => {
                 stream = mediaStream;
-                recorder = new MediaRecorder(stream);
-                let chunks = [];
-
-                recorder.ondataavailable = e => chunks.push(e.data);
-                recorder.onstop = async () => {
-                    const blob = new Blob(chunks, { type: 'audio/webm'});
-                    chunks = [];
-
-                    const form = new FormData();
-                    form.append('audio', blob, 'recording.webm')
-
-                    try {
-                        const res = await fetch('/api/transcribe', { method: 'POST', body: form});
-                        const payload = await res.json();
-                        if (!res.ok) throw new Error(payload.error || "Transcription failed");
-                        transcriptArea.value = payload.transcript;
-                        } catch (error) {
-                        console.error('Error transcribing audio:', error);
-                        transcriptArea.value = 'Error transcribing audio. Please try again.';
-                    }
-                    };
+                recorder = createStreamingRecorder(stream, transcriptArea);
                 }
             ).catch(console.error);
         }
@@ -179,8 +203,8 @@ document.addEventListener('DOMContentLoaded', () => {
                     // Clear the transcript area
                     transcriptArea.value = '';
                     
-                    // Refresh the page to show the new task
-                    window.location.reload();
+                    // New tasks arrive over /api/stream; reload only without it
+                    if (!taskStreamConnected) window.location.reload();
                 } else {
                     const errorData = await response.json();
                     throw new Error(errorData.error || 'Failed to save task');
@@ -204,120 +228,55 @@ document.addEventListener('DOMContentLoaded', () => {
     // Task editing, deletion, and completion functionality
     // Only run this code on pages with task items
     if (document.querySelector('.task-list')) {
-        // Task editing
-        document.querySelectorAll('.btn-edit').forEach(button => {
-            button.addEventListener('click', function() {
-                const taskId = this.getAttribute('data-task-id');
-                const taskItem = document.querySelector(`.task-item[data-task-id="${taskId}"]`);
-                const taskContent = taskItem.querySelector('.task-content').textContent.trim();
-                
-                // Extract task name (remove the "— Due: date" and "(Done)" parts if present)
-                let taskName = taskContent;
-                if (taskName.includes('—')) {
-                    taskName = taskName.split('—')[0].trim();
-                }
-                if (taskName.includes('(Done)')) {
-                    taskName = taskName.replace('(Done)', '').trim();
-                }
-                
-                // Create edit form
-                const originalContent = taskItem.innerHTML;
-                taskItem.innerHTML = `
-                    <div class="task-edit-form">
-                        <input type="text" id="edit-task-name" value="${taskName}">
-                        <div class="edit-actions">
-                            <button class="btn-save">Save</button>
-                            <button class="btn-cancel">Cancel</button>
-                        </div>
+        bindTaskButtons(document);
+        // items added later (lazy loading, restored edit forms) need listeners too
+        document.addEventListener('tasks:appended', e => bindTaskButtons(e.detail.container));
+        setupTaskLazyLoading();
+        connectTaskStream();
+    }
+});
+
+// Attach edit/delete/done/undo listeners to the task buttons inside scope
+function bindTaskButtons(scope) {
+    // Task editing
+    scope.querySelectorAll('.btn-edit').forEach(button => {
+        button.addEventListener('click', function() {
+            const taskId = this.getAttribute('data-task-id');
+            const taskItem = document.querySelector(`.task-item[data-task-id="${taskId}"]`);
+            const taskContent = taskItem.querySelector('.task-content').textContent.trim();
+            
+            // Extract task name (remove the "— Due: date" and "(Done)" parts if present)
+            let taskName = taskContent;
+            if (taskName.includes('—')) {
+                taskName = taskName.split('—')[0].trim();
+            }
+            if (taskName.includes('(Done)')) {
+                taskName = taskName.replace('(Done)', '').trim();
+            }
+            
+            // Create edit form
+            const originalContent = taskItem.innerHTML;
+            taskItem.innerHTML = `
+                <div class="task-edit-form">
+                    <input type="text" id="edit-task-name" value="${taskName}">
+                    <div class="edit-actions">
+                        <button class="btn-save">Save</button>
+                        <button class="btn-cancel">Cancel</button>
                     </div>
-                `;
-                
-    
+                </div>
+            `;
+            
 
+
+            
+            // Save button
+            taskItem.querySelector('.btn-save').addEventListener('click', async function() {
+                const newName = taskItem.querySelector('#edit-task-name').value.trim();
                 
-                // Save button
-                taskItem.querySelector('.btn-save').addEventListener('click', async function() {
-                    const newName = taskItem.querySelector('#edit-task-name').value.trim();
-                    
-                    if (!newName) {
-                        alert('Task name cannot be empty');
-                        return;
-                    }
-                    
-                    try {
-                        const response = await fetch(`/api/tasks/${taskId}`, {
-                            method: 'PUT',
-                            headers: {
-                                'Content-Type': 'application/json'
-                            },
-                            body: JSON.stringify({
-                                name: newName
-                            })
-                        });
-                        
-                        if (response.ok) {
-                            // Refresh the page to show updated task
-                            window.location.reload();
-                        } else {
-                            const errorData = await response.json();
-                            throw new Error(errorData.error || 'Failed to update task');
-                        }
-                    } catch (error) {
-                        console.error('Error updating task:', error);
-                        alert('Error updating task: ' + error.message);
-                        // Restore original content
-                        taskItem.innerHTML = originalContent;
-                    }
-                });
-                
-                // Cancel button
-                taskItem.querySelector('.btn-cancel').addEventListener('click', function() {
-                    taskItem.innerHTML = originalContent;
-                    
-                    // Re-attach event listeners to the restored buttons
-                    attachTaskButtonListeners();
-                });
-            });
-        });
-        
-        // Task deletion
-        document.querySelectorAll('.btn-delete').forEach(button => {
-            button.addEventListener('click', async function() {
-                const taskId = this.getAttribute('data-task-id');
-                
-                if (confirm('Are you sure you want to delete this task?')) {
-                    try {
-                        const response = await fetch(`/api/tasks/${taskId}`, {
-                            method: 'DELETE'
-                        });
-                        
-                        if (response.ok) {
-                            // Remove the task item from the DOM
-                            const taskItem = document.querySelector(`.task-item[data-task-id="${taskId}"]`);
-                            taskItem.remove();
-                            
-                            // If no tasks left, show the "no tasks" message
-                            const taskList = document.querySelector('.task-list');
-                            if (taskList.querySelectorAll('.task-item').length === 0) {
-                                taskList.innerHTML = '<p>No tasks yet. Start recording to create tasks.</p>';
-                            }
-                        } else {
-                            const errorData = await response.json();
-                            throw new Error(errorData.error || 'Failed to delete task');
-                        }
-                    } catch (error) {
-                        console.error('Error deleting task:', error);
-                        alert('Error deleting task: ' + error.message);
-                    }
+                if (!newName) {
+                    alert('Task name cannot be empty');
+                    return;
                 }
-            });
-        });
-        
-        // Task completion
-        document.querySelectorAll('.btn-done').forEach(button => {
-            button.addEventListener('click', async function() {
-                const taskId = this.getAttribute('data-task-id');
-                const taskItem = document.querySelector(`.task-item[data-task-id="${taskId}"]`);
                 
                 try {
                     const response = await fetch(`/api/tasks/${taskId}`, {
@@ -326,112 +285,271 @@ document.addEventListener('DOMContentLoaded', () => {
                             'Content-Type': 'application/json'
                         },
                         body: JSON.stringify({
-                            completed: true
+                            name: newName
                         })
                     });
                     
                     if (response.ok) {
-                        // Mark as completed visually
-                        taskItem.classList.add('completed');
-                        
-                        // Update the button to show "Undo" instead of "Done"
-                        this.innerHTML = '<i class="fa-solid fa-rotate-left"></i>';
-                        this.classList.remove('btn-done');
-                        this.classList.add('btn-undo');
-                        
-                        // Add "(Done)" text to the task content if it's not already there
-                        const taskContent = taskItem.querySelector('.task-content');
-                        if (!taskContent.textContent.includes('(Done)')) {
-                            taskContent.textContent = taskContent.textContent + ' (Done)';
-                        }
+                        // Refresh the page to show updated task
+                        window.location.reload();
                     } else {
                         const errorData = await response.json();
-                        throw new Error(errorData.error || 'Failed to mark task as completed');
+                        throw new Error(errorData.error || 'Failed to update task');
                     }
                 } catch (error) {
-                    console.error('Error marking task as completed:', error);
-                    alert('Error marking task as completed: ' + error.message);
+                    console.error('Error updating task:', error);
+                    alert('Error updating task: ' + error.message);
+                    // Restore original content
+                    taskItem.innerHTML = originalContent;
                 }
             });
-        });
-        
-        // Undo completion
-        document.querySelectorAll('.btn-undo').forEach(button => {
-            button.addEventListener('click', async function() {
-                const taskId = this.getAttribute('data-task-id');
-                const taskItem = document.querySelector(`.task-item[data-task-id="${taskId}"]`);
+            
+            // Cancel button
+            taskItem.querySelector('.btn-cancel').addEventListener('click', function() {
+                taskItem.innerHTML = originalContent;
                 
+                // Re-attach event listeners to the restored buttons
+                announceTasksAppended(taskItem);
+            });
+        });
+    });
+    
+    // Task deletion
+    scope.querySelectorAll('.btn-delete').forEach(button => {
+        button.addEventListener('click', async function() {
+            const taskId = this.getAttribute('data-task-id');
+            
+            if (confirm('Are you sure you want to delete this task?')) {
                 try {
                     const response = await fetch(`/api/tasks/${taskId}`, {
-                        method: 'PUT',
-                        headers: {
-                            'Content-Type': 'application/json'
-                        },
-                        body: JSON.stringify({
-                            completed: false
-                        })
+                        method: 'DELETE'
                     });
                     
                     if (response.ok) {
-                        // Remove completed styling
-                        taskItem.classList.remove('completed');
+                        // Remove the task item from the DOM
+                        const taskItem = document.querySelector(`.task-item[data-task-id="${taskId}"]`);
+                        taskItem.remove();
                         
-                        // Update the button back to "Done"
-                        this.innerHTML = '<i class="fa-solid fa-check"></i>';
-                        this.classList.remove('btn-undo');
-                        this.classList.add('btn-done');
-                        
-                        // Remove "(Done)" text from the task content
-                        const taskContent = taskItem.querySelector('.task-content');
-                        taskContent.textContent = taskContent.textContent.replace(' (Done)', '');
+                        // If no tasks left, show the "no tasks" message
+                        const taskList = document.querySelector('.task-list');
+                        if (taskList.querySelectorAll('.task-item').length === 0) {
+                            taskList.innerHTML = '<p>No tasks yet. Start recording to create tasks.</p>';
+                        }
                     } else {
                         const errorData = await response.json();
-                        throw new Error(errorData.error || 'Failed to mark task as incomplete');
+                        throw new Error(errorData.error || 'Failed to delete task');
                     }
                 } catch (error) {
-                    console.error('Error marking task as incomplete:', error);
-                    alert('Error marking task as incomplete: ' + error.message);
+                    console.error('Error deleting task:', error);
+                    alert('Error deleting task: ' + error.message);
                 }
-            });
+            }
         });
-        
-        // Helper function to attach event listeners to task buttons
-        function attachTaskButtonListeners() {
-            // Re-attach edit button listeners
-            document.querySelectorAll('.btn-edit').forEach(button => {
-                button.addEventListener('click', function() {
-                    // This would be a duplicate of the edit functionality above
-                    // In a real implementation, you'd refactor the edit logic into a separate function
-                    // and call it here
-                });
-            });
-            
-            // Re-attach delete button listeners
-            document.querySelectorAll('.btn-delete').forEach(button => {
-                button.addEventListener('click', function() {
-                    // This would be a duplicate of the delete functionality above
-                    // In a real implementation, you'd refactor the delete logic into a separate function
-                    // and call it here
-                });
-            });
+    });
+    
+    // Task completion
+    scope.querySelectorAll('.btn-done').forEach(button => {
+        button.addEventListener('click', async function() {
+            const taskId = this.getAttribute('data-task-id');
+            const taskItem = document.querySelector(`.task-item[data-task-id="${taskId}"]`);
             
-            // Re-attach done button listeners
-            document.querySelectorAll('.btn-done').forEach(button => {
-                button.addEventListener('click', function() {
-                    // This would be a duplicate of the done functionality above
-                    // In a real implementation, you'd refactor the done logic into a separate function
-                    // and call it here
+            try {
+                const response = await fetch(`/api/tasks/${taskId}`, {
+                    method: 'PUT',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify({
+                        completed: true
+                    })
                 });
-            });
+                
+                if (response.ok) {
+                    // Mark as completed visually
+                    taskItem.classList.add('completed');
+                    
+                    // Update the button to show "Undo" instead of "Done"
+                    this.innerHTML = '<i class="fa-solid fa-rotate-left"></i>';
+                    this.classList.remove('btn-done');
+                    this.classList.add('btn-undo');
+                    
+                    // Add "(Done)" text to the task content if it's not already there
+                    const taskContent = taskItem.querySelector('.task-content');
+                    if (!taskContent.textContent.includes('(Done)')) {
+                        taskContent.textContent = taskContent.textContent + ' (Done)';
+                    }
+                } else {
+                    const errorData = await response.json();
+                    throw new Error(errorData.error || 'Failed to mark task as completed');
+                }
+            } catch (error) {
+                console.error('Error marking task as completed:', error);
+                alert('Error marking task as completed: ' + error.message);
+            }
+        });
+    });
+    
+    // Undo completion
+    scope.querySelectorAll('.btn-undo').forEach(button => {
+        button.addEventListener('click', async function() {
+            const taskId = this.getAttribute('data-task-id');
+            const taskItem = document.querySelector(`.task-item[data-task-id="${taskId}"]`);
             
-            // Re-attach undo button listeners
-            document.querySelectorAll('.btn-undo').forEach(button => {
-                button.addEventListener('click', function() {
-                    // This would be a duplicate of the undo functionality above
-                    // In a real implementation, you'd refactor the undo logic into a separate function
-                    // and call it here
+            try {
+                const response = await fetch(`/api/tasks/${taskId}`, {
+                    method: 'PUT',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify({
+                        completed: false
+                    })
                 });
+                
+                if (response.ok) {
+                    // Remove completed styling
+                    taskItem.classList.remove('completed');
+                    
+                    // Update the button back to "Done"
+                    this.innerHTML = '<i class="fa-solid fa-check"></i>';
+                    this.classList.remove('btn-undo');
+                    this.classList.add('btn-done');
+                    
+                    // Remove "(Done)" text from the task content
+                    const taskContent = taskItem.querySelector('.task-content');
+                    taskContent.textContent = taskContent.textContent.replace(' (Done)', '');
+                } else {
+                    const errorData = await response.json();
+                    throw new Error(errorData.error || 'Failed to mark task as incomplete');
+                }
+            } catch (error) {
+                console.error('Error marking task as incomplete:', error);
+                alert('Error marking task as incomplete: ' + error.message);
+            }
+        });
+    });
+}
+
+// Let every page script bind listeners on task items added after page load
+function announceTasksAppended(container) {
+    document.dispatchEvent(new CustomEvent('tasks:appended', { detail: { container } }));
+}
+
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value == null ? '' : String(value);
+    return div.innerHTML.replace(/"/g, '&quot;');
+}
+
+// Same markup as the task items rendered by templates/index.html
+function renderTaskItem(task) {
+    const id = escapeHtml(task.id);
+    const due = task.due_date ? ` — <strong>Due:</strong> ${escapeHtml(task.due_date)}` : '';
+    const toggle = task.completed
+        ? `<button class="btn-undo" data-task-id="${id}"><i class="fa-solid fa-rotate-left"></i></button>`
+        : `<button class="btn-done" data-task-id="${id}"><i class="fa-solid fa-check"></i></button>`;
+    return `
+        <div class="task-item ${task.completed ? 'completed' : ''}" data-task-id="${id}" data-raw="${escapeHtml(task.raw_text)}">
+            <div class="task-content">${escapeHtml(task.name)}${due}${task.completed ? ' (Done)' : ''}</div>
+            <div class="task-actions">
+                ${toggle}
+                <button class="btn-edit" data-task-id="${id}"><i class="fa-solid fa-pen"></i></button>
+                <button class="btn-delete" data-task-id="${id}"><i class="fa-solid fa-trash"></i></button>
+                <button class="btn-sync" data-task-id="${id}"><i class="fa-solid fa-calendar"></i></button>
+                <button class="btn-sync-task" data-task-id="${id}"><i class="fa-solid fa-list-check"></i></button>
+            </div>
+            <div class="task-waveform"></div>
+        </div>`;
+}
+
+// The home page renders only the first page of tasks; fetch the next page
+// from /api/tasks whenever the end of the list scrolls into view.
+const TASK_PAGE_SIZE = 50;
+
+function setupTaskLazyLoading() {
+    const taskList = document.querySelector('.task-list');
+    const sentinel = document.getElementById('task-list-sentinel');
+    if (!taskList || !sentinel || !('IntersectionObserver' in window)) return;
+
+    let loading = false;
+    const observer = new IntersectionObserver(async entries => {
+        if (!entries[0].isIntersecting || loading) return;
+        const cursor = taskList.dataset.nextCursor;
+        if (!cursor) {
+            observer.disconnect();
+            return;
+        }
+        loading = true;
+        try {
+            const res = await fetch(`/api/tasks?limit=${TASK_PAGE_SIZE}&cursor=${encodeURIComponent(cursor)}`);
+            const page = await res.json();
+            if (!res.ok) throw new Error(page.error || 'Failed to load tasks');
+
+            const holder = document.createElement('div');
+            holder.innerHTML = page.tasks.map(renderTaskItem).join('');
+            Array.from(holder.children).forEach(item => {
+                taskList.appendChild(item);
+                announceTasksAppended(item);
             });
+            taskList.dataset.nextCursor = page.next_cursor || '';
+        } catch (error) {
+            console.error('Error loading more tasks:', error);
+            observer.disconnect();
+        } finally {
+            loading = false;
         }
-    }
-});
\ No newline at end of file
+        // the sentinel may still be visible if the page was short
+        if (taskList.dataset.nextCursor) {
+            observer.unobserve(sentinel);
+            observer.observe(sentinel);
+        }
+    });
+    observer.observe(sentinel);
+}
+
+// Live updates: /api/stream pushes task deltas from this and other tabs or
+// devices, so the list is patched in place instead of refetched.
+let taskStreamConnected = false;
+
+function connectTaskStream() {
+    const taskList = document.querySelector('.task-list');
+    if (!taskList || !window.EventSource) return;
+
+    const events = new EventSource('/api/stream');
+    events.onopen = () => { taskStreamConnected = true; };
+    events.onerror = () => { taskStreamConnected = false; };
+
+    const itemFor = id => taskList.querySelector(`.task-item[data-task-id="${id}"]`);
+    const insert = (task, position) => {
+        const holder = document.createElement('div');
+        holder.innerHTML = renderTaskItem(task);
+        const item = holder.firstElementChild;
+        if (position === 'top') {
+            taskList.querySelector(':scope > p')?.remove();  // "No tasks yet"
+            taskList.prepend(item);
+        }
+        return item;
+    };
+
+    events.addEventListener('task_created', e => {
+        JSON.parse(e.data).tasks.reverse().forEach(task => {
+            if (!itemFor(task.id)) announceTasksAppended(insert(task, 'top'));
+        });
+    });
+
+    events.addEventListener('task_updated', e => {
+        const task = JSON.parse(e.data);
+        const existing = itemFor(task.id);
+        if (!existing || existing.querySelector('.task-edit-form')) return;
+        const item = insert(task);
+        existing.replaceWith(item);
+        announceTasksAppended(item);
+    });
+
+    events.addEventListener('task_deleted', e => {
+        itemFor(JSON.parse(e.data).id)?.remove();
+    });
+
+    // we fell too far behind and missed events
+    events.addEventListener('resync', () => window.location.reload());
+}
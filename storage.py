@@ -0,0 +1,111 @@
+"""Content-addressed storage for uploaded audio.
+
+Uploads are copied to disk in fixed-size chunks while being hashed, so
+a large recording never sits in memory whole. The file is then stored
+under its SHA-256, sharded by the first two byte pairs of the hash
+(ab/cd/abcd...), which makes identical audio land on the same path:
+a second copy simply replaces the first. Who owns which file is kept in
+the DB (AudioFile rows); this module only deals with bytes on disk.
+Uploads are staged, recorded in the DB, then committed, and deletes
+re-check ownership, so a delete racing an upload of the same audio
+never leaves a row pointing at a missing file.
+"""
+import hashlib
+import os
+import tempfile
+import uuid
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when a stream is longer than the allowed size."""
+
+
+class AudioStore:
+    def __init__(self, root):
+        self.root = str(root)
+
+    def relpath(self, sha256):
+        return os.path.join(sha256[:2], sha256[2:4], sha256)
+
+    def path(self, sha256):
+        return os.path.join(self.root, self.relpath(sha256))
+
+    def exists(self, sha256):
+        return os.path.exists(self.path(sha256))
+
+    def save_stream(self, stream, max_bytes=None, chunk_size=CHUNK_SIZE):
+        """Copy `stream` into the store; returns (sha256, size, created).
+
+        created is False when the same bytes were already stored.
+        Raises UploadTooLarge (and keeps nothing) past max_bytes.
+        """
+        sha256, size, tmp_path = self.stage(stream, max_bytes, chunk_size)
+        return sha256, size, self.commit(sha256, tmp_path)
+
+    def stage(self, stream, max_bytes=None, chunk_size=CHUNK_SIZE):
+        """Copy `stream` to a temp file while hashing it; returns
+        (sha256, size, tmp_path). commit() or discard() the file after."""
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise UploadTooLarge(
+                            f"Upload is larger than {max_bytes} bytes")
+                    digest.update(chunk)
+                    out.write(chunk)
+        except BaseException:
+            self.discard(tmp_path)
+            raise
+        return digest.hexdigest(), size, tmp_path
+
+    def commit(self, sha256, tmp_path):
+        """Move a staged file to its place; True if it wasn't stored yet.
+
+        The file is moved even when a copy exists: that copy may be in
+        the middle of being deleted (see delete()), and the same bytes
+        replacing themselves is harmless.
+        """
+        final = self.path(sha256)
+        created = not os.path.exists(final)
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        os.replace(tmp_path, final)  # atomic: readers never see half a file
+        return created
+
+    def discard(self, tmp_path):
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+
+    def read(self, sha256):
+        with open(self.path(sha256), "rb") as f:
+            return f.read()
+
+    def delete(self, sha256, in_use=None):
+        """Remove the bytes of sha256.
+
+        They are moved aside first and in_use() is asked once more: an
+        upload that claimed them in the meantime gets them put back.
+        """
+        path = self.path(sha256)
+        aside = f"{path}.{uuid.uuid4().hex}.deleting"
+        try:
+            os.replace(path, aside)
+        except FileNotFoundError:
+            return
+        if in_use is not None and in_use():
+            os.replace(aside, path)
+        else:
+            os.remove(aside)
@@ -0,0 +1,23 @@
+import os
+import pytest
+
+os.environ.setdefault("FLASK_ENV", "testing")  # before create_app() reads it
+
+from app import create_app  # noqa: E402
+from database import db  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path_factory):
+    """A fresh app on a throwaway database and upload folder (not in the
+    test's own tmp_path)."""
+    home = tmp_path_factory.mktemp("app")
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{home / 'echo_note.db'}",
+        "UPLOAD_FOLDER": str(home / "uploads"),
+    })
+    yield app
+    app.extensions["job_queue"].backend.shutdown()
+    with app.app_context():
+        db.engine.dispose()
@@ -1,11 +1,11 @@
 import json
 import pytest
 from werkzeug.security import generate_password_hash
-from app import app, db
+from app import db
 from database import User
 
 @pytest.fixture
-def client():
+def client(app):
     app.config.update({
         "TESTING": True,
         "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
@@ -44,7 +44,7 @@ def test_save_and_list_tasks(client):
     # List tasks and verify
     resp = client.get("/api/tasks")
     assert resp.status_code == 200
-    tasks = resp.get_json()
+    tasks = resp.get_json()["tasks"]
     assert len(tasks) == 1
     assert tasks[0]["name"] == "Finish math homework"
     assert tasks[0]["completed"] is False
@@ -52,7 +52,7 @@ def test_save_and_list_tasks(client):
 def test_update_and_delete_task(client):
     # Create one
     client.post("/api/save_task", json={"transcript": "Write report"})
-    tasks = client.get("/api/tasks").get_json()
+    tasks = client.get("/api/tasks").get_json()['tasks']
     task_id = tasks[0]["id"]
 
     # Update it
@@ -63,7 +63,7 @@ def test_update_and_delete_task(client):
     assert resp.status_code == 200
 
     # Confirm update
-    tasks = client.get("/api/tasks").get_json()
+    tasks = client.get("/api/tasks").get_json()['tasks']
     assert tasks[0]["name"] == "Write final report"
     assert tasks[0]["completed"] is True
 
@@ -72,10 +72,10 @@ def test_update_and_delete_task(client):
     assert resp.status_code == 200
 
     # Confirm deletion
-    tasks = client.get("/api/tasks").get_json()
+    tasks = client.get("/api/tasks").get_json()['tasks']
     assert tasks == []
 
-def test_register_and_login_flow():
+def test_register_and_login_flow(app):
     c = app.test_client()
     # Ensure new db for this flow
     with app.app_context():
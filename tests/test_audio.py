@@ -0,0 +1,109 @@
+import io
+import wave
+import numpy as np
+import pytest
+from app import db
+from audio import (ffmpeg_path, prepare_audio, resample, trim_silence,
+                   voiced_frames, decode_wav)
+from database import User
+from werkzeug.security import generate_password_hash
+
+
+def make_wav(seconds_silent=1.0, seconds_tone=1.0, rate=48000, channels=2):
+    """silence, a 440 Hz tone, silence -- as 16-bit PCM WAV bytes."""
+    t = np.arange(int(seconds_tone * rate)) / rate
+    tone = 0.5 * np.sin(2 * np.pi * 440 * t)
+    silence = np.random.default_rng(0).normal(0, 1e-4, int(seconds_silent * rate))
+    mono = np.concatenate([silence, tone, silence])
+    pcm = (np.repeat(mono[:, None], channels, axis=1) * 32767).astype('<i2')
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+
+def test_prepare_downmixes_resamples_and_trims():
+    raw = make_wav()
+    prepared = prepare_audio(raw)
+    assert prepared.sample_rate_hertz == 16000
+    assert 1.0 <= prepared.duration <= 1.5  # the tone plus a little padding
+    assert prepared.trimmed > 1.5
+    assert len(prepared.content) < len(raw) / 5
+    if not ffmpeg_path():
+        assert prepared.encoding == 'LINEAR16'
+        samples, rate = decode_wav(prepared.content)
+        assert rate == 16000 and samples.shape[1] == 1
+
+
+@pytest.mark.skipif(not ffmpeg_path(), reason="ffmpeg not installed")
+def test_prepare_encodes_flac_with_ffmpeg():
+    prepared = prepare_audio(make_wav(), codec='flac')
+    assert prepared.encoding == 'FLAC' and prepared.content[:4] == b'fLaC'
+
+
+def test_resample_keeps_the_tone():
+    rate = 48000
+    tone = np.sin(2 * np.pi * 440 * np.arange(rate) / rate).astype(np.float32)
+    out = resample(tone, rate, 16000)
+    assert len(out) == 16000
+    spectrum = np.abs(np.fft.rfft(out))
+    assert np.argmax(spectrum) == 440  # 1 Hz bins for a one second signal
+
+
+def test_vad_on_silence_and_unknown_input():
+    silence = np.zeros(16000, np.float32)
+    assert not voiced_frames(silence, 16000).any()
+    assert len(trim_silence(silence, 16000)) == 0
+
+    webm = b'\x1a\x45\xdf\xa3' + b'\x00' * 100
+    prepared = prepare_audio(webm)
+    if not ffmpeg_path():
+        # can't decode here: sent as recorded, with the right encoding
+        assert prepared.content == webm
+        assert (prepared.encoding, prepared.sample_rate_hertz) == ('WEBM_OPUS', 48000)
+
+
+@pytest.fixture
+def client(app):
+    app.config.update({'TESTING': True})
+    calls = []
+
+    class Recorder:
+        def recognize(self, config, audio):
+            calls.append(config)
+            alt = type('A', (), {'transcript': 'beep'})
+            return type('R', (), {'results': [type('X', (), {'alternatives': [alt]})]})
+
+    app.extensions["clients"].override("speech", Recorder())
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(User(username='user1', pw_hash=generate_password_hash(
+            'pass1', method='pbkdf2:sha256')))
+        db.session.commit()
+    with app.test_client() as c:
+        c.post('/login', data={'username': 'user1', 'password': 'pass1'})
+        c.calls = calls
+        yield c
+    with app.app_context():
+        db.drop_all()  # test_audio_transcribe seeds user1 without dropping
+
+
+def test_transcribe_sends_encoding_and_rate(client):
+    res = client.post('/api/transcribe', data={'audio': (io.BytesIO(make_wav()), 'a.wav')},
+                      content_type='multipart/form-data')
+    assert res.get_json() == {'transcript': 'beep'}
+    config = client.calls[0]
+    assert config.sample_rate_hertz == 16000
+    assert config.encoding.name in ('LINEAR16', 'FLAC')
+
+
+def test_silent_recording_skips_recognizer(client):
+    silent = make_wav(seconds_silent=1.0, seconds_tone=0.0)
+    res = client.post('/api/transcribe', data={'audio': (io.BytesIO(silent), 'a.wav')},
+                      content_type='multipart/form-data')
+    assert res.get_json() == {'transcript': ''}
+    assert client.calls == []
@@ -1,7 +1,6 @@
 import io
 import pytest
 
-from app import app, speech_client
 from database import db, User, Task
 from werkzeug.security import generate_password_hash
 
@@ -14,16 +13,16 @@ class DummyResponse:
     results = [DummyResult()]
 
 @pytest.fixture(autouse=True)
-def patch_speech(monkeypatch):
+def patch_speech(app, monkeypatch):
     """Monkey-patch the real SpeechClient.recognize so it always returns our DummyResponse."""
     monkeypatch.setattr(
-        speech_client,
+        app.extensions["clients"].get("speech"),
         'recognize',
         lambda config, audio: DummyResponse()
     )
 
 @pytest.fixture
-def client():
+def client(app):
     app.config['TESTING'] = True
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
@@ -1,11 +1,10 @@
 import io
 import pytest
-from app import app
 from database import db, User
 from werkzeug.security import generate_password_hash
 
 @pytest.fixture
-def client(tmp_path):
+def client(app, tmp_path):
     #Test config: test mode, in‑memory DB, and tmp_path for uploads
     app.config.update({
         'TESTING': True,
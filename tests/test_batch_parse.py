@@ -0,0 +1,78 @@
+import json
+import re
+import pytest
+from app import db
+from database import User, Task
+from genai_parser import TaskParser
+from parse_cache import ParseCache
+from werkzeug.security import generate_password_hash
+
+
+class FakeBatchModel:
+    """Answers batch prompts per transcript id, skipping ids in `drop`."""
+    def __init__(self, drop=()):
+        self.prompts = []
+        self.drop = set(drop)
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        blocks = re.findall(r"### TRANSCRIPT (\d+)\n(.*?)(?=\n\n###|\Z)",
+                            prompt, re.S)
+        if blocks:
+            answer = {i: [{"text": text, "due": None}]
+                      for i, text in blocks if text not in self.drop}
+        else:
+            text = prompt.rsplit("\n\n", 1)[-1]
+            answer = [{"text": text, "due": None}]
+        return type('R', (object,), {'text': json.dumps(answer)})()
+
+
+def test_one_model_call_for_many_transcripts():
+    parser = TaskParser(cache=ParseCache())
+    parser.model = FakeBatchModel()
+    results = parser.parse_transcripts(["buy milk", "call mom", "buy milk"])
+    assert [r[0]["text"] for r in results] == ["buy milk", "call mom",
+                                               "buy milk"]
+    assert len(parser.model.prompts) == 1
+    # the batch answers were cached per transcript
+    parser.parse_transcript("call mom")
+    assert len(parser.model.prompts) == 1
+
+
+def test_missing_items_fall_back_to_single_calls():
+    parser = TaskParser()
+    parser.model = FakeBatchModel(drop={"call mom"})
+    results = parser.parse_transcripts(["buy milk", "call mom"])
+    assert results[1] == [{"text": "call mom", "due": None}]
+    assert len(parser.model.prompts) == 2
+
+
+@pytest.fixture
+def client(app, monkeypatch):
+    app.config.update({'TESTING': True})
+    # _model, not model: reading the property would build the app's client
+    task_parser = app.extensions['task_parser']
+    monkeypatch.setattr(task_parser, "_model", FakeBatchModel())
+    monkeypatch.setattr(task_parser, "cache", None)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(User(
+            username='user1',
+            pw_hash=generate_password_hash('pass1', method='pbkdf2:sha256')))
+        db.session.commit()
+    with app.test_client() as c:
+        c.post('/login', data={'username': 'user1', 'password': 'pass1'})
+        yield c
+
+
+def test_save_tasks_batch_route(app, client):
+    res = client.post('/api/save_tasks_batch',
+                      json={'transcripts': ['walk dog', 'pay rent']})
+    assert res.status_code == 200
+    assert res.get_json()['saved'] == [1, 1]
+    with app.app_context():
+        assert sorted(t.name for t in Task.query) == ['pay rent', 'walk dog']
+
+    res = client.post('/api/save_tasks_batch', json={'transcripts': 'nope'})
+    assert res.status_code == 400
@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+from bench_http import compare, percentile, summarize  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def report(**scenarios):
+    return {"scenarios": {name: summarize(*args) for name, args in scenarios.items()}}
+
+
+def test_percentiles_are_nearest_rank():
+    samples = list(range(1, 101))
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 95) == 95
+    assert percentile(samples, 99) == 99
+    assert percentile([7], 99) == 7
+    assert percentile([], 50) == 0.0
+
+
+def test_gate_flags_slower_p95_lower_throughput_and_errors():
+    baseline = report(fast=([10.0] * 20, 0, 1.0), slow=([10.0] * 20, 0, 1.0))
+    now = report(fast=([11.0] * 20, 0, 1.0),       # within tolerance
+                 slow=([40.0] * 20, 2, 4.0),       # 4x p95, 1/4 throughput, errors
+                 new=([1.0], 0, 1.0))              # not in the baseline
+    problems = compare(now, baseline, tolerance=0.5, min_delta_ms=5)
+    assert [p.split(":")[0] for p in problems] == ["slow"] * 3
+    assert compare(baseline, baseline) == []
+
+
+def test_small_run_writes_a_report(tmp_path):
+    out = tmp_path / "report.json"
+    args = ["--requests", "3", "--threads", "2", "--warmup", "0", "--table-sizes", "5",
+            "--tasks-per-transcript", "2", "--speech-latency", "0", "--gemini-latency", "0",
+            "--out", str(out)]
+    env = dict(os.environ, FLASK_ENV="testing")
+    subprocess.run([sys.executable, "benchmarks/bench_http.py", *args],
+                   cwd=ROOT, env=env, check=True, capture_output=True)
+    scenarios = json.loads(out.read_text())["scenarios"]
+    assert set(scenarios) == {"login", "tasks_page_5", "tasks_all_5", "transcribe",
+                              "theme_get", "theme_save", "save_task_2"}
+    for result in scenarios.values():
+        assert result["requests"] == 3 and result["errors"] == 0
+        assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
@@ -0,0 +1,66 @@
+import json
+import threading
+from clients import ClientRegistry, credential_key
+
+
+CREDS = {"token": "t1", "refresh_token": "r1", "client_id": "c1",
+         "client_secret": "s", "token_uri": "https://oauth2.googleapis.com/token",
+         "scopes": ["https://www.googleapis.com/auth/tasks"]}
+
+
+def test_clients_are_built_once():
+    registry = ClientRegistry()
+    built = []
+    registry.register("speech", lambda: built.append(1) or object())
+
+    threads = [threading.Thread(target=registry.get, args=("speech",))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert registry.get("speech") is registry.get("speech")
+    assert len(built) == 1
+
+    fake = object()
+    registry.override("speech", fake)
+    assert registry.get("speech") is fake
+
+
+def test_service_reused_per_credential(tmp_path, monkeypatch):
+    registry = ClientRegistry(discovery_cache_dir=str(tmp_path))
+    builds = []
+    monkeypatch.setattr(registry, "_build_service",
+                        lambda api, version, info: builds.append(info) or object())
+
+    first = registry.service("tasks", "v1", CREDS)
+    # a refreshed access token still maps to the same credential
+    assert registry.service("tasks", "v1", dict(CREDS, token="t2")) is first
+    other = registry.service("tasks", "v1", dict(CREDS, refresh_token="r2"))
+    assert other is not first
+    assert len(builds) == 2
+    assert credential_key(CREDS) == credential_key(dict(CREDS, token="t2"))
+
+    fake = object()
+    registry.override_service("tasks", "v1", fake)
+    assert registry.service("tasks", "v1", CREDS) is fake
+
+
+def test_discovery_document_cached_on_disk(tmp_path):
+    registry = ClientRegistry(discovery_cache_dir=str(tmp_path))
+    doc = registry.discovery_document("tasks", "v1")
+    assert doc["name"] == "tasks"
+    cached = tmp_path / "tasks.v1.json"
+    assert json.loads(cached.read_text())["name"] == "tasks"
+    assert [p.name for p in tmp_path.iterdir()] == ["tasks.v1.json"]  # no temp files left
+
+    # a fresh process loads the cached copy instead of the SDK's
+    cached.write_text(json.dumps({"name": "tasks", "from": "disk"}))
+    assert ClientRegistry(str(tmp_path)) \
+        .discovery_document("tasks", "v1")["from"] == "disk"
+
+
+def test_real_service_builds_from_cached_document(tmp_path):
+    registry = ClientRegistry(discovery_cache_dir=str(tmp_path))
+    service = registry.service("tasks", "v1", CREDS)
+    assert hasattr(service, "tasks")
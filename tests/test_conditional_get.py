@@ -0,0 +1,75 @@
+import pytest
+from app import db
+from database import User, create_task
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def client(app):
+    app.config.update({'TESTING': True})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(
+            username='user1',
+            pw_hash=generate_password_hash('pass1', method='pbkdf2:sha256')
+        )
+        db.session.add(user)
+        db.session.commit()
+        create_task(user.id, "Existing task")
+
+    with app.test_client() as c:
+        c.post('/login', data={'username': 'user1', 'password': 'pass1'})
+        yield c
+
+
+def test_unchanged_task_list_is_304(client):
+    first = client.get('/api/tasks')
+    etag = first.headers['ETag']
+    assert first.headers['Last-Modified']
+
+    again = client.get('/api/tasks', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+
+    # paging args are part of the tag
+    paged = client.get('/api/tasks?limit=1', headers={'If-None-Match': etag})
+    assert paged.status_code == 200
+
+
+def test_writes_change_the_etag(client):
+    etag = client.get('/api/tasks').headers['ETag']
+    task_id = client.get('/api/tasks').get_json()['tasks'][0]['id']
+
+    client.put(f'/api/tasks/{task_id}', json={'completed': True})
+    res = client.get('/api/tasks', headers={'If-None-Match': etag})
+    assert res.status_code == 200
+    assert res.get_json()['tasks'][0]['completed'] is True
+
+    etag = res.headers['ETag']
+    client.delete(f'/api/tasks/{task_id}')
+    res = client.get('/api/tasks', headers={'If-None-Match': etag})
+    assert res.status_code == 200
+    assert res.get_json()['tasks'] == []
+
+
+def test_if_modified_since_alone_is_not_a_304(client):
+    first = client.get('/api/tasks')
+    task_id = first.get_json()['tasks'][0]['id']
+    # a write in the same second leaves Last-Modified unchanged
+    client.put(f'/api/tasks/{task_id}', json={'completed': True})
+    res = client.get('/api/tasks',
+                     headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert res.status_code == 200
+    assert res.get_json()['tasks'][0]['completed'] is True
+
+
+def test_theme_reads_are_conditional(client):
+    etag = client.get('/api/get_theme').headers['ETag']
+    assert client.get('/api/get_theme', headers={'If-None-Match': etag}) \
+        .status_code == 304
+
+    client.post('/api/save_theme', json={'bgPrimary': '#000000'})
+    res = client.get('/api/get_theme', headers={'If-None-Match': etag})
+    assert res.status_code == 200
+    assert res.get_json() == {'bgPrimary': '#000000'}
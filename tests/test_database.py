@@ -1,6 +1,6 @@
 import pytest
 from flask import Flask
-from database import db, User, Task, create_task, get_all_tasks, update_task, delete_task
+from database import db, User, Task, create_task, create_tasks_bulk, get_all_tasks, update_task, delete_task
 
 @pytest.fixture(scope="function")
 def app():
@@ -48,3 +48,18 @@ def test_delete_task(app, session):
     assert deleted is True
     # after deletion, get_all_tasks should be empty
     assert get_all_tasks(user.id) == []
+
+def test_create_tasks_bulk(app, session):
+    user = make_user(session, username="bulk")
+    ids = create_tasks_bulk(user.id, [
+        {"name": "Task one", "due_date": "Monday"},
+        {"name": "Task two", "start_time": "09:00 AM"},
+        {"name": "Task three"},
+    ])
+    assert len(ids) == 3
+    by_id = {t.id: t for t in get_all_tasks(user.id)}
+    assert [by_id[i].name for i in ids] == ["Task one", "Task two", "Task three"]
+    assert by_id[ids[0]].due_date == "Monday"
+    assert by_id[ids[1]].start_time == "09:00 AM"
+    assert all(t.completed is False and t.created_at for t in by_id.values())
+    assert create_tasks_bulk(user.id, []) == []
@@ -0,0 +1,98 @@
+import pytest
+from datetime import date, datetime, time, timezone
+from app import db
+from database import User, Task, create_tasks_bulk, normalize_task_dates
+from dates import parse_date, parse_time, local_today
+from genai_parser import get_date_from_due
+from werkzeug.security import generate_password_hash
+
+SUNDAY = date(2026, 10, 18)
+
+
+@pytest.mark.parametrize("phrase, expected", [
+    ("today", SUNDAY),
+    ("Tomorrow", date(2026, 10, 19)),
+    ("friday", date(2026, 10, 23)),
+    ("Sunday", date(2026, 10, 25)),          # a weekday is never today
+    ("on Monday", date(2026, 10, 19)),
+    ("this friday", date(2026, 10, 23)),
+    ("next friday", date(2026, 10, 30)),     # the week after plain "friday"
+    ("by next Monday", date(2026, 10, 26)),
+    ("July 29th", date(2027, 7, 29)),        # already past this year
+    ("the 29th of July", date(2027, 7, 29)),
+    ("Nov 3, 2026", date(2026, 11, 3)),
+    ("Saturday, November 7th", date(2026, 11, 7)),
+    ("the twenty first", date(2026, 10, 21)),
+    ("the 3rd", date(2026, 11, 3)),
+    ("12/25", date(2026, 12, 25)),
+    ("2026-11-02", date(2026, 11, 2)),
+    ("in 2 weeks", date(2026, 11, 1)),
+    ("in three days", date(2026, 10, 21)),
+    ("next week", date(2026, 10, 19)),
+    ("Feb 30", None),
+    ("whenever", None),
+])
+def test_parse_date(phrase, expected):
+    assert parse_date(phrase, today=SUNDAY) == expected
+
+
+def test_parse_time():
+    assert parse_time("09:00 AM") == time(9, 0)
+    assert parse_time("5pm") == time(17, 0)
+    assert parse_time("12 am") == time(0, 0)
+    assert parse_time("21:30") == time(21, 30)
+    assert parse_time("noon") == time(12, 0)
+    assert parse_time("13 pm") is None
+
+
+def test_weekday_due_resolves():
+    # used to come back unchanged: lowercased input vs capitalized WEEKDAYS
+    resolved = date.fromisoformat(get_date_from_due("Friday"))
+    assert resolved.weekday() == 4
+    assert get_date_from_due("someday") == "someday"
+
+
+def test_today_follows_timezone():
+    assert local_today("Pacific/Kiritimati") != local_today("Pacific/Pago_Pago")
+    assert local_today("Not/AZone") == datetime.now(timezone.utc).date()
+
+
+@pytest.fixture
+def user_id(app):
+    app.config.update({'TESTING': True})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(username='user1',
+                    pw_hash=generate_password_hash('pass1', method='pbkdf2:sha256'))
+        db.session.add(user)
+        db.session.commit()
+        yield user.id
+        db.drop_all()
+
+
+def test_typed_columns_and_due_range(app, user_id):
+    ids = create_tasks_bulk(user_id, [
+        {"name": "a", "due_date": "2026-11-02", "start_time": "09:00 AM", "end_time": "5pm"},
+        {"name": "b", "start_date": "December 1st, 2026"},
+        {"name": "c", "due_date": "someday"},
+    ])
+    a, b, c = (db.session.get(Task, i) for i in ids)
+    assert (a.due_on, a.starts_at, a.ends_at) == (date(2026, 11, 2), time(9), time(17))
+    assert b.start_on == b.due_on == date(2026, 12, 1)
+    assert c.due_on is None and c.due_date == "someday"
+
+    with app.test_client() as client:
+        client.post('/login', data={'username': 'user1', 'password': 'pass1'})
+        page = client.get('/api/tasks?due_from=2026-11-01&due_to=2026-11-30').get_json()
+        assert [t['name'] for t in page['tasks']] == ['a']
+        assert client.get('/api/tasks?due_from=soon').status_code == 400
+
+
+def test_backfill_resolves_against_creation_day(user_id):
+    db.session.add(Task(user_id=user_id, name="old", due_date="Tomorrow",
+                        created_at=datetime(2025, 3, 10, 12)))
+    db.session.commit()
+    assert normalize_task_dates() == 1
+    assert Task.query.one().due_on == date(2025, 3, 11)
+    assert normalize_task_dates() == 0
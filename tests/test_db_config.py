@@ -0,0 +1,85 @@
+import json
+from flask import Flask
+from sqlalchemy import text
+from database import db, init_db, configure_database, upgrade_schema
+
+
+def make_app(uri):
+    app = Flask(__name__)
+    app.config.update({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": uri,
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+    })
+    return app
+
+
+def test_sqlite_connections_get_production_pragmas(tmp_path, monkeypatch):
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    app = make_app(f"sqlite:///{tmp_path / 'wal.db'}")
+    init_db(app)
+    with app.app_context():
+        with db.engine.connect() as conn:
+            pragma = lambda name: conn.execute(text(f"PRAGMA {name}")).scalar()
+            assert pragma("journal_mode") == "wal"
+            assert pragma("synchronous") == 1  # NORMAL
+            assert pragma("busy_timeout") == 5000
+        assert db.engine.pool.size() == 5
+
+
+def test_env_and_config_file_override(tmp_path, monkeypatch):
+    config_file = tmp_path / "db.json"
+    config_file.write_text(json.dumps({
+        "SQLALCHEMY_ENGINE_OPTIONS": {"pool_recycle": 60},
+        "SQLITE_PRAGMAS": {"busy_timeout": 250},
+    }))
+    monkeypatch.setenv("ECHONOTE_DB_CONFIG", str(config_file))
+    monkeypatch.setenv("DATABASE_URL", "postgres://u:p@db.example/echo")
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+
+    app = make_app("sqlite:///ignored.db")
+    configure_database(app)
+    assert app.config["SQLALCHEMY_DATABASE_URI"] == \
+        "postgresql://u:p@db.example/echo"
+    options = app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+    assert options["pool_recycle"] == 60
+    assert options["pool_size"] == 20
+    assert app.config["SQLITE_PRAGMAS"]["busy_timeout"] == 250
+    assert app.config["SQLITE_PRAGMAS"]["journal_mode"] == "WAL"
+
+
+def test_upgrade_schema_adds_missing_indexes(tmp_path, monkeypatch):
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    app = make_app(f"sqlite:///{tmp_path / 'old.db'}")
+    init_db(app)
+    with app.app_context():
+        db.create_all()
+        # simulate a database created before the indexes existed
+        db.session.execute(text("DROP INDEX ix_tasks_user_created"))
+        db.session.execute(text("DROP INDEX ix_events_user_start"))
+        db.session.commit()
+
+        assert sorted(upgrade_schema()) == ["ix_events_user_start",
+                                            "ix_tasks_user_created"]
+        assert upgrade_schema() == []
+        plan = db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM tasks WHERE user_id = 1 "
+            "ORDER BY created_at DESC")).all()
+        assert "ix_tasks_user_created" in str(plan)
+
+
+def test_upgrade_schema_adds_missing_columns(tmp_path, monkeypatch):
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    app = make_app(f"sqlite:///{tmp_path / 'old.db'}")
+    init_db(app)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(text("ALTER TABLE users DROP COLUMN data_version"))
+        db.session.execute(text(
+            "INSERT INTO users (username, pw_hash) VALUES ('old', 'x')"))
+        db.session.commit()
+
+        assert "users.data_version" in upgrade_schema()
+        version = db.session.execute(text(
+            "SELECT data_version FROM users WHERE username = 'old'")).scalar()
+        assert version == 0
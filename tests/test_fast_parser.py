@@ -0,0 +1,63 @@
+import json
+from datetime import date
+from dates import parse_date
+from fast_parser import fast_parse
+from genai_parser import TaskParser
+
+
+class CountingModel:
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        answer = [{"text": "from model", "due": None}]
+        return type('R', (object,), {'text': json.dumps(answer)})()
+
+
+def test_common_shapes():
+    tasks, confidence = fast_parse("remind me to buy milk tomorrow")
+    assert confidence == 1.0
+    assert tasks[0]["text"] == "buy milk" and tasks[0]["due"] == "tomorrow"
+
+    task = fast_parse("gym every weekday from 9 to 5")[0][0]
+    assert (task["repeat"], task["start_time"], task["end_time"]) == \
+        ("weekdays", "09:00 AM", "05:00 PM")
+
+    task = fast_parse("call mom at 5pm on friday")[0][0]
+    assert (task["text"], task["due"], task["start_time"]) == \
+        ("call mom", "Friday", "05:00 PM")
+
+    task = fast_parse("standup every Monday at 9:30 am")[0][0]
+    assert (task["repeat"], task["start_date"]) == ("weekly", "Monday")
+
+    # relative days stay relative; saving resolves them in the user's timezone
+    task = fast_parse("renew passport in 3 days")[0][0]
+    assert task["due"] == "in 3 days"
+    assert parse_date(task["due"], today=date(2024, 5, 30)) == date(2024, 6, 2)
+
+
+def test_low_confidence_for_what_it_cannot_parse():
+    assert fast_parse("buy milk and call mom")[1] == 0
+    assert fast_parse("finish report then email the team")[1] == 0
+    assert fast_parse("dentist on March 3rd")[1] < 0.8
+    assert fast_parse("")[1] == 0
+    # "today's" is not "today", and which friday "next friday" is isn't obvious
+    assert fast_parse("read today's paper")[1] < 0.8
+    assert fast_parse("call the bank next friday")[1] < 0.8
+    assert fast_parse("plan every day's meals")[1] < 0.8
+
+
+def test_task_parser_skips_model_when_confident():
+    parser = TaskParser(model=CountingModel(), fast_threshold=0.8)
+    assert parser.parse_transcript("buy milk tomorrow")[0]["text"] == "buy milk"
+    assert parser.parse_transcript("dentist on March 3rd")[0]["text"] == "from model"
+    results = parser.parse_transcripts(["walk the dog", "buy milk and call mom"])
+    assert [r[0]["text"] for r in results] == ["walk the dog", "from model"]
+    assert len(parser.model.prompts) == 2
+    assert parser.stats == {"fast": 2, "model": 2}
+
+    # off by default: everything goes to the model
+    parser = TaskParser(model=CountingModel())
+    parser.parse_transcript("buy milk tomorrow")
+    assert len(parser.model.prompts) == 1
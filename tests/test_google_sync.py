@@ -0,0 +1,219 @@
+import time
+import pytest
+from app import db
+from database import User, create_task
+from google_sync import FakeGoogleService, FakeHttpError, retry_delay
+from werkzeug.security import generate_password_hash
+
+CREDS = {"token": "t", "refresh_token": "r", "client_id": "c",
+         "client_secret": "s", "token_uri": "https://oauth2.googleapis.com/token",
+         "scopes": []}
+
+
+@pytest.fixture
+def fake(app):
+    service = FakeGoogleService()
+    app.extensions["clients"].override_service("tasks", "v1", service)
+    app.extensions["clients"].override_service("calendar", "v3", service)
+    app.extensions["google_sync"].backoff = 0
+    return service
+
+
+@pytest.fixture
+def client(app, fake):
+    app.config.update({'TESTING': True})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(
+            username='user1',
+            pw_hash=generate_password_hash('pass1', method='pbkdf2:sha256')
+        )
+        db.session.add(user)
+        db.session.commit()
+        ids = [
+            create_task(user.id, "Gym", due_date="2030-01-07").id,
+            create_task(user.id, "Math class", start_date="2030-01-08",
+                        start_time="09:00 AM", end_time="11:30 AM").id,
+            create_task(user.id, "Someday").id,
+        ]
+
+    with app.test_client() as c:
+        c.post('/login', data={'username': 'user1', 'password': 'pass1'})
+        with c.session_transaction() as s:
+            s['credentials'] = CREDS
+        c.task_ids = ids
+        yield c
+
+
+def test_sync_tasks_per_item_results(client, fake):
+    ids = client.task_ids
+    res = client.post('/api/google_sync', json={'task_ids': ids + [999]})
+    body = res.get_json()
+    assert res.status_code == 200
+    assert [r['status'] for r in body['results']] == ['created'] * 3 + ['not_found']
+    assert body['created'] == 3 and body['failed'] == 1
+    titles = {t['title']: t for t in fake.created['tasks']}
+    assert titles['Gym']['due'] == '2030-01-07T00:00:00.000Z'
+    assert 'due' not in titles['Someday']
+
+
+def test_sync_calendar_builds_events(client, fake):
+    res = client.post('/api/google_sync', json={
+        'task_ids': client.task_ids, 'target': 'calendar',
+        'timezone': 'America/New_York'})
+    results = res.get_json()['results']
+    assert [r['status'] for r in results] == ['created', 'created', 'failed']
+    assert results[2]['error'] == 'Task has no start date'
+    events = {e['summary']: e for e in fake.created['events']}
+    assert events['Gym']['start'] == {'date': '2030-01-07'}
+    assert events['Math class']['end']['dateTime'] == '2030-01-08T11:30:00-05:00'
+
+
+def test_rate_limited_calls_are_retried(client, fake):
+    fake.rate_limit = 2
+    fake.fail_titles = {'Someday'}
+    res = client.post('/api/google_sync', json={'task_ids': client.task_ids})
+    results = res.get_json()['results']
+    assert [r['status'] for r in results] == ['created', 'created', 'failed']
+    assert sum(r['attempts'] for r in results) == 5  # 3 inserts + 2 retried 429s
+    assert results[2]['attempts'] == 1  # 400s are not retried
+
+
+def test_sync_requires_google_and_valid_ids(client):
+    assert client.post('/api/google_sync', json={'task_ids': 'x'}).status_code == 400
+    with client.session_transaction() as s:
+        del s['credentials']
+    assert client.post('/api/google_sync',
+                       json={'task_ids': client.task_ids}).status_code == 401
+
+
+def test_items_run_concurrently(app, client, fake):
+    with app.app_context():
+        user = User.query.one()
+        for i in range(12):
+            create_task(user.id, f"Task {i}")
+    fake.latency = 0.2
+    start = time.monotonic()
+    client.post('/api/google_sync', json={})
+    assert len(fake.created['tasks']) == 15
+    assert time.monotonic() - start < 15 * 0.2 / 2
+
+
+def test_retry_delay_honours_retry_after():
+    assert retry_delay(FakeHttpError(429, retry_after=3), 1, 0.5) == 3
+    assert retry_delay(FakeHttpError(400), 1, 0.5) is None
+    assert retry_delay(FakeHttpError(403, content=b'"rateLimitExceeded"'), 1, 0) == 0
+    assert retry_delay(ValueError("boom"), 1, 0.5) is None
+
+
+def test_unchanged_tasks_are_not_pushed_again(client, fake):
+    ids = client.task_ids
+    client.post('/api/google_sync', json={'task_ids': ids})
+    calls = fake.calls
+
+    res = client.post('/api/google_sync', json={})  # all of the user's tasks
+    assert res.get_json()['unchanged'] == 3
+    assert fake.calls == calls
+
+    client.put(f'/api/tasks/{ids[0]}', json={'name': 'Gym at 6'})
+    res = client.post('/api/google_sync', json={'task_ids': ids})
+    body = res.get_json()
+    assert [r['status'] for r in body['results']] == ['updated', 'unchanged', 'unchanged']
+    assert len(fake.created['tasks']) == 3  # patched, not duplicated
+    remote = fake.items['tasks'][body['results'][0]['remote_id']]
+    assert remote['title'] == 'Gym at 6'
+    assert client.get('/api/tasks').get_json()['tasks'][0]['synced_at']
+
+
+def test_sync_of_all_tasks_is_capped_and_continued(app, client, fake, monkeypatch):
+    monkeypatch.setitem(app.config, 'MAX_SYNC_ITEMS', 2)
+    first = client.post('/api/google_sync', json={}).get_json()
+    assert [r['id'] for r in first['results']] == client.task_ids[:2]
+    assert first['next_cursor'] == client.task_ids[1]
+    rest = client.post('/api/google_sync', json={'cursor': first['next_cursor']}).get_json()
+    assert [r['id'] for r in rest['results']] == client.task_ids[2:]
+    assert rest['next_cursor'] is None and len(fake.created['tasks']) == 3
+    assert client.post('/api/google_sync', json={'cursor': 'x'}).status_code == 400
+
+
+def test_calendar_pushes_are_mirrored_by_events(app, client, fake):
+    ids = client.task_ids[:2]
+    client.post('/api/google_sync', json={'task_ids': ids, 'target': 'calendar'})
+    res = client.post('/api/google_sync', json={'task_ids': ids, 'target': 'calendar'})
+    assert res.get_json()['unchanged'] == 2
+    with app.app_context():
+        from database import Event
+        events = Event.query.order_by(Event.task_id).all()
+        assert [e.task_id for e in events] == ids
+        assert events[1].start_time.hour == 9
+
+
+def test_remote_delete_is_pushed_again(client, fake):
+    task_id = client.task_ids[0]
+    first = client.post('/api/google_sync', json={'task_ids': [task_id]})
+    remote_id = first.get_json()['results'][0]['remote_id']
+    fake.remote_delete('tasks', remote_id)
+    client.put(f'/api/tasks/{task_id}', json={'name': 'Gym twice'})
+    result = client.post('/api/google_sync', json={'task_ids': [task_id]}) \
+        .get_json()['results'][0]
+    assert result['status'] == 'created' and result['remote_id'] != remote_id
+
+
+def test_pull_applies_only_remote_changes(app, client, fake):
+    ids = client.task_ids
+    results = client.post('/api/google_sync', json={'task_ids': ids}).get_json()['results']
+    first = client.post('/api/google_sync/pull', json={}).get_json()
+    assert first == {'received': 3, 'changed': 3}
+
+    fake.remote_update('tasks', results[1]['remote_id'], title='Math (moved)',
+                       status='completed')
+    fake.page_size = 1
+    with app.app_context():
+        from database import SyncState
+        state = SyncState.query.filter_by(resource='tasks').one()
+        # pretend the last pull was long ago so only updatedMin filters
+        state.last_pulled_at = state.last_pulled_at.replace(year=2000)
+        db.session.commit()
+    assert client.post('/api/google_sync/pull', json={}).get_json()['changed'] == 3
+
+    task = [t for t in client.get('/api/tasks').get_json()['tasks'] if t['id'] == ids[1]][0]
+    assert task['name'] == 'Math (moved)' and task['completed'] is True
+    # pulled state counts as synced: nothing to push back
+    res = client.post('/api/google_sync', json={'task_ids': ids}).get_json()
+    assert res['unchanged'] == 3
+
+
+def test_pulled_due_date_survives_the_next_push(client, fake):
+    gym = client.task_ids[0]
+    remote_id = client.post('/api/google_sync', json={'task_ids': [gym]}) \
+        .get_json()['results'][0]['remote_id']
+    fake.remote_update('tasks', remote_id, due='2030-02-01T00:00:00.000Z')
+    client.post('/api/google_sync/pull', json={})
+
+    task = [t for t in client.get('/api/tasks').get_json()['tasks'] if t['id'] == gym][0]
+    assert task['due_on'] == '2030-02-01'
+    assert client.get('/api/tasks?due_from=2030-02-01').get_json()['tasks'][0]['id'] == gym
+    assert client.post('/api/google_sync', json={'task_ids': [gym]}).get_json()['unchanged'] == 1
+
+    # a local edit pushes the pulled due date, not the one saved before
+    client.put(f'/api/tasks/{gym}', json={'name': 'Gym (Feb)'})
+    client.post('/api/google_sync', json={'task_ids': [gym]})
+    assert fake.items['tasks'][remote_id]['due'] == '2030-02-01T00:00:00.000Z'
+
+
+def test_calendar_pull_uses_sync_token(app, client, fake):
+    ids = client.task_ids[:2]
+    results = client.post('/api/google_sync', json={
+        'task_ids': ids, 'target': 'calendar'}).get_json()['results']
+    pull = lambda: client.post('/api/google_sync/pull', json={'target': 'calendar'}).get_json()
+    assert pull() == {'received': 2, 'changed': 2}
+    assert pull() == {'received': 0, 'changed': 0}  # nothing new since the token
+
+    fake.remote_update('events', results[0]['remote_id'], summary='Gym (Google)')
+    assert pull() == {'received': 1, 'changed': 1}
+    fake.min_sync_token = 10 ** 6  # token expired: falls back to a full listing
+    assert pull()['received'] == 2
+    with app.app_context():
+        from database import Event
+        assert Event.query.filter_by(task_id=ids[0]).one().title == 'Gym (Google)'
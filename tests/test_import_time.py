@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+from bench_import import LAZY_MODULES, ROOT, import_times  # noqa: E402
+
+# generous enough for a slow CI box; `import app` takes well under half of it
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", 1500))
+
+
+def test_import_app_skips_google_sdks():
+    times = import_times()
+    assert [m for m in LAZY_MODULES if m in times] == []
+    # best of three so one slow run on a busy machine doesn't fail the build
+    best = min(times["app"], import_times()["app"], import_times()["app"])
+    assert best / 1000 < IMPORT_BUDGET_MS
+
+
+def test_clients_are_built_on_first_use():
+    code = ("import sys, app\n"
+            "assert not hasattr(app, 'app')  # importing builds no app\n"
+            "flask_app = app.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})\n"
+            "assert flask_app.extensions['clients']._instances == {}\n"
+            "assert flask_app.extensions['task_parser']._model is None\n"
+            "with flask_app.app_context():\n"
+            "    assert type(app.get_speech_client()).__name__ == 'DummySpeechClient'\n"
+            "assert 'google.generativeai' not in sys.modules\n")
+    env = dict(os.environ, FLASK_ENV="testing")
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True)
+
+
+def test_import_opens_no_parse_cache(tmp_path):
+    cache_db = tmp_path / "parse_cache.db"
+    env = dict(os.environ, FLASK_ENV="testing", PARSE_CACHE_DB=str(cache_db))
+    subprocess.run([sys.executable, "-c", "import app"], cwd=ROOT, env=env, check=True)
+    assert not cache_db.exists()
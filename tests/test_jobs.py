@@ -0,0 +1,100 @@
+import io
+import pytest
+import app as app_module
+from app import db
+from database import User, Task, create_job
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def client(app, monkeypatch):
+    app.config.update({
+        'TESTING': True,
+        'JOB_RETRY_BACKOFF': 0,
+    })
+    monkeypatch.setattr(app.extensions['task_parser'], "parse_transcript",
+                        lambda text: [{"text": text, "due": None}])
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(
+            username='user1',
+            pw_hash=generate_password_hash('pass1', method='pbkdf2:sha256')
+        )
+        db.session.add(user)
+        db.session.commit()
+
+    with app.test_client() as c:
+        c.post('/login', data={'username': 'user1', 'password': 'pass1'})
+        yield c
+
+
+def wait_for(client, job_id):
+    status = None
+    for _ in range(50):
+        url = f'/api/jobs/{job_id}?wait=1'
+        if status:
+            url += f'&status={status}'
+        job = client.get(url).get_json()
+        if job['status'] in ('done', 'failed'):
+            return job
+        status = job['status']
+    raise AssertionError("job never finished")
+
+
+def test_transcript_job_saves_tasks(app, client):
+    res = client.post('/api/jobs', json={'transcript': 'water the plants'})
+    assert res.status_code == 202
+    job = wait_for(client, res.get_json()['id'])
+    assert job['status'] == 'done'
+    assert job['result'] == {'saved': 1}
+    with app.app_context():
+        assert Task.query.one().name == 'water the plants'
+
+
+def test_audio_pipeline_retries_failed_recognition(client, monkeypatch):
+    calls = []
+
+    def flaky_recognize(audio_bytes):
+        calls.append(audio_bytes)
+        if len(calls) == 1:
+            raise RuntimeError("speech backend timed out")
+        return "call mom"
+    monkeypatch.setattr(app_module, "recognize_audio", flaky_recognize)
+
+    data = {'audio': (io.BytesIO(b'\x00' * 32), 'clip.webm')}
+    res = client.post('/api/jobs', data=data,
+                      content_type='multipart/form-data')
+    job = wait_for(client, res.get_json()['id'])
+    assert job['status'] == 'done'
+    assert job['attempts'] == 2
+    assert job['result'] == {'transcript': 'call mom', 'saved': 1}
+
+
+def test_unknown_job_is_404(app, client):
+    assert client.get('/api/jobs/nope').status_code == 404
+    with pytest.raises(ValueError):
+        app.extensions['job_queue'].submit(1, 'no-such-kind')
+
+
+def test_failed_db_write_is_rolled_back_and_job_fails(app, client, monkeypatch):
+    def duplicate_user(job):
+        db.session.add(User(username='user1', pw_hash='x'))
+        db.session.commit()  # IntegrityError: username is unique
+    job_queue = app.extensions['job_queue']
+    monkeypatch.setitem(job_queue.handlers, 'broken', duplicate_user)
+    with app.app_context():
+        job = job_queue.submit(1, 'broken')
+    job = wait_for(client, job.id)
+    assert job['status'] == 'failed' and job['attempts'] == 3
+    assert 'UNIQUE' in job['error']
+
+
+def test_stored_jobs_are_resumed(app, client):
+    with app.app_context():
+        job_id = create_job('left-over', 1, 'parse', payload={'transcript': 'feed the cat'}).id
+    job_queue = app.extensions['job_queue']
+    assert job_queue.resume() == 1
+    assert wait_for(client, job_id)['result'] == {'saved': 1}
+    assert job_queue.resume() == 0  # done jobs stay done
@@ -0,0 +1,91 @@
+import io
+import math
+import time
+import wave
+import numpy as np
+import pytest
+from app import db
+from audio import chunk_audio, frame_energy_db, prepare_audio, split_points
+from database import User
+from transcription import ChunkedTranscriber, FakeRecognizer, stitch_transcripts
+from werkzeug.security import generate_password_hash
+
+RATE = 16000
+
+
+def speech_like(seconds, burst=4.0, pause=0.6):
+    """Tone bursts ("phrases") separated by short pauses."""
+    t = np.arange(int(seconds * RATE)) / RATE
+    talking = (t % (burst + pause)) < burst
+    noise = np.random.default_rng(1).normal(0, 1e-4, len(t))
+    return (0.4 * np.sin(2 * np.pi * 300 * t) * talking + noise).astype(np.float32)
+
+
+def to_wav(samples):
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes((samples * 32767).astype('<i2').tobytes())
+    return buf.getvalue()
+
+
+def test_stitch_drops_repeated_overlap():
+    assert stitch_transcripts(["buy milk and eggs", "And eggs tomorrow", "", "tomorrow at noon"]) \
+        == "buy milk and eggs tomorrow tomorrow at noon"
+    assert stitch_transcripts(["call mom", "call mom again"]) == "call mom again"
+    assert stitch_transcripts(["one two", "three"]) == "one two three"
+    # one common word at a boundary is a coincidence, not shared audio
+    assert stitch_transcripts(["walk to the", "the store"]) == "walk to the the store"
+    # nor is a run longer than 2 * 0.5 s of speech can hold
+    assert stitch_transcripts(["a b c d e f", "a b c d e f g"]) == "a b c d e f a b c d e f g"
+    assert stitch_transcripts(["a b c d e f", "c d e f g"], overlap=1.0) == "a b c d e f g"
+
+
+def test_cuts_land_in_pauses():
+    samples = speech_like(100)
+    cuts = split_points(samples, RATE, max_chunk=30)
+    bounds = [0] + cuts + [len(samples)]
+    assert all(b - a <= 30 * RATE for a, b in zip(bounds, bounds[1:]))
+    db = frame_energy_db(samples, RATE)
+    for cut in cuts:
+        assert db[cut // (RATE * 30 // 1000)] < -60  # silent frame, not mid-phrase
+
+
+def test_chunks_recognized_in_parallel_and_in_order():
+    prepared = prepare_audio(to_wav(speech_like(120)))
+    chunks = chunk_audio(prepared, max_chunk=30)
+    assert len(chunks) >= 4
+    recognizer = FakeRecognizer(latency=0.3)
+    start = time.monotonic()
+    text = ChunkedTranscriber(max_workers=8).transcribe(chunks, recognizer)
+    assert time.monotonic() - start < 0.3 * len(chunks) / 2
+    expected = [f"word{i}" for i in range(math.ceil(prepared.duration * 2))]
+    assert text.split() == expected  # every word once, in order
+
+
+@pytest.fixture
+def client(app):
+    app.config.update({'TESTING': True, 'SPEECH_BACKEND': 'fake'})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(User(username='user1', pw_hash=generate_password_hash(
+            'pass1', method='pbkdf2:sha256')))
+        db.session.commit()
+    with app.test_client() as c:
+        c.post('/login', data={'username': 'user1', 'password': 'pass1'})
+        yield c
+    app.config['SPEECH_BACKEND'] = 'google'
+    with app.app_context():
+        db.drop_all()
+
+
+def test_long_upload_is_chunked(client):
+    wav = to_wav(speech_like(90))
+    res = client.post('/api/transcribe', data={'audio': (io.BytesIO(wav), 'long.wav')},
+                      content_type='multipart/form-data')
+    words = res.get_json()['transcript'].split()
+    assert words[0] == 'word0' and len(words) == len(set(words))
+    assert int(words[-1][4:]) == len(words) - 1
@@ -0,0 +1,107 @@
+import io
+import json
+import logging
+import re
+import pytest
+from app import db
+from database import User
+from genai_parser import TaskParser
+from metrics import Registry
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def client(app):
+    app.config.update({'TESTING': True})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(User(username='user1',
+                            pw_hash=generate_password_hash('pass1', method='pbkdf2:sha256:1000')))
+        db.session.commit()
+    with app.test_client() as c:
+        c.post('/login', data={'username': 'user1', 'password': 'pass1'})
+        yield c
+
+
+def sample(text, name, **labels):
+    """Value of one sample line in Prometheus text output."""
+    want = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    for line in text.splitlines():
+        m = re.match(rf"{name}(?:\{{(.*)\}})? (\S+)$", line)
+        if m and all(pair in (m.group(1) or "") for pair in want.split(",") if pair):
+            return float(m.group(2))
+    return None
+
+
+def test_metrics_endpoint(app, client):
+    metrics = app.extensions['metrics']
+    before = metrics.requests.count(endpoint="main.list_tasks", method="GET", status=200)
+    client.get('/api/tasks')
+    client.post('/api/save_theme', json={'bg': 'black'})
+    text = client.get('/metrics').get_data(as_text=True)
+
+    assert "# TYPE echonote_request_duration_seconds histogram" in text
+    assert sample(text, "echonote_request_duration_seconds_count",
+                  endpoint="main.list_tasks", method="GET", status="200") == before + 1
+    assert sample(text, "echonote_request_sql_queries_count", endpoint="main.list_tasks") >= 1
+    assert sample(text, "echonote_stage_duration_seconds_count", stage="db_commit") >= 1
+    assert sample(text, "echonote_cache_hit_ratio", cache="user") is not None
+    assert sample(text, "echonote_sql_queries_total") > 0
+
+    # no token: localhost only
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '10.0.0.7'}).status_code == 403
+    app.config['METRICS_TOKEN'] = 'secret'
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
+
+
+def test_transcription_failures_are_logged_and_counted(app, client, caplog):
+    class Broken:
+        def recognize(self, *args, **kwargs):
+            raise RuntimeError("recognizer down")
+    app.config.update({'AUDIO_PREPROCESS': False, 'TRANSCRIPT_CACHE': False})
+    app.extensions['clients'].override('speech', Broken())
+    res = client.post('/api/transcribe', data={'audio': (io.BytesIO(b'\x00' * 64), 'a.wav')},
+                      content_type='multipart/form-data')
+    assert res.status_code == 500
+    assert any(r.message == "Error transcribing audio" and r.exc_info for r in caplog.records)
+    text = client.get('/metrics').get_data(as_text=True)
+    assert sample(text, "echonote_request_errors_total", endpoint="main.transcribe_audio") == 1
+
+
+def test_gemini_and_json_cleanup_timed(app):
+    model = type('M', (), {'generate_content': lambda self, prompt: type(
+        'R', (), {'text': json.dumps([{"text": "x", "due": None}])})()})()
+    parser = TaskParser(model=model)
+    parser.parse_transcript("untimed: no app")
+    with app.app_context():
+        parser.parse_transcript("anything")
+    stages = app.extensions['metrics'].stages
+    assert stages.count(stage="gemini") == 1
+    assert stages.count(stage="json_cleanup") == 1
+
+
+def test_histogram_rendering():
+    registry = Registry()
+    hist = registry.histogram("h", "help", ("route",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        hist.observe(value, route='a"b')
+    text = registry.render()
+    assert 'h_bucket{route="a\\"b",le="0.1"} 1' in text
+    assert 'h_bucket{route="a\\"b",le="+Inf"} 3' in text
+    assert sample(text, "h_sum") == pytest.approx(5.55)
+
+
+def test_disabled_log_levels_cost_nothing():
+    class Expensive:
+        def __str__(self):
+            raise AssertionError("formatted a message nobody logs")
+
+    logger = logging.getLogger("genai_parser")
+    level = logger.level
+    logger.setLevel(logging.INFO)
+    try:
+        logger.debug("Raw Gemini output: %s", Expensive())
+    finally:
+        logger.setLevel(level)
@@ -1,12 +1,11 @@
 import os
 import tempfile
 import pytest
-import app as app_module
-from app import app, db, task_parser
+from app import db
 from database import User, Task
 
 @pytest.fixture
-def client(monkeypatch, tmp_path):
+def client(app, tmp_path):
     db_file = tmp_path / "test.db"
     app.config.update({
         "TESTING": True,
@@ -17,7 +16,7 @@ def client(monkeypatch, tmp_path):
     class DummyClient:
         def recognize(self, *args, **kwargs):
             raise NotImplementedError
-    monkeypatch.setattr(app_module, "speech_client", DummyClient())
+    app.extensions["clients"].override("speech", DummyClient())
 
     # create tables
     with app.app_context():
@@ -60,11 +59,11 @@ def test_unauthorized_api_access(client):
     assert rv.status_code == 302
     assert "/login" in rv.headers["Location"]
 
-def test_task_isolation_between_two_users(client, monkeypatch):
+def test_task_isolation_between_two_users(app, client, monkeypatch):
     # make parse_transcript always return one task
     def fake_parse(text):
         return [{"text":"shared_task","due":None}]
-    monkeypatch.setattr(task_parser, "parse_transcript", fake_parse)
+    monkeypatch.setattr(app.extensions['task_parser'], "parse_transcript", fake_parse)
 
     # user 1 checks
     c1 = client
@@ -75,7 +74,7 @@ def test_task_isolation_between_two_users(client, monkeypatch):
     assert resp.status_code == 200
     assert "1 tasks saved" in resp.get_json()["message"]
     # list tasks
-    tasks1 = c1.get("/api/tasks").get_json()
+    tasks1 = c1.get("/api/tasks").get_json()['tasks']
     assert len(tasks1) == 1
     assert tasks1[0]["name"] == "shared_task"
     # logout u1
@@ -86,11 +85,11 @@ def test_task_isolation_between_two_users(client, monkeypatch):
     c2.post("/sign_up", data={"username":"u2","password":"p2"})
     c2.post("/login",    data={"username":"u2","password":"p2"})
     # list tasks => empty
-    tasks2 = c2.get("/api/tasks").get_json()
+    tasks2 = c2.get("/api/tasks").get_json()['tasks']
     assert tasks2 == []
     # save one for u2
     c2.post("/api/save_task", json={"transcript":"foo"})
-    tasks2b = c2.get("/api/tasks").get_json()
+    tasks2b = c2.get("/api/tasks").get_json()['tasks']
     assert len(tasks2b) == 1
     assert tasks2b[0]["name"] == "shared_task"
     # logout u2
@@ -98,21 +97,21 @@ def test_task_isolation_between_two_users(client, monkeypatch):
 
     # login back as u1 and ensure still only 1
     c1.post("/login", data={"username":"u1","password":"p1"})
-    tasks1_again = c1.get("/api/tasks").get_json()
+    tasks1_again = c1.get("/api/tasks").get_json()['tasks']
     assert len(tasks1_again) == 1
 
-def test_update_and_delete_permissions(client, monkeypatch):
+def test_update_and_delete_permissions(app, client, monkeypatch):
     # stub parse_transcript again
     def fake_parse(text):
         return [{"text":"perm_task","due":None}]
-    monkeypatch.setattr(task_parser, "parse_transcript", fake_parse)
+    monkeypatch.setattr(app.extensions['task_parser'], "parse_transcript", fake_parse)
 
     # user1 create
     c1 = client
     c1.post("/sign_up", data={"username":"a","password":"a"})
     c1.post("/login",    data={"username":"a","password":"a"})
     c1.post("/api/save_task", json={"transcript":"x"})
-    tid = c1.get("/api/tasks").get_json()[0]["id"]
+    tid = c1.get("/api/tasks").get_json()['tasks'][0]["id"]
     c1.get("/logout")
 
     # user2 create and try to touch user1's
@@ -129,9 +128,9 @@ def test_update_and_delete_permissions(client, monkeypatch):
     c1.post("/login", data={"username":"a","password":"a"})
     rv_up2  = c1.put(f"/api/tasks/{tid}", json={"name":"done","completed":True})
     assert rv_up2.status_code == 200
-    upd = c1.get("/api/tasks").get_json()[0]
+    upd = c1.get("/api/tasks").get_json()['tasks'][0]
     assert upd["name"] == "done"
 
     rv_del2 = c1.delete(f"/api/tasks/{tid}")
     assert rv_del2.status_code == 200
-    assert c1.get("/api/tasks").get_json() == []
\ No newline at end of file
+    assert c1.get("/api/tasks").get_json()['tasks'] == []
\ No newline at end of file
@@ -0,0 +1,75 @@
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from database import User, Task
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def client(app):
+    app.config.update({'TESTING': True})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(
+            username='user1',
+            pw_hash=generate_password_hash('pass1', method='pbkdf2:sha256')
+        )
+        db.session.add(user)
+        db.session.commit()
+        base = datetime(2025, 7, 1, 9, 0)
+        # two tasks share each timestamp so ties on created_at are covered
+        for i in range(10):
+            db.session.add(Task(user_id=user.id, name=f"task {i}",
+                                completed=i % 2 == 0,
+                                created_at=base + timedelta(days=i // 2)))
+        db.session.commit()
+
+    with app.test_client() as c:
+        c.post('/login', data={'username': 'user1', 'password': 'pass1'})
+        yield c
+
+
+def test_cursor_walks_every_task_once_newest_first(client):
+    seen, cursor = [], None
+    while True:
+        url = '/api/tasks?limit=3' + (f'&cursor={cursor}' if cursor else '')
+        page = client.get(url).get_json()
+        assert len(page['tasks']) <= 3
+        seen.extend(t['name'] for t in page['tasks'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert len(seen) == 10 and len(set(seen)) == 10
+    assert len(client.get('/api/tasks').get_json()['tasks']) == 10
+    assert seen[0] in ('task 8', 'task 9') and seen[-1] in ('task 0', 'task 1')
+
+
+def test_filters_and_bad_cursor(client):
+    page = client.get('/api/tasks?completed=false').get_json()
+    assert sorted(t['name'] for t in page['tasks']) == \
+        ['task 1', 'task 3', 'task 5', 'task 7', 'task 9']
+
+    page = client.get('/api/tasks?since=2025-07-02&until=2025-07-03') \
+        .get_json()
+    assert sorted(t['name'] for t in page['tasks']) == ['task 2', 'task 3']
+
+    assert client.get('/api/tasks?cursor=garbage').status_code == 400
+
+
+def test_index_renders_first_page_only(app, client):
+    app.config['TASKS_PAGE_SIZE'] = 4
+    try:
+        html = client.get('/').get_data(as_text=True)
+    finally:
+        app.config['TASKS_PAGE_SIZE'] = 50
+    assert html.count('class="task-item') == 4
+    assert 'data-next-cursor=""' not in html
+
+
+def test_default_page_size_and_limit_cap(app, client):
+    app.config['TASKS_PAGE_SIZE'] = 4
+    app.config['MAX_TASKS_PAGE_SIZE'] = 6
+    page = client.get('/api/tasks').get_json()
+    assert len(page['tasks']) == 4 and page['next_cursor']
+    assert len(client.get('/api/tasks?limit=1000').get_json()['tasks']) == 6
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+from genai_parser import TaskParser
+from parse_cache import ParseCache, make_key
+
+
+class FakeModel:
+    """Counts generate_content calls and always answers with one task."""
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        text = '[{"text": "Go to the gym", "due": "tomorrow"}]'
+        return type('R', (object,), {'text': text})()
+
+
+def make_parser(cache):
+    parser = TaskParser(cache=cache)
+    parser.model = FakeModel()
+    return parser
+
+
+def test_identical_transcripts_hit_the_cache():
+    cache = ParseCache()
+    parser = make_parser(cache)
+    parser.parse_transcript("Go to the gym tomorrow")
+    parser.parse_transcript("  go to the   GYM tomorrow ")
+    assert parser.model.calls == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cached_relative_dates_are_resolved_against_today():
+    parser = make_parser(ParseCache())
+    parser.prefill_gtask("Go to the gym tomorrow")
+    tasks = parser.prefill_gtask("Go to the gym tomorrow")
+    tomorrow = (datetime.today() + timedelta(days=1)).date().isoformat()
+    assert parser.model.calls == 1
+    assert tasks[0]["due"] == tomorrow
+    # the cache keeps the unresolved value, not the converted date
+    assert parser.parse_transcript("Go to the gym tomorrow")[0]["due"] \
+        == "tomorrow"
+
+
+def test_lru_eviction_and_ttl():
+    cache = ParseCache(max_entries=2, ttl=None)
+    for name in ("a", "b", "c"):
+        cache.set(make_key(name, "t"), [name])
+    assert cache.get(make_key("a", "t")) is None
+    assert cache.get(make_key("c", "t")) == ["c"]
+
+    expired = ParseCache(ttl=-1)
+    expired.set("k", [])
+    assert expired.get("k") is None
+
+
+def test_persisted_entries_survive_a_new_cache(tmp_path):
+    path = tmp_path / "cache.db"
+    ParseCache(persist_path=str(path)).set("k", [{"text": "x"}])
+    assert ParseCache(persist_path=str(path)).get("k") == [{"text": "x"}]
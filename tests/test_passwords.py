@@ -0,0 +1,102 @@
+import threading
+from flask import Flask
+import pytest
+from app import db
+from database import User
+from passwords import PasswordHasher, PasswordsBusy, method_id
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def client(app):
+    app.config.update({'TESTING': True})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for name in ('user1', 'user2'):
+            # other parameters than the configured ones
+            db.session.add(User(username=name,
+                                pw_hash=generate_password_hash('pass1', method='pbkdf2:sha256:2000')))
+        db.session.commit()
+    with app.test_client() as c:
+        yield c
+
+
+def test_rehash_on_login(app, client):
+    assert client.post('/login', data={'username': 'user1', 'password': 'pass1'}).status_code == 302
+    with app.app_context():
+        pw_hash = User.query.filter_by(username='user1').one().pw_hash
+    assert pw_hash.split('$')[0] == method_id(app.config['PASSWORD_HASH_METHOD'])
+    assert not app.extensions['passwords'].needs_rehash(pw_hash)
+    client.get('/logout')
+    # and the new hash still logs in
+    assert client.post('/login', data={'username': 'user1', 'password': 'pass1'}).status_code == 302
+
+
+def test_busy_pool_skips_the_rehash_not_the_login(app, client, monkeypatch):
+    def busy(password):
+        raise PasswordsBusy("busy")
+    passwords = app.extensions['passwords']
+    monkeypatch.setattr(passwords, "hash", busy)
+    assert client.post('/login', data={'username': 'user1', 'password': 'pass1'}).status_code == 302
+    with app.app_context():
+        assert passwords.needs_rehash(User.query.filter_by(username='user1').one().pw_hash)
+
+
+def test_failed_logins_limited_per_user(app, client):
+    app.extensions['rate_limiters']['LOGIN_USER'].limit = 3
+    for _ in range(3):
+        assert client.post('/login', data={'username': 'user1', 'password': 'x'}).status_code == 200
+    res = client.post('/login', data={'username': 'User1', 'password': 'pass1'})
+    assert res.status_code == 429 and int(res.headers['Retry-After']) > 0
+    # other accounts are unaffected
+    assert client.post('/login', data={'username': 'user2', 'password': 'pass1'}).status_code == 302
+
+
+def test_attempts_limited_per_ip(app, client):
+    app.extensions['rate_limiters']['LOGIN_IP'].limit = 2
+    client.post('/login', data={'username': 'user1', 'password': 'x'})
+    client.post('/login', data={'username': 'nobody', 'password': 'x'})
+    assert client.post('/login', data={'username': 'user2', 'password': 'pass1'}).status_code == 429
+
+
+def test_process_pool_and_backpressure():
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1)
+    try:
+        pw_hash = hasher.hash('secret')
+        assert hasher.verify(pw_hash, 'secret') and not hasher.verify(pw_hash, 'nope')
+        assert hasher.verify(None, 'secret') is False
+    finally:
+        hasher.shutdown()
+
+    full = PasswordHasher(workers=1, max_pending=0)
+    with pytest.raises(PasswordsBusy):
+        full.verify(pw_hash, 'secret')
+
+
+def test_one_pool_for_concurrent_first_calls():
+    hasher = PasswordHasher(workers=1)
+    pools = []
+    threads = [threading.Thread(target=lambda: pools.append(hasher._executor())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(pool) for pool in pools}) == 1
+    hasher.shutdown()
+
+
+def test_method_id_comes_from_the_pool_at_init(monkeypatch):
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1)
+    try:
+        hasher.init_app(Flask(__name__))
+        assert hasher._method_id_future is not None
+        hasher._method_id_future.result()  # pickled by a feeder thread; let it go first
+        monkeypatch.setattr('passwords.method_id', lambda method: pytest.fail('hashed inline'))
+        assert not hasher.needs_rehash(generate_password_hash('x', method='pbkdf2:sha256:1000'))
+    finally:
+        hasher.shutdown()
+
+
+def test_scrypt_hashes_fit_the_column():
+    assert len(generate_password_hash('x', method='scrypt:32768:8:1')) <= User.pw_hash.type.length
@@ -0,0 +1,55 @@
+import os
+import pytest
+from genai_parser import PromptTemplate
+
+
+@pytest.fixture
+def template_file(tmp_path):
+    path = tmp_path / "prompt.txt"
+    path.write_text("Extract tasks.")
+    return path
+
+
+def test_template_is_read_once(template_file, monkeypatch):
+    template = PromptTemplate(str(template_file), check_interval=60)
+    opened = []
+    real_open = open
+    monkeypatch.setattr("builtins.open",
+                        lambda *a, **k: opened.append(a) or real_open(*a, **k))
+    assert template.render("buy milk") == "Extract tasks.\n\nbuy milk"
+    assert template.render("call mom") == "Extract tasks.\n\ncall mom"
+    assert opened == []
+
+
+def test_template_reloads_when_mtime_changes(template_file):
+    template = PromptTemplate(str(template_file), check_interval=0)
+    old_version = template.version
+    template_file.write_text("Extract tasks as JSON.")
+    stat = os.stat(template_file)
+    os.utime(template_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert template.render("x").startswith("Extract tasks as JSON.")
+    assert template.version != old_version
+
+
+def test_admin_reload_endpoint_requires_token(app):
+    app.config.update({'TESTING': True, 'ADMIN_TOKEN': 'secret'})
+    client = app.test_client()
+    assert client.post('/admin/reload_prompt').status_code == 403
+
+    res = client.post('/admin/reload_prompt',
+                      headers={'X-Admin-Token': 'secret'})
+    assert res.status_code == 200
+    assert res.get_json()['version'] == app.extensions['task_parser'].template_version
+
+
+def test_marked_stale_reloads_on_next_render(template_file):
+    template = PromptTemplate(str(template_file), check_interval=60)
+    template_file.write_text("Extract tasks, briefly.")
+    template.mark_stale()  # what SIGHUP does; no file access in the handler
+    assert template.render("x").startswith("Extract tasks, briefly.")
+
+    # a missing file keeps the last good template instead of raising
+    template_file.unlink()
+    template.mark_stale()
+    assert template.render("x").startswith("Extract tasks, briefly.")
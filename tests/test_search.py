@@ -0,0 +1,79 @@
+import pytest
+from app import db
+from database import User, Task, create_task, create_tasks_bulk, create_event, update_task, delete_task, \
+    upgrade_schema, SEARCH_TABLE
+from sqlalchemy import text
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def client(app):
+    app.config.update({'TESTING': True})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for name in ('user1', 'user2'):
+            db.session.add(User(username=name,
+                                pw_hash=generate_password_hash('pass1', method='pbkdf2:sha256')))
+        db.session.commit()
+        create_tasks_bulk(1, [
+            {"name": "Buy groceries", "raw_text": "buy groceries for the party"},
+            {"name": "Call the plumber", "raw_text": "call the plumber about the kitchen sink"},
+            {"name": "Party playlist", "raw_text": "make a playlist"},
+        ])
+        create_task(2, "Buy groceries", raw_text="user2's groceries")
+        create_event(1, "Dentist", description="cleaning, bring the insurance card")
+
+        with app.test_client() as c:
+            c.post('/login', data={'username': 'user1', 'password': 'pass1'})
+            yield c
+        db.drop_all()
+
+
+def names(resp):
+    return [r['title'] for r in resp.get_json()['results']]
+
+
+def test_ranked_prefix_search(client):
+    # a title hit ranks above a body-only hit; "gro" matches as a prefix
+    assert names(client.get('/api/search?q=party')) == ['Party playlist', 'Buy groceries']
+    assert names(client.get('/api/search?q=gro')) == ['Buy groceries']
+    assert names(client.get('/api/search?q=insur')) == ['Dentist']
+    assert names(client.get('/api/search?q=insur&kind=task')) == []
+    result = client.get('/api/search?q=sink').get_json()['results'][0]
+    assert result['kind'] == 'task' and '[sink]' in result['snippet']
+    # FTS syntax typed by the user is just words
+    assert names(client.get('/api/search?q="plumb" OR NOT*')) == []
+    assert client.get('/api/search?q=').status_code == 400
+
+
+def test_numbers_match_text_not_user_ids(client):
+    # user1 has id 1: searching "1" must not return every one of their rows
+    assert names(client.get('/api/search?q=1')) == []
+    create_task(1, "Pay 1st installment")
+    assert names(client.get('/api/search?q=1')) == ['Pay 1st installment']
+    assert names(client.get('/api/search?q=2')) == []
+
+
+def test_index_follows_writes(client):
+    task = Task.query.filter_by(name="Call the plumber").one()
+    update_task(task.id, name="Call the electrician")
+    assert names(client.get('/api/search?q=plumber')) == ['Call the electrician']
+    assert names(client.get('/api/search?q=electric')) == ['Call the electrician']
+    delete_task(task.id)
+    assert names(client.get('/api/search?q=electric')) == []
+
+
+def test_pagination(client):
+    create_tasks_bulk(1, [{"name": f"report {i}"} for i in range(5)])
+    page = client.get('/api/search?q=report&limit=3').get_json()
+    assert len(page['results']) == 3 and page['next_offset'] == 3
+    rest = client.get('/api/search?q=report&limit=3&offset=3').get_json()
+    assert len(rest['results']) == 2 and rest['next_offset'] is None
+
+
+def test_upgrade_builds_missing_index(client):
+    db.session.execute(text(f"DROP TABLE {SEARCH_TABLE}"))
+    db.session.commit()
+    assert SEARCH_TABLE in upgrade_schema()
+    assert names(client.get('/api/search?q=gro')) == ['Buy groceries']
@@ -0,0 +1,128 @@
+import io
+import pytest
+from app import db
+from database import User, add_audio_file
+from storage import AudioStore, UploadTooLarge
+from werkzeug.security import generate_password_hash
+
+
+class CountingStream(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+def test_store_streams_hashes_and_dedups(tmp_path):
+    store = AudioStore(tmp_path)
+    stream = CountingStream(b'a' * 10000)
+    sha, size, created = store.save_stream(stream, chunk_size=1024)
+    assert (size, created) == (10000, True)
+    assert stream.reads == 11  # ten full chunks, then EOF
+    assert store.relpath(sha) == f"{sha[:2]}/{sha[2:4]}/{sha}"
+    assert store.read(sha) == b'a' * 10000
+
+    assert store.save_stream(io.BytesIO(b'a' * 10000))[2] is False
+    with pytest.raises(UploadTooLarge):
+        store.save_stream(io.BytesIO(b'b' * 5000), max_bytes=4096, chunk_size=1024)
+    assert not any((tmp_path / 'tmp').iterdir())  # partial file removed
+
+
+def test_delete_puts_back_bytes_claimed_meanwhile(tmp_path):
+    store = AudioStore(tmp_path)
+    sha = store.save_stream(io.BytesIO(b'z' * 100))[0]
+    store.delete(sha, in_use=lambda: True)  # an upload recorded its row mid-delete
+    assert store.read(sha) == b'z' * 100
+    store.delete(sha, in_use=lambda: False)
+    assert not store.exists(sha)
+    assert [p for p in tmp_path.rglob('*') if p.is_file()] == []
+
+
+@pytest.fixture
+def client(app, tmp_path):
+    app.config.update({'TESTING': True, 'UPLOAD_FOLDER': tmp_path,
+                       'UPLOAD_QUOTA_BYTES': 3000})
+    calls = []
+
+    class Recorder:
+        def recognize(self, config, audio):
+            calls.append(audio)
+            alt = type('A', (), {'transcript': 'remember the milk'})
+            return type('R', (), {'results': [type('X', (), {'alternatives': [alt]})]})
+
+    app.extensions["clients"].override("speech", Recorder())
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for name in ('user1', 'user2'):
+            db.session.add(User(username=name, pw_hash=generate_password_hash(
+                'pass1', method='pbkdf2:sha256')))
+        db.session.commit()
+    with app.test_client() as c:
+        c.post('/login', data={'username': 'user1', 'password': 'pass1'})
+        c.calls = calls
+        yield c
+    app.config['UPLOAD_QUOTA_BYTES'] = 500 * 1024 * 1024
+
+
+def upload(client, data, name='clip.webm'):
+    return client.post('/api/upload', data={'audio': (io.BytesIO(data), name)},
+                       content_type='multipart/form-data')
+
+
+def test_same_audio_is_stored_once(client, tmp_path):
+    first = upload(client, b'x' * 1000).get_json()
+    again = upload(client, b'x' * 1000, name='other.webm').get_json()
+    assert first['duplicate'] is False and again['duplicate'] is True
+    assert again['sha256'] == first['sha256']
+    assert (tmp_path / first['filename']).exists()
+
+    client.get('/logout')
+    client.post('/login', data={'username': 'user2', 'password': 'pass1'})
+    other = upload(client, b'x' * 1000).get_json()
+    assert other['duplicate'] is True and other['id'] != first['id']
+    blobs = [p for p in tmp_path.rglob('*') if p.is_file()]
+    assert len(blobs) == 1
+
+    # the blob survives until its last owner deletes it
+    client.delete(f"/api/uploads/{first['sha256']}")
+    assert (tmp_path / first['filename']).exists()
+    client.get('/logout')
+    client.post('/login', data={'username': 'user1', 'password': 'pass1'})
+    assert client.delete(f"/api/uploads/{first['sha256']}").status_code == 200
+    assert not (tmp_path / first['filename']).exists()
+
+
+def test_size_and_quota_limits(app, client):
+    upload(client, b'a' * 2000)
+    res = upload(client, b'b' * 2000)
+    assert res.status_code == 413 and res.get_json()['error'] == 'Upload quota exceeded'
+    assert client.get('/api/uploads').get_json()['used'] == 2000
+    # audio the user already owns doesn't count against what's left
+    again = upload(client, b'a' * 2000)
+    assert again.status_code == 200 and again.get_json()['duplicate'] is True
+    with app.app_context():
+        # checked in the insert itself, so parallel uploads can't overshoot
+        assert add_audio_file(1, 'f' * 64, 1000, quota=3000)[1] is True
+        assert add_audio_file(1, 'e' * 64, 1, quota=3000) == (None, False)
+
+    app.config['MAX_CONTENT_LENGTH'] = 100
+    try:
+        assert upload(client, b'c' * 500).status_code == 413
+    finally:
+        app.config['MAX_CONTENT_LENGTH'] = 32 * 1024 * 1024
+
+
+def test_repeated_audio_is_recognized_once(client):
+    sha = upload(client, b'y' * 800).get_json()['sha256']
+    first = client.post('/api/transcribe', json={'sha256': sha})
+    assert first.get_json() == {'transcript': 'remember the milk'}
+    again = client.post('/api/transcribe',
+                        data={'audio': (io.BytesIO(b'y' * 800), 'again.webm')},
+                        content_type='multipart/form-data')
+    assert again.get_json() == {'transcript': 'remember the milk'}
+    assert len(client.calls) == 1
+    assert client.post('/api/transcribe', json={'sha256': '0' * 64}).status_code == 404
@@ -0,0 +1,76 @@
+import itertools
+import json
+import pytest
+from app import db
+from broker import Broker
+from database import User
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def client(app, monkeypatch):
+    app.config.update({'TESTING': True, 'SSE_HEARTBEAT': 0.05})
+    monkeypatch.setattr(app.extensions['task_parser'], "parse_transcript",
+                        lambda text: [{"text": text, "due": None}])
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(
+            username='user1',
+            pw_hash=generate_password_hash('pass1', method='pbkdf2:sha256')
+        )
+        db.session.add(user)
+        db.session.commit()
+
+    with app.test_client() as c:
+        c.post('/login', data={'username': 'user1', 'password': 'pass1'})
+        yield c
+
+
+def next_event(chunks):
+    """Skip the retry hint and heartbeats, return (event, data)."""
+    for chunk in itertools.islice(chunks, 100):
+        text = chunk.decode()
+        if text.startswith("event:") or text.startswith("id:"):
+            fields = dict(line.split(": ", 1) for line in text.strip().split("\n"))
+            return fields["event"], json.loads(fields["data"])
+    raise AssertionError("no event arrived")
+
+
+def test_stream_pushes_task_deltas(app, client):
+    res = client.get('/api/stream')
+    assert res.mimetype == 'text/event-stream'
+    chunks = iter(res.response)
+    assert next(chunks).startswith(b"retry:")  # subscribed from here on
+
+    client.post('/api/save_task', json={'transcript': 'feed the cat'})
+    event, data = next_event(chunks)
+    assert event == 'task_created'
+    task_id = data['tasks'][0]['id']
+    assert data['tasks'][0]['name'] == 'feed the cat'
+
+    client.put(f'/api/tasks/{task_id}', json={'completed': True})
+    event, data = next_event(chunks)
+    assert event == 'task_updated' and data['completed'] is True
+
+    client.delete(f'/api/tasks/{task_id}')
+    assert next_event(chunks) == ('task_deleted', {'id': task_id})
+    res.close()
+    assert app.extensions['broker'].subscriber_count() == 0
+
+
+def test_heartbeat_and_overflow_resync():
+    b = Broker(max_queue=2)
+    chunks = b.stream(1, heartbeat=0.01)
+    assert b.subscriber_count(1) == 0  # nothing held until the stream is read
+    assert next(chunks).startswith("retry:")
+    assert b.subscriber_count(1) == 1
+    assert next(chunks) == ": heartbeat\n\n"
+
+    for i in range(5):  # more than the queue holds
+        b.publish(1, "task_deleted", {"id": i})
+    assert next(chunks).startswith("event: resync")
+    b.publish(2, "task_deleted", {"id": 99})  # other users' events stay out
+    assert next(chunks) == ": heartbeat\n\n"
+    chunks.close()
+    assert b.subscriber_count(1) == 0
@@ -0,0 +1,103 @@
+import pytest
+from database import db, User
+import time
+from transcription import FakeStreamingRecognizer, StreamingSession, StreamingSessionManager
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def client(app):
+    app.config.update({
+        'TESTING': True,
+        'SPEECH_STREAMING_BACKEND': 'fake',
+    })
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(
+            username='user1',
+            pw_hash=generate_password_hash('pass1', method='pbkdf2:sha256')
+        )
+        db.session.add(user)
+        db.session.commit()
+
+    with app.test_client() as c:
+        c.post('/login', data={'username': 'user1', 'password': 'pass1'})
+        yield c
+
+
+def test_stream_returns_interim_then_final(client):
+    res = client.post('/api/transcribe/stream')
+    assert res.status_code == 201
+    session_id = res.get_json()['session_id']
+
+    # interim text comes back with the very first chunk
+    res = client.post(f'/api/transcribe/stream/{session_id}',
+                      data=b'buy milk', content_type='application/octet-stream')
+    assert res.status_code == 200
+    assert res.get_json()['transcript'] == 'buy milk'
+
+    client.post(f'/api/transcribe/stream/{session_id}',
+                data=b'tomorrow', content_type='application/octet-stream')
+
+    res = client.post(f'/api/transcribe/stream/{session_id}/finish')
+    assert res.status_code == 200
+    assert res.get_json()['transcript'] == 'buy milk tomorrow'
+
+    # a finished session is gone
+    res = client.post(f'/api/transcribe/stream/{session_id}', data=b'x')
+    assert res.status_code == 404
+
+
+def test_stream_is_private_to_its_user(app, client):
+    session_id = client.post('/api/transcribe/stream').get_json()['session_id']
+    client.get('/logout')
+
+    other = app.test_client()
+    other.post('/sign_up', data={'username': 'user2', 'password': 'pass2'})
+    other.post('/login', data={'username': 'user2', 'password': 'pass2'})
+    res = other.post(f'/api/transcribe/stream/{session_id}', data=b'hi')
+    assert res.status_code == 404
+    app.extensions['stream_sessions'].close(session_id)
+
+
+def test_scripted_fake_recognizer():
+    session = StreamingSession(1, FakeStreamingRecognizer("hello there world"))
+    for _ in range(3):
+        session.push(b'\x00' * 16)
+    result = session.finish()
+    assert result['done'] is True
+    assert result['transcript'] == 'hello there world'
+
+
+def test_idle_sessions_are_reaped_without_new_streams():
+    manager = StreamingSessionManager(FakeStreamingRecognizer, idle_timeout=0.05,
+                                      reap_interval=0.02)
+    session = manager.start(1)
+    for _ in range(100):  # the reaper drops the session, then finishes it
+        if manager.get(session.id, 1) is None and session.snapshot()['done']:
+            break
+        time.sleep(0.02)
+    assert manager.get(session.id, 1) is None
+    assert session.snapshot()['done'] is True
+    assert manager.close(session.id) is None  # e.g. a second finish
+
+
+def test_second_finish_is_404(app, client, monkeypatch):
+    session_id = client.post('/api/transcribe/stream').get_json()['session_id']
+    # the other finish closes the session between our lookup and our close
+    sessions = app.extensions['stream_sessions']
+    real_close = sessions.close
+    monkeypatch.setattr(sessions, "close",
+                        lambda sid: real_close(sid) and None)
+    assert client.post(f'/api/transcribe/stream/{session_id}/finish').status_code == 404
+
+
+def test_finish_with_a_full_queue_still_stops_the_recognizer():
+    session = StreamingSession(1, FakeStreamingRecognizer(latency=0.2), max_pending_chunks=2)
+    for _ in range(3):  # one being recognized, two queued
+        session.push(b'word')
+    session.finish(timeout=0)  # what the reaper does
+    session._thread.join(2)
+    assert session.snapshot()['done'] is True
@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy import event
+from app import db
+from database import User
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def client(app):
+    app.config.update({'TESTING': True})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(User(username='user1',
+                            pw_hash=generate_password_hash('pass1', method='pbkdf2:sha256')))
+        db.session.commit()
+    with app.test_client() as c:
+        c.post('/login', data={'username': 'user1', 'password': 'pass1'})
+        yield c
+
+
+@pytest.fixture
+def user_queries(app):
+    """SELECTs against the users table, per request."""
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def record(conn, cursor, statement, *args):
+        if statement.lstrip().startswith("SELECT") and "FROM users" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_user_loaded_once(app, client, user_queries):
+    assert client.get('/draw').status_code == 200
+    first = len(user_queries)
+    for _ in range(3):
+        assert client.get('/draw').status_code == 200
+    assert first == 1 and len(user_queries) == 1
+    assert app.extensions['user_cache'].stats()['hits'] >= 3
+
+
+def test_theme_save_invalidates(client):
+    client.get('/api/get_theme')
+    assert client.post('/api/save_theme', json={'bg': 'black'}).status_code == 200
+    assert client.get('/api/get_theme').get_json() == {'bg': 'black'}
+    client.post('/api/save_theme', json={'bg': 'white'})
+    assert client.get('/api/get_theme').get_json() == {'bg': 'white'}
+
+
+def test_expiry_and_logout(app, client, user_queries):
+    user_cache = app.extensions['user_cache']
+    client.get('/draw')
+    user_cache.ttl = 0
+    client.get('/draw')
+    assert len(user_queries) == 2
+
+    user_cache.ttl = 60
+    client.get('/logout')
+    assert user_cache.stats()['size'] == 0
+    assert client.get('/draw').status_code == 302
+
+
+def test_user_is_forgotten_after_the_commit_not_before(app, client):
+    from database import bump_user_version
+    user_cache = app.extensions['user_cache']
+    with app.app_context():
+        user_id = User.query.filter_by(username='user1').one().id
+        bump_user_version(user_id)
+        # another request re-caching the row before the commit lands...
+        user_cache.load_user(user_id)
+        db.session.commit()
+        # ...is dropped by the commit, not left to serve until the TTL
+        assert user_cache.stats()['size'] == 0
+
+        user_cache.load_user(user_id)
+        bump_user_version(user_id)
+        db.session.rollback()
+        assert user_cache.stats()['size'] == 1
@@ -0,0 +1,358 @@
+"""Streaming and chunked speech recognition.
+
+The browser's MediaRecorder pushes small audio chunks while the user is
+still speaking. Each chunk is handed to a recognizer running in a
+background thread, so interim transcripts show up after the first chunk
+instead of after the whole clip has been uploaded.
+
+Long uploads are cut at pauses (audio.chunk_audio) and the pieces are
+recognized in parallel by ChunkedTranscriber, then stitched back into
+one transcript.
+"""
+import math
+import queue
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class StreamingError(Exception):
+    """Raised when a streaming session can't be started or used."""
+
+
+class GoogleStreamingRecognizer:
+    """Wraps speech_client.streaming_recognize for chunked audio."""
+
+    def __init__(self, client, language_code="en-US", encoding="WEBM_OPUS",
+                 sample_rate_hertz=48000):
+        self.client = client
+        self.language_code = language_code
+        self.encoding = encoding
+        self.sample_rate_hertz = sample_rate_hertz
+
+    def stream(self, chunks):
+        """Yield (transcript, is_final) pairs as Google returns them."""
+        from google.cloud import speech
+
+        config = speech.StreamingRecognitionConfig(
+            config=speech.RecognitionConfig(
+                encoding=getattr(speech.RecognitionConfig.AudioEncoding,
+                                 self.encoding),
+                sample_rate_hertz=self.sample_rate_hertz,
+                language_code=self.language_code,
+            ),
+            interim_results=True,
+        )
+        requests = (speech.StreamingRecognizeRequest(audio_content=chunk)
+                    for chunk in chunks)
+        responses = self.client.streaming_recognize(config=config,
+                                                    requests=requests)
+        for response in responses:
+            for result in response.results:
+                if result.alternatives:
+                    yield result.alternatives[0].transcript, result.is_final
+
+
+class FakeStreamingRecognizer:
+    """Offline recognizer for tests and local development.
+
+    With a script, every chunk "recognizes" one more word of it. Without
+    one, chunks are decoded as UTF-8 text, so tests can stream words.
+    """
+
+    def __init__(self, script=None, latency=0.0):
+        self.words = script.split() if script else None
+        self.latency = latency
+
+    def stream(self, chunks):
+        heard = []
+        for chunk in chunks:
+            if self.latency:
+                time.sleep(self.latency)
+            if self.words is not None:
+                if len(heard) < len(self.words):
+                    heard.append(self.words[len(heard)])
+            else:
+                heard.extend(chunk.decode("utf-8", "ignore").split())
+            yield " ".join(heard), False
+        yield " ".join(heard), True
+
+
+class StreamingSession:
+    """One recording: a chunk queue feeding a recognizer thread."""
+
+    def __init__(self, user_id, recognizer, max_pending_chunks=64):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.last_seen = time.monotonic()
+        self.error = None
+        self._chunks = queue.Queue(maxsize=max_pending_chunks)
+        self._finals = []
+        self._interim = ""
+        self._version = 0
+        self._done = False
+        # set when finish() couldn't queue the sentinel
+        self._closed = threading.Event()
+        self._changed = threading.Condition()
+        self._thread = threading.Thread(target=self._run, args=(recognizer,),
+                                        daemon=True)
+        self._thread.start()
+
+    def _chunk_iter(self):
+        while True:
+            chunk = self._chunks.get()
+            if chunk is None or self._closed.is_set():
+                return
+            yield chunk
+
+    def _run(self, recognizer):
+        try:
+            for text, is_final in recognizer.stream(self._chunk_iter()):
+                with self._changed:
+                    if is_final:
+                        self._finals.append(text.strip())
+                        self._interim = ""
+                    else:
+                        self._interim = text.strip()
+                    self._version += 1
+                    self._changed.notify_all()
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            with self._changed:
+                self._done = True
+                self._version += 1
+                self._changed.notify_all()
+
+    def push(self, chunk, timeout=5.0):
+        if self._done or self._closed.is_set():
+            raise StreamingError("Session already finished")
+        self.last_seen = time.monotonic()
+        if chunk:
+            try:
+                self._chunks.put(chunk, timeout=timeout)
+            except queue.Full:
+                raise StreamingError("Recognizer is falling behind")
+
+    def wait(self, since_version, timeout):
+        """Block until a result newer than since_version, or timeout."""
+        with self._changed:
+            self._changed.wait_for(
+                lambda: self._version > since_version or self._done,
+                timeout=timeout)
+
+    def finish(self, timeout=30.0):
+        try:
+            self._chunks.put(None, timeout=max(timeout, 0.1))
+        except queue.Full:
+            # flag first: then either the queue still holds chunks, and the
+            # recognizer's next get() sees the flag, or it has drained and
+            # the sentinel fits after all; leftover chunks are dropped
+            self._closed.set()
+            try:
+                self._chunks.put_nowait(None)
+            except queue.Full:
+                pass
+        self._thread.join(timeout)
+        return self.snapshot()
+
+    def snapshot(self):
+        with self._changed:
+            parts = [t for t in self._finals + [self._interim] if t]
+            return {
+                "session_id": self.id,
+                "transcript": " ".join(parts),
+                "version": self._version,
+                "done": self._done,
+                "error": self.error,
+            }
+
+
+class StreamingSessionManager:
+    """Keeps track of open sessions per user and reaps idle ones.
+
+    While any session is open a background thread reaps every
+    reap_interval seconds, so abandoned sessions don't keep their
+    recognizer threads alive until someone else starts a stream.
+    """
+
+    def __init__(self, recognizer_factory, max_sessions=100, idle_timeout=60,
+                 reap_interval=10, app=None):
+        self.recognizer_factory = recognizer_factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self._sessions = {}
+        self._reaper = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("STREAM_MAX_SESSIONS", self.max_sessions)
+        app.config.setdefault("STREAM_IDLE_TIMEOUT", self.idle_timeout)
+        self.max_sessions = app.config["STREAM_MAX_SESSIONS"]
+        self.idle_timeout = app.config["STREAM_IDLE_TIMEOUT"]
+        app.extensions["stream_sessions"] = self
+
+    def start(self, user_id):
+        self.reap()
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise StreamingError("Too many open streaming sessions")
+            session = StreamingSession(user_id, self.recognizer_factory())
+            self._sessions[session.id] = session
+            if self._reaper is None:
+                self._reaper = threading.Thread(
+                    target=self._reap_loop, daemon=True,
+                    name="echonote-stream-reaper")
+                self._reaper.start()
+        return session
+
+    def get(self, session_id, user_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None or session.user_id != user_id:
+            return None
+        return session
+
+    def close(self, session_id):
+        """Finish and forget a session; None if it was already closed."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            return session.finish()
+        return None
+
+    def reap(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            stale = [s for s in self._sessions.values()
+                     if s.last_seen < cutoff]
+            for session in stale:
+                del self._sessions[session.id]
+        for session in stale:
+            session.finish(timeout=0)
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(self.reap_interval)
+            self.reap()
+            with self._lock:
+                if not self._sessions:
+                    self._reaper = None  # start() brings up a new one
+                    return
+
+
+# One-shot and chunked recognition
+
+class GoogleRecognizer:
+    """speech_client.recognize for one PreparedAudio (a whole clip or a
+    chunk)."""
+
+    def __init__(self, client, language_code="en-US"):
+        self.client = client
+        self.language_code = language_code
+
+    def recognize(self, prepared):
+        from google.cloud import speech
+
+        audio = speech.RecognitionAudio(content=prepared.content)
+        config = speech.RecognitionConfig(language_code=self.language_code)
+        if prepared.encoding:
+            encodings = speech.RecognitionConfig.AudioEncoding
+            config.encoding = encodings[prepared.encoding]
+        if prepared.sample_rate_hertz:
+            config.sample_rate_hertz = prepared.sample_rate_hertz
+        resp = self.client.recognize(config=config, audio=audio)
+        return " ".join(r.alternatives[0].transcript for r in resp.results)
+
+
+class FakeRecognizer:
+    """Offline recognizer that "hears" a fixed script by timestamp.
+
+    Word i of the script is spoken at i / words_per_second seconds into
+    the recording, so a chunk returns exactly the words inside its time
+    range (including the ones in its overlap with the neighbours).
+    """
+
+    def __init__(self, script=None, words_per_second=2.0, latency=0.0):
+        self.script = script
+        self.words_per_second = words_per_second
+        self.latency = latency
+
+    def recognize(self, prepared):
+        if self.latency:
+            time.sleep(self.latency)
+        start = prepared.offset
+        end = start + (prepared.duration or 0)
+        first = int(-(-start * self.words_per_second // 1))  # ceil
+        last = int(-(-end * self.words_per_second // 1))
+        if self.script is None:
+            return " ".join(f"word{i}" for i in range(first, last))
+        return " ".join(self.script.split()[first:last])
+
+
+def _norm(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+# generous speaking rate: bounds how many words can sit in the shared audio
+MAX_WORDS_PER_SECOND = 4
+
+
+def stitch_transcripts(parts, overlap=0.5, min_overlap_words=2):
+    """Join chunk transcripts, dropping words repeated across a boundary.
+
+    Neighbouring chunks share 2 * overlap seconds of audio (see
+    audio.chunk_audio), so only that many seconds' worth of words can be
+    heard twice. The end of the text so far is matched against the start
+    of the next part within that window; the longest run of at least
+    min_overlap_words (case/punctuation-insensitive) equal words is kept
+    once. A single shared word ("the", "to") is a coincidence, not an
+    overlap.
+    """
+    max_words = max(math.ceil(2 * overlap * MAX_WORDS_PER_SECOND),
+                    min_overlap_words)
+    words = []
+    for part in parts:
+        new = part.split()
+        if not new:
+            continue
+        tail = [_norm(w) for w in words[-max_words:]]
+        head = [_norm(w) for w in new[:max_words]]
+        shared = 0
+        for n in range(min(len(tail), len(head)), min_overlap_words - 1, -1):
+            if tail[-n:] == head[:n]:
+                shared = n
+                break
+        words.extend(new[shared:])
+    return " ".join(words)
+
+
+class ChunkedTranscriber:
+    """Recognizes chunks on a shared, bounded pool and stitches the text."""
+
+    def __init__(self, max_workers=4, app=None):
+        self.max_workers = max_workers
+        self.executor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("LONG_AUDIO_WORKERS", self.max_workers)
+        self.max_workers = app.config["LONG_AUDIO_WORKERS"]
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                           thread_name_prefix="echonote-chunk")
+        app.extensions["chunked_transcriber"] = self
+
+    def transcribe(self, chunks, recognizer, overlap=0.5):
+        """Text of chunks made by chunk_audio(..., overlap=overlap)."""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="echonote-chunk")
+        parts = list(self.executor.map(recognizer.recognize, chunks))
+        return stitch_transcripts(parts, overlap)
@@ -0,0 +1,125 @@
+"""Per-user cache for the logged-in user, their theme and nav links.
+
+Flask-Login calls load_user on every authenticated request, which used
+to be a SELECT on users each time, plus json.loads of the theme and a
+rebuilt nav bar on every page. The row is now cached as a detached
+snapshot and re-attached to each request's session with
+merge(load=False), which issues no SQL; the parsed theme and nav links
+ride along in the same entry.
+
+Entries expire after USER_CACHE_TTL seconds (so other processes' writes
+show up eventually) and are dropped right away when this process
+changes the user: theme saves, login/logout, the Google OAuth callback
+and every bump_user_version, once it is committed.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from database import db, User
+
+
+def snapshot(user):
+    """A detached copy of the user's column values, safe to share
+    between requests."""
+    copy = User(**{column.key: getattr(user, column.key)
+                   for column in User.__mapper__.column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+class CachedUser:
+    def __init__(self, user):
+        self.user = snapshot(user)
+        self.theme = json.loads(user.theme) if user.theme else None
+        self.nav_links = {}  # "credentials" in session -> list of links
+        self.stored_at = time.monotonic()
+
+
+class UserCache:
+    """LRU + TTL map of user id -> CachedUser."""
+
+    def __init__(self, max_entries=1024, ttl=60, app=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("USER_CACHE_SIZE", self.max_entries)
+        app.config.setdefault("USER_CACHE_TTL", self.ttl)
+        self.max_entries = app.config["USER_CACHE_SIZE"]
+        self.ttl = app.config["USER_CACHE_TTL"]
+        app.extensions["user_cache"] = self
+
+    def _entry(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            expired = (entry is not None
+                       and time.monotonic() - entry.stored_at > self.ttl)
+            if expired:
+                del self._entries[user_id]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry
+
+    def load_user(self, user_id):
+        """The user attached to this request's session, from cache if
+        possible."""
+        if not self.max_entries:
+            return db.session.get(User, user_id)
+        entry = self._entry(user_id)
+        if entry is None:
+            user = db.session.get(User, user_id)
+            if user is None:
+                return None
+            entry = CachedUser(user)
+            with self._lock:
+                self._entries[user_id] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            user.prime_theme(entry.theme)
+            return user
+        user = db.session.merge(entry.user, load=False)
+        user.prime_theme(entry.theme)
+        return user
+
+    def nav_links(self, user_id, connected, build):
+        """build(connected), remembered in the user's entry."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is None:
+            return build(connected)
+        links = entry.nav_links.get(connected)
+        if links is None:
+            links = entry.nav_links[connected] = build(connected)
+        return links
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
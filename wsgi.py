@@ -0,0 +1,8 @@
+"""WSGI entry point, e.g. `gunicorn wsgi:app`.
+
+app.py itself builds no app on import.
+"""
+from app import create_app, reload_prompt_on_sighup
+
+app = create_app()
+reload_prompt_on_sighup(app)